@@ -0,0 +1,86 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Benchmarks.
+
+Each benchmark is a standalone script, run from the source tree with:
+
+    python -m benchmarks.<name> [options]
+
+When a benchmark needs dictionaries, synthetic ones are generated
+unless actual dictionaries are passed on the command line.
+"""
+
+from contextlib import contextmanager
+import json
+import random
+import time
+
+from plover import system
+from plover.config import DEFAULT_SYSTEM_NAME
+from plover.registry import registry
+from plover.steno import Stroke
+
+
+def setup():
+    registry.update()
+    system.setup(DEFAULT_SYSTEM_NAME)
+
+
+def random_strokes(count, seed=0):
+    '''Return a list of <count> distinct random strokes.'''
+    rnd = random.Random(seed)
+    keys = [k for k in system.KEYS if k != system.NUMBER_KEY]
+    strokes = set()
+    while len(strokes) < count:
+        steno_keys = rnd.sample(keys, rnd.randint(1, 7))
+        strokes.add(Stroke(steno_keys).rtfcre)
+    return sorted(strokes)
+
+
+def synthetic_entries(count, seed=0, stroke_count=None):
+    '''Return <count> random dictionary entries.
+
+    Keys lengths and translations follow a distribution roughly similar
+    to real dictionaries: mostly one and two strokes entries, a few very
+    long ones, and many translations sharing the same text.
+    '''
+    rnd = random.Random(seed)
+    if stroke_count is None:
+        stroke_count = max(100, count // 10)
+    strokes = random_strokes(stroke_count, seed)
+    words = [''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz')
+                     for n in range(rnd.randint(2, 10)))
+             for n in range(max(10, count // 2))]
+    affixes = ('%s', '%s', '%s', '%s', '{^%s}', '{%s^}', '{&%s}', '%s{^}')
+    entries = {}
+    while len(entries) < count:
+        key_len = rnd.choice((1, 1, 1, 1, 1, 1, 2, 2, 2, 3, 4)) \
+            if rnd.random() > 0.001 else rnd.randint(5, 10)
+        key = tuple(rnd.choice(strokes) for n in range(key_len))
+        entries[key] = rnd.choice(affixes) % rnd.choice(words)
+    return list(entries.items())
+
+
+def write_json_dictionary(filename, entries):
+    with open(filename, 'w', encoding='utf-8') as fp:
+        json.dump({'/'.join(k): v for k, v in entries}, fp,
+                  ensure_ascii=False, sort_keys=True,
+                  indent=0, separators=(',', ': '))
+
+
+@contextmanager
+def timed(results, name):
+    '''Store the time taken to run the block in <results>[<name>].'''
+    start_time = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start_time
+
+
+def peak_rss():
+    '''Peak resident memory of the current process in MB (if available).'''
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,59 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Compare loading dictionaries with and without the dictionaries cache."""
+
+import argparse
+import os
+import tempfile
+
+from plover.dictionary import cache
+from plover.dictionary.base import load_dictionary
+
+from benchmarks import setup, synthetic_entries, timed, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=150000,
+                        help='number of synthetic entries')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of loads measured (best is kept)')
+    parser.add_argument('dictionaries', nargs='*',
+                        help='use those dictionaries instead of a synthetic one')
+    args = parser.parse_args()
+    setup()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dictionaries = [os.path.abspath(d) for d in args.dictionaries]
+        if not dictionaries:
+            filename = os.path.join(tmpdir, 'synthetic.json')
+            write_json_dictionary(filename, synthetic_entries(args.entries))
+            dictionaries.append(filename)
+        cache_dir = os.path.join(tmpdir, 'cache')
+        for resource in dictionaries:
+            print(resource)
+            results = {}
+            for name, directory in (
+                ('parse', None),
+                ('cache miss', cache_dir),
+                ('cache hit', cache_dir),
+            ):
+                cache.setup(directory)
+                timings = []
+                for n in range(args.repeat):
+                    if name == 'cache miss':
+                        cache_file = cache.cache_filename(os.path.realpath(resource))
+                        if os.path.exists(cache_file):
+                            os.unlink(cache_file)
+                    duration = {}
+                    with timed(duration, name):
+                        load_dictionary(resource, threaded_save=False)
+                    timings.append(duration[name])
+                results[name] = min(timings)
+            cache.setup(None)
+            for name, duration in results.items():
+                print('  %-10s: %7.3fs' % (name, duration))
+
+
+if __name__ == '__main__':
+    main()
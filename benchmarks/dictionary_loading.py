@@ -0,0 +1,55 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Compare loading dictionaries with threads and with worker processes.
+
+The dictionaries cache is disabled, so all dictionaries are parsed.
+"""
+
+import argparse
+import os
+import tempfile
+
+from plover.dictionary.loading_manager import DictionaryLoadingManager
+from plover.exception import DictionaryLoaderException
+
+from benchmarks import setup, synthetic_entries, timed, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=50000,
+                        help='number of entries of each synthetic dictionary')
+    parser.add_argument('-c', '--counts', type=int, nargs='+',
+                        default=(1, 2, 4, 8, 12),
+                        help='numbers of dictionaries loaded')
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(),
+                        help='maximum number of worker processes')
+    args = parser.parse_args()
+    setup()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dictionaries = []
+        for n in range(max(args.counts)):
+            filename = os.path.join(tmpdir, 'synthetic%u.json' % n)
+            write_json_dictionary(filename, synthetic_entries(args.entries, seed=n))
+            dictionaries.append(filename)
+        print('%u entries per dictionary, up to %u worker processes'
+              % (args.entries, args.processes))
+        print('%12s %10s %10s' % ('dictionaries', 'threads', 'processes'))
+        for count in args.counts:
+            results = {}
+            for name, processes in (
+                ('threads', 0),
+                ('processes', args.processes),
+            ):
+                manager = DictionaryLoadingManager(processes=processes)
+                with timed(results, name):
+                    loaded = manager.load(dictionaries[:count])
+                for d in loaded:
+                    if isinstance(d, DictionaryLoaderException):
+                        raise d.exception
+            print('%12u %9.3fs %9.3fs' % (count, results['threads'], results['processes']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Compare the streaming and full document JSON dictionary loaders.
+
+Each load is done in a fresh process, so the peak resident memory
+(RSS) can be measured: the baseline is the RSS before loading.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from plover.dictionary.json_dict import JsonDictionary
+
+from benchmarks import peak_rss, setup, synthetic_entries, write_json_dictionary
+
+
+LOADERS = {
+    'streaming': JsonDictionary._load,
+    'document': JsonDictionary._load_document,
+}
+
+
+def child(loader, filename):
+    setup()
+    baseline = peak_rss()
+    d = JsonDictionary()
+    start_time = time.perf_counter()
+    LOADERS[loader](d, filename)
+    duration = time.perf_counter() - start_time
+    print('%.3f %.1f %.1f' % (duration, baseline, peak_rss()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=500000,
+                        help='number of synthetic entries')
+    parser.add_argument('--child', nargs=2, metavar=('LOADER', 'FILENAME'),
+                        help=argparse.SUPPRESS)
+    parser.add_argument('dictionary', nargs='?',
+                        help='use this dictionary instead of a synthetic one')
+    args = parser.parse_args()
+    if args.child is not None:
+        child(*args.child)
+        return
+    if peak_rss() is None:
+        sys.exit('peak RSS measurement is not supported on this platform')
+    setup()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = args.dictionary
+        if filename is None:
+            filename = os.path.join(tmpdir, 'synthetic.json')
+            write_json_dictionary(filename, synthetic_entries(args.entries))
+        print('%s: %.1fMB' % (filename, os.path.getsize(filename) / 1024 / 1024))
+        print('%10s %8s %10s %10s' % ('loader', 'time', 'peak RSS', 'increase'))
+        for loader in sorted(LOADERS):
+            output = subprocess.check_output([
+                sys.executable, '-m', __spec__.name,
+                '--child', loader, filename,
+            ], universal_newlines=True)
+            duration, baseline, peak = map(float, output.split())
+            print('%10s %7.3fs %8.1fMB %8.1fMB' % (loader, duration, peak, peak - baseline))
+
+
+if __name__ == '__main__':
+    main()
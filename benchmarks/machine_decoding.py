@@ -0,0 +1,145 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the decoding of serial machines packets.
+
+Compares the table driven decoders (with the keymap folded in) to
+the previous per bit decoding followed by `Keymap.keys_to_actions`,
+using the default system keymaps and random strokes.
+"""
+
+import argparse
+import random
+
+from plover import system
+from plover.machine.keymap import Keymap
+from plover.machine import geminipr, passport, txbolt
+
+from benchmarks import setup, timed
+
+
+def new_machine(machine_class, name):
+    params = {k: v[0] for k, v in machine_class.get_option_info().items()}
+    machine = machine_class(params)
+    keymap = Keymap(machine_class.get_keys(),
+                    system.KEYS + machine_class.get_actions())
+    keymap.set_mappings(system.KEYMAPS[name])
+    machine.set_keymap(keymap)
+    machine.add_stroke_callback(lambda steno_keys: None)
+    return machine
+
+
+def geminipr_packets(rnd, count):
+    packets = []
+    for n in range(count):
+        bits = rnd.sample(range(42), rnd.randint(1, 7))
+        packet = bytearray(6)
+        packet[0] = 0x80
+        for bit in bits:
+            packet[bit // 7] |= 0x40 >> (bit % 7)
+        packets.append(bytes(packet))
+    return packets
+
+def geminipr_previous(machine, packet):
+    if not (packet[0] & 0x80) or sum(b & 0x80 for b in packet[1:]):
+        return
+    steno_keys = []
+    for i, b in enumerate(packet):
+        for j in range(1, 8):
+            if (b & (0x80 >> j)):
+                steno_keys.append(geminipr.STENO_KEY_CHART[i * 7 + j - 1])
+    steno_keys = machine.keymap.keys_to_actions(steno_keys)
+    if steno_keys:
+        machine._notify(steno_keys)
+
+def geminipr_current(machine, packet):
+    mask = machine._decode(packet)
+    if mask:
+        machine._notify(machine.keymap.mask_actions(mask))
+
+
+def txbolt_packets(rnd, count):
+    packets = []
+    for n in range(count):
+        packet = bytearray()
+        for key_set in range(4):
+            bits = rnd.sample(range(5 if key_set == 3 else 6), rnd.randint(0, 2))
+            if bits:
+                packet.append(key_set << 6 | sum(1 << bit for bit in bits))
+        if not packet or packet[-1] >> 6 != 3:
+            # Make sure the stroke is finished.
+            packet.append(0b11000000)
+        packets.append(bytes(packet))
+    return packets
+
+def txbolt_previous(machine, raw):
+    pressed_keys = []
+    for byte in raw:
+        key_set = byte >> 6
+        for i in range(5 if key_set == 3 else 6):
+            if (byte >> i) & 1:
+                pressed_keys.append(txbolt.STENO_KEY_CHART[(key_set * 6) + i])
+        if key_set == 3:
+            steno_keys = machine.keymap.keys_to_actions(pressed_keys)
+            if steno_keys:
+                machine._notify(steno_keys)
+            pressed_keys = []
+
+def txbolt_current(machine, raw):
+    machine._decode(raw)
+
+
+def passport_packets(rnd, count):
+    keys = passport.Passport.get_keys()
+    packets = []
+    for n in range(count):
+        encoded = ''.join(key + rnd.choice('0123456789abcdef')
+                          for key in rnd.sample(keys, rnd.randint(1, 7)))
+        packets.append('<123/%s/something>' % encoded)
+    return packets
+
+def passport_previous(machine, packet):
+    encoded = packet.split('/')[1]
+    steno_keys = []
+    for n in range(0, len(encoded), 2):
+        if int(encoded[n + 1], base=16) >= 8:
+            steno_keys.append(encoded[n])
+    steno_keys = machine.keymap.keys_to_actions(steno_keys)
+    if steno_keys:
+        machine._notify(steno_keys)
+
+def passport_current(machine, packet):
+    machine._handle_packet(packet)
+
+
+MACHINES = (
+    ('Gemini PR', geminipr.GeminiPr, geminipr_packets,
+     geminipr_previous, geminipr_current),
+    ('TX Bolt', txbolt.TxBolt, txbolt_packets,
+     txbolt_previous, txbolt_current),
+    ('Passport', passport.Passport, passport_packets,
+     passport_previous, passport_current),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--packets', type=int, default=100000,
+                        help='number of packets decoded')
+    args = parser.parse_args()
+    setup()
+    for name, machine_class, new_packets, previous, current in MACHINES:
+        machine = new_machine(machine_class, name)
+        packets = new_packets(random.Random(0), args.packets)
+        timings = {}
+        for decoder_name, decode in (('previous', previous), ('current', current)):
+            with timed(timings, decoder_name):
+                for packet in packets:
+                    decode(machine, packet)
+        print('%-10s: previous %5.2fus, current %5.2fus per packet' % (
+            name, *(timings[k] * 1e6 / len(packets)
+                    for k in ('previous', 'current'))))
+
+
+if __name__ == '__main__':
+    main()
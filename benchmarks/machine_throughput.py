@@ -0,0 +1,173 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the serial machines drivers, against simulated machines.
+
+For each machine, strokes are replayed over a pseudo-terminal (see
+`benchmarks.simulator`), and received by the actual driver, through
+the real serial port code path. Reported:
+
+- throughput: strokes received per second
+- latency: from the time a stroke is sent, to the driver callback
+- dropped: strokes sent but not received
+- spurious: strokes received but not sent (e.g. decoded noise)
+- discarded: invalid packets discarded (and logged) by the driver
+
+Use `--rate` to measure latency under a realistic load, and the
+default (as fast as possible) for throughput.
+"""
+
+import argparse
+from bisect import bisect_right
+from itertools import chain
+import logging
+import threading
+import time
+
+from plover.machine.base import STATE_ERROR, STATE_RUNNING
+
+from benchmarks import setup
+from benchmarks.simulator import (
+    Simulator,
+    load_strokes,
+    machine_keymap,
+    synthetic_strokes,
+)
+from benchmarks.simulator.protocols import PROTOCOLS
+
+
+# How many strokes to consider when matching
+# a received stroke, to account for dropped ones.
+MATCH_WINDOW = 16
+
+
+class DiscardedPackets(logging.Filter):
+    '''Count (and silence) the driver logs about discarded packets.'''
+
+    def __init__(self):
+        super(DiscardedPackets, self).__init__()
+        self.count = 0
+
+    def filter(self, record):
+        if str(record.msg).startswith('discarding '):
+            self.count += 1
+            return False
+        return True
+
+
+def run(machine_name, strokes, args):
+    '''Replay <strokes> to the <machine_name> driver, return the statistics.'''
+    simulator = Simulator(machine_name, strokes, rate=args.rate,
+                          burst_size=args.burst_size, noise=args.noise,
+                          partial=args.partial, truncate=args.truncate)
+    machine_class = simulator.protocol.MACHINE_CLASS
+    params = {k: v[0] for k, v in machine_class.get_option_info().items()}
+    params['port'] = simulator.port
+    machine = machine_class(params)
+    machine.set_keymap(machine_keymap(machine_class, machine_name))
+    received = []
+    def on_stroke(steno_keys):
+        received.append((time.perf_counter(), steno_keys))
+    machine.add_stroke_callback(on_stroke)
+    connected = threading.Event()
+    def on_state(state):
+        if state in (STATE_RUNNING, STATE_ERROR):
+            connected.set()
+    machine.add_state_callback(on_state)
+    discarded = DiscardedPackets()
+    logger = logging.getLogger('plover')
+    logger.addFilter(discarded)
+    try:
+        machine.start_capture()
+        if not connected.wait(10) or machine.state != STATE_RUNNING:
+            raise RuntimeError('%s driver failed to connect' % machine_name)
+        simulator.start()
+        simulator.join()
+        # Wait for the driver to settle.
+        count = -1
+        while count != len(received):
+            count = len(received)
+            time.sleep(args.settle)
+    finally:
+        machine.stop_capture()
+        simulator.close()
+        logger.removeFilter(discarded)
+    sent_times = simulator.sent_times
+    expected = [frozenset(keys) for keys in strokes[:len(sent_times)]]
+    latencies = []
+    spurious = 0
+    n = 0
+    for timestamp, steno_keys in received:
+        steno_keys = frozenset(steno_keys)
+        # Only consider the strokes already sent: the next ones
+        # expected, or the last ones sent (after dropped strokes).
+        sent = bisect_right(sent_times, timestamp)
+        candidates = chain(range(n, min(n + MATCH_WINDOW, sent)),
+                           range(max(n, sent - MATCH_WINDOW), sent))
+        for m in candidates:
+            if expected[m] == steno_keys:
+                break
+        else:
+            spurious += 1
+            continue
+        latencies.append(timestamp - sent_times[m])
+        n = m + 1
+    latencies.sort()
+    duration = (received[-1][0] - sent_times[0]) if received else 0
+    return {
+        'sent': len(sent_times),
+        'received': len(received),
+        'dropped': len(expected) - len(latencies),
+        'spurious': spurious,
+        'discarded': discarded.count,
+        'throughput': len(latencies) / duration if duration else 0,
+        'latency': latencies,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-m', '--machine', action='append',
+                        choices=sorted(PROTOCOLS),
+                        help='machine to measure (default: all)')
+    parser.add_argument('-l', '--log', metavar='STROKES_LOG',
+                        help='replay the strokes of a Plover strokes log')
+    parser.add_argument('-n', '--strokes', type=int, default=2000,
+                        help='number of synthetic strokes')
+    parser.add_argument('-r', '--rate', type=float, default=0,
+                        help='strokes per second (0 for as fast as possible)')
+    parser.add_argument('-b', '--burst-size', type=int, default=1,
+                        help='number of strokes sent at once')
+    parser.add_argument('--noise', type=float, default=0,
+                        help='probability of injecting noise before a packet')
+    parser.add_argument('--partial', type=float, default=0,
+                        help='probability of sending a packet in 2 parts')
+    parser.add_argument('--truncate', type=float, default=0,
+                        help='probability of truncating a packet')
+    parser.add_argument('--settle', type=float, default=1.5,
+                        help='time to wait for the driver to settle at the end')
+    args = parser.parse_args()
+    setup()
+    if args.log is None:
+        strokes = synthetic_strokes(args.strokes)
+    else:
+        strokes = load_strokes(args.log)
+    print('%-10s %6s %8s %7s %8s %9s %10s %18s' % (
+        'machine', 'sent', 'received', 'dropped', 'spurious',
+        'discarded', 'strokes/s', 'latency ms p50/p99'))
+    for machine_name in args.machine or sorted(PROTOCOLS):
+        stats = run(machine_name, strokes, args)
+        latency = stats['latency']
+        if latency:
+            latency = '%8.2f/%-8.2f' % (latency[len(latency) // 2] * 1e3,
+                                       latency[len(latency) * 99 // 100] * 1e3)
+        else:
+            latency = '-'
+        print('%-10s %6u %8u %7u %8u %9u %10.0f %18s' % (
+            machine_name, stats['sent'], stats['received'], stats['dropped'],
+            stats['spurious'], stats['discarded'], stats['throughput'],
+            latency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the effect of caching normalized strokes on dictionary loading.
+
+Uses the default `main.json` dictionary if available, or a synthetic
+one (with strokes written in various non-normalized forms) otherwise.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from plover import steno
+from plover.dictionary.json_dict import JsonDictionary
+from plover.resource import resource_exists, resource_filename
+
+from benchmarks import setup, synthetic_entries, timed, write_json_dictionary
+
+
+MAIN_DICTIONARY = 'asset:plover:assets/main.json'
+
+
+def denormalized(entries):
+    # Use the explicit hyphen form for a third of the strokes.
+    for n, (key, value) in enumerate(entries):
+        if n % 3 == 0:
+            key = tuple(s if '-' in s else s + '-' for s in key)
+        yield key, value
+
+
+def measure(filename, repeat):
+    best = None
+    for n in range(repeat):
+        if hasattr(steno.normalize_stroke, 'cache_clear'):
+            steno.normalize_stroke.cache_clear()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            timings = {}
+            with timed(timings, 'load'):
+                d = JsonDictionary.load(filename)
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        if best is None or timings['load'] < best:
+            best = timings['load']
+        del d
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=150000,
+                        help='number of synthetic entries')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of loads measured (best is kept)')
+    parser.add_argument('dictionary', nargs='?',
+                        help='use this dictionary instead of the default one')
+    args = parser.parse_args()
+    setup()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.dictionary is not None:
+            filename = args.dictionary
+        elif resource_exists(MAIN_DICTIONARY):
+            filename = resource_filename(MAIN_DICTIONARY)
+        else:
+            filename = os.path.join(tmpdir, 'synthetic.json')
+            write_json_dictionary(filename, denormalized(synthetic_entries(args.entries)))
+        print(filename)
+        cached_normalize_stroke = steno.normalize_stroke
+        try:
+            # Note: the cache is cleared before each load.
+            cached = measure(filename, args.repeat)
+            steno.normalize_stroke = steno._normalize_stroke
+            uncached = measure(filename, args.repeat)
+        finally:
+            steno.normalize_stroke = cached_normalize_stroke
+        for name, (duration, size) in (
+            ('uncached', uncached),
+            ('cached', cached),
+        ):
+            print('  %-8s: %7.3fs %7.1fMB' % (name, duration, size / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the time until the first dictionaries are usable on startup.
+
+A small (highest priority) user dictionary is loaded along with a
+big main dictionary: with progressive loading, translating can start
+as soon as the user dictionary is loaded, instead of waiting for all
+dictionaries.
+
+The dictionaries cache is disabled, so all dictionaries are parsed.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from plover.dictionary.loading_manager import DictionaryLoadingManager
+
+from benchmarks import setup, synthetic_entries, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-u', '--user-entries', type=int, default=1000,
+                        help='number of entries of the user dictionary')
+    parser.add_argument('-n', '--entries', type=int, default=150000,
+                        help='number of entries of the main dictionary')
+    parser.add_argument('dictionaries', nargs='*',
+                        help='dictionaries to use instead of synthetic '
+                        'ones, in priority order')
+    args = parser.parse_args()
+    setup()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dictionaries = [os.path.abspath(d) for d in args.dictionaries]
+        if not dictionaries:
+            for name, count, seed in (
+                ('user', args.user_entries, 1),
+                ('main', args.entries, 0),
+            ):
+                filename = os.path.join(tmpdir, name + '.json')
+                write_json_dictionary(filename, synthetic_entries(count, seed=seed))
+                dictionaries.append(filename)
+        steps = []
+        done = threading.Event()
+        def progress(results):
+            steps.append((time.perf_counter() - start_time, len(results)))
+        def loaded(results):
+            progress(results)
+            done.set()
+        start_time = time.perf_counter()
+        DictionaryLoadingManager().load_async(dictionaries, loaded, progress=progress)
+        done.wait()
+        print('%-24s %9.3fs' % ('first usable (%u/%u)' % (steps[0][1], len(dictionaries)),
+                                steps[0][0]))
+        print('%-24s %9.3fs' % ('all loaded', steps[-1][0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure dictionaries searches, with and without the search index.
+
+Compares the index to a linear scan of all entries (what the
+dictionary editor used to do), on synthetic dictionaries.
+"""
+
+import argparse
+import random
+from unittest import mock
+
+from plover.search import SearchIndex
+from plover.steno_dictionary import StenoDictionary
+
+from benchmarks import setup, synthetic_entries, timed
+
+
+def scan(dictionaries, pattern, field, mode):
+    results = []
+    for d in dictionaries:
+        for strokes, translation in d.items():
+            text = '/'.join(strokes) if field == 'strokes' else translation.lower()
+            if mode == 'prefix' and text.startswith(pattern):
+                results.append((strokes, translation, d))
+            elif mode == 'substring' and pattern in text:
+                results.append((strokes, translation, d))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=500000,
+                        help='number of synthetic entries')
+    parser.add_argument('-q', '--queries', type=int, default=20,
+                        help='number of queries of each kind')
+    args = parser.parse_args()
+    setup()
+    dictionaries = []
+    entries = synthetic_entries(args.entries)
+    for n in range(2):
+        d = StenoDictionary()
+        d.path = 'synthetic%u.json' % n
+        d.update(entries[n::2])
+        dictionaries.append(d)
+    rnd = random.Random(0)
+    sample = rnd.sample(entries, args.queries)
+    translations = [t.lower().strip('{}^&') for k, t in sample]
+    queries = {
+        'translation prefix': [('translation', 'prefix', t[:3]) for t in translations],
+        'translation substring': [('translation', 'substring', t[1:4]) for t in translations],
+        'strokes prefix': [('strokes', 'prefix', k[0][:3]) for k, t in sample],
+    }
+    index = SearchIndex(dictionaries)
+    timings = {}
+    with mock.patch.object(SearchIndex, '_start_build'):
+        with timed(timings, 'first'):
+            index.search(translations[0][:3], count=50)
+    with timed(timings, 'build'):
+        index.build()
+    print('%u entries, index built in %.3fs (in the background: '
+          'searches until then take %.3fs)' % (
+              len(entries), timings['build'], timings['first']))
+    for name, query_list in sorted(queries.items()):
+        with timed(timings, 'scan'):
+            for field, mode, pattern in query_list:
+                scan(dictionaries, pattern, field, mode)
+        with timed(timings, 'index'):
+            for field, mode, pattern in query_list:
+                index.search(pattern, field=field, mode=mode)
+        with timed(timings, 'page'):
+            for field, mode, pattern in query_list:
+                index.search(pattern, field=field, mode=mode, count=50)
+        print('  %-22s: scan %7.2fms, index %7.2fms, first page %7.2fms' % (
+            name, *(timings[k] * 1000 / len(query_list)
+                    for k in ('scan', 'index', 'page'))))
+    with timed(timings, 'fuzzy'):
+        for t in translations:
+            index.search(t[:-1] + 'x', mode='fuzzy')
+    print('  %-22s: index %7.2fms' % ('translation fuzzy',
+                                       timings['fuzzy'] * 1000 / len(translations)))
+    d = dictionaries[0]
+    with timed(timings, 'update'):
+        for n, (key, value) in enumerate(sample):
+            d[key + ('-Z',)] = value
+            index.search(value[:3], count=50)
+    print('  %-22s: index %7.2fms' % ('update + search',
+                                       timings['update'] * 1000 / len(sample)))
+
+
+if __name__ == '__main__':
+    main()
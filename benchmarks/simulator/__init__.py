@@ -0,0 +1,258 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Simulate serial stenotype machines over a pseudo-terminal.
+
+A pty pair is opened: the driver opens the slave side like any serial
+port, and the simulator replays strokes on the master side, in the
+wire format of the machine protocol (see `protocols`).
+
+Strokes are either synthetic, or recorded: loaded from a Plover strokes
+log. They can be sent at a given rate, in bursts, with random noise
+and partial packets injected.
+
+Note: pseudo-terminals are not rate limited (the baudrate setting is
+ignored), and only available on POSIX systems.
+
+Run standalone with:
+
+    python -m benchmarks.simulator <machine> [options]
+"""
+
+import ast
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from plover import system
+from plover.machine.keymap import Keymap
+
+from benchmarks.simulator.protocols import PROTOCOLS, StenturaServer
+
+
+def synthetic_strokes(count, seed=0):
+    '''Return a list of <count> random strokes (lists of steno keys).'''
+    rnd = random.Random(seed)
+    keys = [k for k in system.KEYS if k != system.NUMBER_KEY]
+    return [sorted(rnd.sample(keys, rnd.randint(1, 7)), key=system.KEY_ORDER.get)
+            for n in range(count)]
+
+
+def load_strokes(filename):
+    '''Load the strokes (lists of steno keys) of a Plover strokes log.
+
+    Lines are in the form: `<timestamp> Stroke(STKPW : ['S-', ...])`,
+    any other line is ignored.
+    '''
+    strokes = []
+    with open(filename, encoding='utf-8') as fp:
+        for line in fp:
+            start = line.find('Stroke(')
+            if start < 0:
+                continue
+            start = line.find(' : [', start)
+            end = line.rfind('])')
+            if start < 0 or end < start:
+                continue
+            strokes.append(ast.literal_eval(line[start + 3:end + 1]))
+    return strokes
+
+
+def machine_keymap(machine_class, machine_name):
+    '''Return the default system keymap for a machine.'''
+    keymap = Keymap(machine_class.get_keys(),
+                    system.KEYS + machine_class.get_actions())
+    mappings = system.KEYMAPS.get(machine_name)
+    if mappings is None:
+        mappings = system.KEYMAPS[machine_class.KEYMAP_MACHINE_TYPE]
+    keymap.set_mappings(mappings)
+    return keymap
+
+
+class PtyPair(object):
+    '''A pseudo-terminal pair, in raw mode.
+
+    <name> is the path to the slave side, to use as serial port.
+    '''
+
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.name = os.ttyname(self.slave)
+
+    def write(self, data):
+        data = memoryview(data)
+        while data:
+            data = data[os.write(self.master, data):]
+
+    def read(self, size, timeout=None):
+        '''Read up to <size> bytes, return b'' on timeout.'''
+        if not select.select([self.master], [], [], timeout)[0]:
+            return b''
+        try:
+            return os.read(self.master, size)
+        except OSError:
+            # The slave side was closed.
+            return b''
+
+    def read_exactly(self, size, timeout=None):
+        data = b''
+        while len(data) < size:
+            chunk = self.read(size - len(data), timeout)
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class Simulator(threading.Thread):
+    '''Replay strokes on a pseudo-terminal, like a <machine_name> machine.
+
+    Strokes are sent in bursts of <burst_size> strokes, at <rate> strokes
+    per second (or as fast as possible if 0). For each packet:
+
+    - <noise>: probability of injecting a few random bytes before it
+    - <partial>: probability of it being split in 2 writes, <gap>
+      seconds apart (should not result in a dropped stroke)
+    - <truncate>: probability of it being cut short (the stroke is lost)
+
+    Noise is not supported with the Stentura protocol (any invalid
+    response makes the driver disconnect); truncated responses are:
+    the driver times out and sends the request again.
+
+    After the run, `sent_times` contains the time each stroke was
+    sent (as given by `time.perf_counter`).
+    '''
+
+    def __init__(self, machine_name, strokes, rate=0, burst_size=1,
+                 noise=0, partial=0, truncate=0, gap=0.001, seed=0):
+        super(Simulator, self).__init__(name='Simulator')
+        self.daemon = True
+        self.machine_name = machine_name
+        self.protocol = PROTOCOLS[machine_name]()
+        keymap = machine_keymap(self.protocol.MACHINE_CLASS, machine_name)
+        # Steno key -> machine key.
+        machine_keys = {}
+        for action, keys in keymap.get_mappings().items():
+            if keys:
+                machine_keys[action] = keys[0]
+        self.strokes = [[machine_keys[k] for k in steno_keys]
+                        for steno_keys in strokes]
+        self.rate = rate
+        self.burst_size = max(1, burst_size)
+        self.noise = noise
+        self.partial = partial
+        self.truncate = truncate
+        self.gap = gap
+        self.sent_times = []
+        self.noise_count = 0
+        self.partial_count = 0
+        self.truncated_count = 0
+        self.pty = PtyPair()
+        self._rnd = random.Random(seed)
+        self._finished = threading.Event()
+        if machine_name == 'Stentura':
+            self._server = StenturaServer()
+            self._server_thread = threading.Thread(target=self._serve,
+                                                   name='StenturaServer')
+            self._server_thread.daemon = True
+            self._server_thread.start()
+        else:
+            self._server = None
+
+    @property
+    def port(self):
+        return self.pty.name
+
+    def _packets(self, strokes):
+        '''Yield the chunks of data to send for <strokes>.'''
+        rnd = self._rnd
+        for keys in strokes:
+            packet = self.protocol.encode(keys)
+            if self._server is None and rnd.random() < self.noise:
+                self.noise_count += 1
+                yield bytes(rnd.randrange(256) for n in range(rnd.randint(1, 4)))
+            if self._server is None and len(packet) > 1 and \
+               rnd.random() < self.truncate:
+                self.truncated_count += 1
+                yield packet[:rnd.randrange(1, len(packet))]
+            elif len(packet) > 1 and rnd.random() < self.partial:
+                self.partial_count += 1
+                split = rnd.randrange(1, len(packet))
+                yield packet[:split]
+                yield None
+                yield packet[split:]
+            else:
+                yield packet
+
+    def _write(self, data):
+        if self._server is None:
+            self.pty.write(data)
+        else:
+            # Stentura: strokes are written to the realtime file.
+            self._server.append(data)
+
+    def _send(self, strokes):
+        data = bytearray()
+        for chunk in self._packets(strokes):
+            if chunk is not None:
+                data += chunk
+                continue
+            # Partial packet, send what we have so far.
+            self._write(data)
+            del data[:]
+            time.sleep(self.gap)
+        self._write(data)
+
+    def _serve(self):
+        rnd = random.Random(self._rnd.random())
+        header_size = StenturaServer.HEADER_STRUCT.size
+        while not self._finished.is_set():
+            request = self.pty.read_exactly(4, timeout=0.1)
+            if len(request) < 4:
+                continue
+            length = int.from_bytes(request[2:4], 'little')
+            if length < header_size:
+                continue
+            request += self.pty.read_exactly(length - 4, timeout=0.1)
+            if len(request) < length:
+                continue
+            response = self._server.respond(request)
+            if response is None:
+                continue
+            if len(response) > 14 and rnd.random() < self.truncate:
+                self.truncated_count += 1
+                response = response[:rnd.randrange(1, len(response))]
+            self.pty.write(response)
+
+    def run(self):
+        start_time = time.perf_counter()
+        for n in range(0, len(self.strokes), self.burst_size):
+            if self._finished.is_set():
+                break
+            if self.rate:
+                delay = start_time + n / self.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            strokes = self.strokes[n:n + self.burst_size]
+            # Note: the driver may receive the strokes
+            # before the write returns.
+            self.sent_times.extend([time.perf_counter()] * len(strokes))
+            self._send(strokes)
+
+    def close(self):
+        self._finished.set()
+        if self._server is not None:
+            self._server.close()
+            self._server_thread.join()
+        if self.is_alive():
+            # Note: may be blocked writing to the pty.
+            self.join(1)
+        self.pty.close()
@@ -0,0 +1,57 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Simulate a serial stenotype machine over a pseudo-terminal.
+
+The path of the serial port to configure in Plover is printed on
+startup, strokes are replayed once it's opened (press enter).
+"""
+
+import argparse
+
+from benchmarks import setup
+from benchmarks.simulator import Simulator, load_strokes, synthetic_strokes
+from benchmarks.simulator.protocols import PROTOCOLS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('machine', choices=sorted(PROTOCOLS),
+                        help='machine protocol')
+    parser.add_argument('-l', '--log', metavar='STROKES_LOG',
+                        help='replay the strokes of a Plover strokes log')
+    parser.add_argument('-n', '--strokes', type=int, default=1000,
+                        help='number of synthetic strokes')
+    parser.add_argument('-r', '--rate', type=float, default=5,
+                        help='strokes per second (0 for as fast as possible)')
+    parser.add_argument('-b', '--burst-size', type=int, default=1,
+                        help='number of strokes sent at once')
+    parser.add_argument('--noise', type=float, default=0,
+                        help='probability of injecting noise before a packet')
+    parser.add_argument('--partial', type=float, default=0,
+                        help='probability of sending a packet in 2 parts')
+    parser.add_argument('--truncate', type=float, default=0,
+                        help='probability of truncating a packet')
+    args = parser.parse_args()
+    setup()
+    if args.log is None:
+        strokes = synthetic_strokes(args.strokes)
+    else:
+        strokes = load_strokes(args.log)
+    simulator = Simulator(args.machine, strokes, rate=args.rate,
+                          burst_size=args.burst_size, noise=args.noise,
+                          partial=args.partial, truncate=args.truncate)
+    print('serial port: %s' % simulator.port)
+    try:
+        input('press enter to start sending %u strokes' % len(strokes))
+        simulator.start()
+        simulator.join()
+        input('done, press enter to exit')
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        simulator.close()
+
+
+if __name__ == '__main__':
+    main()
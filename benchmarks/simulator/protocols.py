@@ -0,0 +1,167 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Wire formats of the serial machines protocols.
+
+Each protocol encodes a stroke (a sequence of machine keys) into the
+bytes the machine would send. Stentura machines do not stream strokes,
+but answer requests: see `StenturaServer`.
+"""
+
+import struct
+import threading
+
+from plover.machine import geminipr, passport, procat, stentura, txbolt
+
+
+class Protocol(object):
+
+    # Machine plugin name (see `setup.cfg`).
+    NAME = None
+    MACHINE_CLASS = None
+
+    def encode(self, keys):
+        """Return the packet for the stroke <keys>."""
+        raise NotImplementedError()
+
+
+class GeminiPr(Protocol):
+
+    NAME = 'Gemini PR'
+    MACHINE_CLASS = geminipr.GeminiPr
+
+    def encode(self, keys):
+        packet = bytearray(geminipr.BYTES_PER_STROKE)
+        packet[0] = 0x80
+        for key in keys:
+            n = geminipr.STENO_KEY_CHART.index(key)
+            packet[n // 7] |= 0x40 >> (n % 7)
+        return bytes(packet)
+
+
+class TxBolt(Protocol):
+
+    NAME = 'TX Bolt'
+    MACHINE_CLASS = txbolt.TxBolt
+
+    def __init__(self):
+        # Last key set sent (the last possible one
+        # if the previous stroke is known to be finished).
+        self._last_key_set = 3
+
+    def encode(self, keys):
+        # Note: like the real thing, only non-empty key sets are sent,
+        # so the end of a stroke is only detected when the next one
+        # starts, or on timeout (unless the last key set is used).
+        key_sets = [0] * 4
+        for key in keys:
+            n = txbolt.STENO_KEY_CHART.index(key)
+            key_sets[n // 6] |= 1 << (n % 6)
+        packet = bytearray(n << 6 | bits
+                           for n, bits in enumerate(key_sets)
+                           if bits)
+        if self._last_key_set < packet[0] >> 6:
+            # The stroke starts with a later key set than the
+            # previous one ended with: a zero byte is sent first,
+            # so the 2 strokes are not merged.
+            packet.insert(0, 0)
+        self._last_key_set = packet[-1] >> 6
+        return bytes(packet)
+
+
+class Passport(Protocol):
+
+    NAME = 'Passport'
+    MACHINE_CLASS = passport.Passport
+
+    def encode(self, keys):
+        return ('<123/%s/0>' % ''.join(key + 'f' for key in keys)).encode('latin-1')
+
+
+class ProCAT(Protocol):
+
+    NAME = 'ProCAT'
+    MACHINE_CLASS = procat.ProCAT
+
+    def encode(self, keys):
+        packet = bytearray(procat.BYTES_PER_STROKE)
+        packet[3] = 0xff
+        for key in keys:
+            n = procat.STENO_KEY_CHART.index(key)
+            packet[n // 8] |= 0x80 >> (n % 8)
+        return bytes(packet)
+
+
+class Stentura(Protocol):
+
+    NAME = 'Stentura'
+    MACHINE_CLASS = stentura.Stentura
+
+    def encode(self, keys):
+        # Note: this is the format of the strokes in the realtime file.
+        packet = bytearray(b'\xc0' * 4)
+        for key in keys:
+            n = stentura._STENO_KEY_CHART.index(key)
+            packet[n // 6] |= 0x20 >> (n % 6)
+        return bytes(packet)
+
+
+PROTOCOLS = {
+    protocol.NAME: protocol
+    for protocol in (GeminiPr, TxBolt, Passport, ProCAT, Stentura)
+}
+
+
+class StenturaServer(object):
+    """Answer the requests of a Stentura driver.
+
+    Strokes are appended to the realtime file with `append`. A READC
+    request at the end of the file is held (like a real machine does)
+    until more strokes are available, or for up to <hold> seconds.
+    """
+
+    HEADER_STRUCT = struct.Struct('<2B7H')
+    RESPONSE_STRUCT = struct.Struct('<2B5H')
+
+    def __init__(self, hold=0.5):
+        self.hold = hold
+        self._file = bytearray()
+        self._changed = threading.Condition()
+        self._closed = False
+
+    def append(self, data):
+        with self._changed:
+            self._file.extend(data)
+            self._changed.notify_all()
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def _read_data(self, start, size):
+        with self._changed:
+            if start >= len(self._file) and not self._closed:
+                self._changed.wait(self.hold)
+            return bytes(self._file[start:start + size])
+
+    def respond(self, request):
+        """Return the response to <request>, or None if it's invalid.
+
+        <request> must be a complete request packet.
+        """
+        (soh, seq, length, action,
+         p1, p2, p3, p4, p5) = self.HEADER_STRUCT.unpack_from(request)
+        if soh != 1 or stentura._crc(request, 1, 17) != 0:
+            return None
+        data = b''
+        if action == stentura._READC:
+            data = self._read_data(p4 * 512 + p5, min(p3, 512))
+        response = bytearray(self.RESPONSE_STRUCT.pack(
+            1, seq, 14 + (len(data) + 2 if data else 0),
+            action, 0, len(data), 0))
+        response += struct.pack('<H', stentura._crc(response, 1, 11))
+        if data:
+            response += data
+            response += struct.pack('<H', stentura._crc(data))
+        return bytes(response)
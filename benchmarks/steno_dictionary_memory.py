@@ -0,0 +1,91 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Compare the memory used by the default and compact StenoDictionary layouts.
+
+Measures are done with `tracemalloc`, so only Python allocations
+made while filling each dictionary are accounted for. Each layout
+is measured with and without its (lazily built) reverse indexes.
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from plover.dictionary.base import load_dictionary
+from plover.steno_dictionary import StenoDictionary
+
+from benchmarks import setup, synthetic_entries, timed
+
+
+def measure(make_dictionary):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        timings = {}
+        with timed(timings, 'fill'):
+            d = make_dictionary()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return d, size, timings['fill']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--entries', type=int, default=200000,
+                        help='number of synthetic entries')
+    parser.add_argument('dictionaries', nargs='*',
+                        help='use those dictionaries instead of synthetic ones')
+    args = parser.parse_args()
+    setup()
+    if args.dictionaries:
+        sources = [
+            (resource, lambda resource=resource, compact=False:
+             load_dictionary(resource, threaded_save=False, compact=compact))
+            for resource in args.dictionaries
+        ]
+    else:
+        entries = synthetic_entries(args.entries)
+        def make_synthetic(compact=False):
+            d = StenoDictionary()
+            if compact:
+                d.use_compact_storage()
+            # Fresh copies of the strokes, like a parser would create.
+            d.update((tuple(s.encode().decode() for s in k), v.encode().decode())
+                     for k, v in entries)
+            return d
+        sources = [('%u synthetic entries' % args.entries, make_synthetic)]
+    for name, make_dictionary in sources:
+        print(name)
+        results = {}
+        for layout, compact, reverse_index in (
+            ('default', False, False),
+            ('compact', True, False),
+            ('default+reverse', False, True),
+            ('compact+reverse', True, True),
+        ):
+            def make():
+                d = make_dictionary(compact=compact)
+                if reverse_index:
+                    d.build_reverse_index()
+                return d
+            d, size, fill_time = measure(make)
+            lookup_keys = [k for k, v in zip(d, range(10000))]
+            timings = {}
+            with timed(timings, 'lookup'):
+                for k in lookup_keys:
+                    d.get(k)
+            results[layout] = size
+            print('  %-16s %8.1f MB, filled in %.3fs, %.2fus per lookup' % (
+                layout, size / 1024 / 1024, fill_time,
+                timings['lookup'] * 1e6 / max(1, len(lookup_keys))))
+            del d
+        for suffix in ('', '+reverse'):
+            print('  compact%s layout uses %.0f%% of the default%s layout memory' % (
+                suffix, 100 * results['compact' + suffix] / results['default' + suffix], suffix))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the Stentura protocol, against a simulated machine.
+
+Two scenarios are timed, with the current implementation and the
+previous one (byte by byte CRC, stroke by stroke parsing, and the
+backlog copied into a growing buffer on connect):
+
+- catch-up: connecting to a machine with a backlog of strokes in its
+  realtime file, until ready
+- realtime: receiving strokes, written by the machine in bursts
+"""
+
+import argparse
+from contextlib import contextmanager
+import random
+import struct
+import threading
+from unittest import mock
+
+from plover.machine import stentura
+
+from benchmarks import timed
+
+
+# Used by the simulated machine, whichever implementation is measured.
+_crc = stentura._crc
+
+class SimulatedStentura(object):
+    """In-memory serial port, answering like a Stentura machine.
+
+    Once the backlog has been read, <bursts> of strokes are appended
+    to the realtime file, one at a time, each time a READC request
+    at the end of the file follows an empty response. <stop> is set
+    when there are no more.
+    """
+
+    def __init__(self, backlog, bursts, stop):
+        self.timeout = None
+        self._file = bytearray(backlog)
+        self._bursts = list(reversed(bursts))
+        self._stop = stop
+        self._out = memoryview(b'')
+        self._last_empty = False
+        # Response data sections (with their CRC), by position.
+        self._data = {}
+
+    def flushInput(self):
+        pass
+
+    def flushOutput(self):
+        pass
+
+    def write(self, request):
+        seq, length, action = struct.unpack_from('<BHH', request, 1)
+        data = b''
+        if action == stentura._READC:
+            size, block, byte = struct.unpack_from('<3H', request, 10)
+            start = block * 512 + byte
+            if start >= len(self._file) and self._last_empty:
+                if self._bursts:
+                    self._file.extend(self._bursts.pop())
+                else:
+                    self._stop.set()
+            key = (start, min(start + size, len(self._file)))
+            data = self._data.get(key)
+            if data is None:
+                data = bytes(self._file[key[0]:key[1]])
+                if data:
+                    data += struct.pack('<H', _crc(data))
+                self._data[key] = data
+            self._last_empty = not data
+        response = bytearray(struct.pack(
+            '<2B5H', 1, seq, 14 + len(data), action, 0,
+            max(0, len(data) - 2), 0))
+        response += struct.pack('<H', _crc(response, 1, 11))
+        response += data
+        self._out = memoryview(bytes(response))
+        return len(request)
+
+    def read(self, count):
+        data, self._out = self._out[:count], self._out[count:]
+        return bytes(data)
+
+
+def random_strokes_data(rnd, count):
+    return bytes(rnd.choice((0xc0, 0xc0, 0xc1, 0xc2, 0xc4, 0xc8, 0xd0, 0xe0))
+                 for n in range(count * 4))
+
+
+# Previous implementation.
+
+def previous_crc(data, offset=None, size=None):
+    if offset is None:
+        offset = 0
+    if size is None:
+        size = len(data) - offset
+    checksum = 0
+    for n in range(offset, offset + size):
+        b = data[n]
+        checksum = (stentura._CRC_TABLE[(checksum ^ b) & 0xff] ^
+                    ((checksum >> 8) & 0xff))
+    return checksum
+
+def previous_parse_strokes(data):
+    strokes = []
+    if (len(data) % 4) != 0:
+        raise stentura._ProtocolViolationException()
+    for b in data:
+        if (b & 0b11000000) != 0b11000000:
+            raise stentura._ProtocolViolationException()
+    for a, b, c, d in zip(*([iter(data)] * 4)):
+        strokes.append(stentura._parse_stroke(a, b, c, d))
+    return strokes
+
+def previous_read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte):
+    bytes_read = 0
+    while True:
+        packet = stentura._make_read(request_buf, seq(), block, byte, length=512)
+        response = stentura._send_receive(port, stop, packet, response_buf)
+        p1 = stentura._SHORT_STRUCT.unpack(response[8:10])[0]
+        if not ((p1 == 0 and len(response) == 14) or
+                (p1 == len(response) - 16)):
+            raise stentura._ProtocolViolationException()
+        if p1 == 0:
+            return block, byte, stentura.buffer(stroke_buf, 0, bytes_read)
+        data = stentura.buffer(response, 14, p1)
+        stentura._write_to_buffer(stroke_buf, bytes_read, data)
+        bytes_read += len(data)
+        byte += p1
+        if byte >= 512:
+            block += 1
+            byte -= 512
+
+def previous_loop(port, stop, callback, ready_callback, timeout=1):
+    if stop.wait(timeout):
+        raise stentura._StopException()
+    port.flushInput()
+    port.flushOutput()
+    port.timeout = timeout
+    request_buf, response_buf = bytearray(1024), bytearray(1024)
+    stroke_buf = bytearray(1024)
+    seq = stentura._SequenceCounter()
+    request = stentura._make_open(request_buf, seq(), b'A', b'REALTIME.000')
+    stentura._send_receive(port, stop, request, response_buf)
+    block, byte, _ = previous_read(port, stop, seq, request_buf,
+                                   response_buf, stroke_buf, 0, 0)
+    ready_callback()
+    while True:
+        block, byte, data = previous_read(port, stop, seq, request_buf,
+                                          response_buf, stroke_buf, block, byte)
+        for stroke in previous_parse_strokes(data):
+            callback(stroke)
+
+@contextmanager
+def previous_implementation():
+    with mock.patch.object(stentura, '_crc', previous_crc), \
+         mock.patch.object(stentura, '_parse_strokes', previous_parse_strokes):
+        yield previous_loop
+
+
+@contextmanager
+def current_implementation():
+    yield stentura._loop
+
+
+def run(loop, backlog, bursts):
+    """Run the protocol loop, and return the number of strokes received."""
+    stop = threading.Event()
+    port = SimulatedStentura(backlog, bursts, stop)
+    strokes = []
+    def ready():
+        if not bursts:
+            stop.set()
+    try:
+        loop(port, stop, strokes.append, ready, timeout=0)
+    except stentura._StopException:
+        pass
+    return len(strokes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-b', '--backlog', type=int, default=50000,
+                        help='number of strokes in the backlog')
+    parser.add_argument('-n', '--strokes', type=int, default=50000,
+                        help='number of strokes received in realtime')
+    parser.add_argument('-s', '--burst-size', type=int, default=32,
+                        help='number of strokes written by the machine at once')
+    args = parser.parse_args()
+    rnd = random.Random(0)
+    backlog = random_strokes_data(rnd, args.backlog)
+    bursts = [random_strokes_data(rnd, min(args.burst_size, args.strokes - n))
+              for n in range(0, args.strokes, args.burst_size)]
+    for name, implementation in (('previous', previous_implementation),
+                                 ('current', current_implementation)):
+        timings = {}
+        with implementation() as loop:
+            with timed(timings, 'catch-up'):
+                run(loop, backlog, [])
+            with timed(timings, 'realtime'):
+                count = run(loop, b'', bursts)
+        assert count == args.strokes, count
+        print('%-8s: catch-up %6.3fs (%5.1f blocks/s), realtime %5.2fus per stroke' % (
+            name, timings['catch-up'],
+            len(backlog) / 512 / timings['catch-up'],
+            timings['realtime'] * 1e6 / args.strokes))
+
+
+if __name__ == '__main__':
+    main()
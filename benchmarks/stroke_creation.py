@@ -0,0 +1,66 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Measure the creation of strokes from machine keys, with and without
+the strokes cache.
+
+Like actual writing, a few thousands distinct chords are used over
+and over, in random order.
+"""
+
+import argparse
+import random
+
+from plover import system
+from plover.steno import Stroke
+
+from benchmarks import setup, timed
+
+
+def random_chords(count, seed=0):
+    rnd = random.Random(seed)
+    chords = set()
+    while len(chords) < count:
+        chords.add(frozenset(rnd.sample(system.KEYS, rnd.randint(1, 7))))
+    return [list(chord) for chord in chords]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-c', '--chords', type=int, default=3000,
+                        help='number of distinct chords')
+    parser.add_argument('-n', '--strokes', type=int, default=200000,
+                        help='number of strokes created')
+    args = parser.parse_args()
+    setup()
+    chords = random_chords(args.chords)
+    rnd = random.Random(0)
+    strokes = [rnd.choice(chords) for n in range(args.strokes)]
+    timings = {}
+    with timed(timings, 'uncached'):
+        for keys in strokes:
+            Stroke._create(keys)
+    Stroke.cache_clear()
+    with timed(timings, 'cached'):
+        for keys in strokes:
+            Stroke(keys)
+    masks = [Stroke(keys).mask for keys in strokes]
+    with timed(timings, 'from mask'):
+        for mask in masks:
+            Stroke.from_mask(mask)
+    uncached = [Stroke._create(keys) for keys in strokes[:10000]]
+    cached = [Stroke(keys) for keys in strokes[:10000]]
+    with timed(timings, 'compare (uncached)'):
+        for s1, s2 in zip(uncached, reversed(uncached)):
+            s1 == s2
+    with timed(timings, 'compare (cached)'):
+        for s1, s2 in zip(cached, reversed(cached)):
+            s1 == s2
+    for name in ('uncached', 'cached', 'from mask'):
+        print('  %-18s: %6.2fus per stroke' % (name, timings[name] * 1e6 / len(strokes)))
+    for name in ('compare (uncached)', 'compare (cached)'):
+        print('  %-18s: %6.2fus per comparison' % (name, timings[name] * 1e6 / len(cached)))
+
+
+if __name__ == '__main__':
+    main()
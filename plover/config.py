@@ -26,6 +26,10 @@ MACHINE_CONFIG_SECTION = 'Machine Configuration'
 
 LEGACY_DICTIONARY_CONFIG_SECTION = 'Dictionary Configuration'
 
+DICTIONARIES_CONFIG_SECTION = 'Dictionaries'
+# In milliseconds.
+DEFAULT_DICTIONARIES_SAVE_DELAY = 500
+
 LOGGING_CONFIG_SECTION = 'Logging Configuration'
 
 OUTPUT_CONFIG_SECTION = 'Output Configuration'
@@ -354,6 +358,14 @@ class Config(object):
         plugin_option('system_name', 'system', DEFAULT_SYSTEM_NAME, 'System', 'name'),
         system_keymap_option(),
         dictionaries_option(),
+        # Dictionaries.
+        int_option('dictionaries_save_delay', DEFAULT_DICTIONARIES_SAVE_DELAY,
+                   0, None, DICTIONARIES_CONFIG_SECTION, 'save_delay'),
+        boolean_option('watch_dictionaries', True, DICTIONARIES_CONFIG_SECTION, 'watch'),
+        boolean_option('compact_dictionaries', False, DICTIONARIES_CONFIG_SECTION, 'compact'),
+        boolean_option('prebuild_reverse_index', False, DICTIONARIES_CONFIG_SECTION),
+        int_option('dictionaries_loading_processes', 0, 0, None,
+                   DICTIONARIES_CONFIG_SECTION, 'loading_processes'),
     ])
 
     def _lookup(self, key):
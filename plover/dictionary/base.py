@@ -9,11 +9,24 @@
 
 from os.path import splitext
 import functools
+import inspect
+import marshal
 import threading
+import time
 
+from plover import log
+from plover.dictionary import cache
 from plover.registry import registry
 
 
+# Default delay before saving a dictionary, in seconds.
+DEFAULT_SAVE_DELAY = 0.5
+
+# Default delay without changes before compacting
+# a journaled dictionary (see `DictionarySaver`), in seconds.
+DEFAULT_COMPACT_DELAY = 60
+
+
 def _get_dictionary_class(filename):
     extension = splitext(filename)[1].lower()[1:]
     try:
@@ -25,20 +38,153 @@ def _get_dictionary_class(filename):
                                   registry.list_plugins('dictionary'))))
     return dict_module
 
-def _locked(fn):
-    lock = threading.Lock()
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        with lock:
-            fn(*args, **kwargs)
-    return wrapper
-
-def _threaded(fn):
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        t = threading.Thread(target=fn, args=args, kwargs=kwargs)
-        t.start()
-    return wrapper
+def _load_accepts(dict_class, name):
+    '''Return True if <dict_class> `load` method accepts a <name> parameter.
+
+    Note: plugins may not support the newer parameters.
+    '''
+    try:
+        parameters = inspect.signature(dict_class.load).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in parameters or any(p.kind == p.VAR_KEYWORD
+                                     for p in parameters.values())
+
+def _is_cacheable(dict_class):
+    # Snapshots are restored with `load(resource, compact=..., snapshot=...)`.
+    return dict_class.cacheable and \
+        _load_accepts(dict_class, 'compact') and \
+        _load_accepts(dict_class, 'snapshot')
+
+
+class DictionarySaver(object):
+    '''Save dictionaries in the background, from a single worker thread.
+
+    Each save request is delayed by <delay> seconds, and the delay
+    restarted by any new request for the same dictionary: so a burst
+    of changes only results in one save, once things have settled.
+
+    Journaled dictionaries (see `StenoDictionary.save`) are compacted
+    (with a full save) once they have been idle for <compact_delay>
+    seconds, and when flushing: so the journal does not linger, and
+    the file stays up to date for other programs.
+    '''
+
+    def __init__(self, delay=DEFAULT_SAVE_DELAY,
+                 compact_delay=DEFAULT_COMPACT_DELAY):
+        self.delay = delay
+        self.compact_delay = compact_delay
+        self._condition = threading.Condition()
+        # Save method -> [deadline, full save].
+        self._pending = {}
+        # Save method -> compaction deadline, for journaled
+        # dictionaries with changes only saved to the journal.
+        self._uncompacted = {}
+        self._saving = 0
+        self._thread = None
+
+    def schedule(self, save, full=False):
+        '''Schedule a call to <save> (a dictionary save method).'''
+        with self._condition:
+            deadline = time.monotonic() + self.delay
+            # Still in use: compaction is rescheduled after the save.
+            self._uncompacted.pop(save, None)
+            request = self._pending.get(save)
+            if request is None:
+                self._pending[save] = [deadline, full]
+            else:
+                request[0] = deadline
+                request[1] = request[1] or full
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='DictionarySaver',
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        '''Immediately save all pending dictionaries, and wait for completion.
+
+        Journaled dictionaries are compacted.
+
+        Return False if <timeout> (in seconds) expired first.
+        '''
+        with self._condition:
+            for save, request in self._pending.items():
+                request[0] = 0
+                request[1] = request[1] or _is_journaled(save)
+            for save in self._uncompacted:
+                self._pending[save] = [0, True]
+            self._uncompacted.clear()
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._saving, timeout)
+
+    def _run(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                due = [
+                    (save, full)
+                    for save, (deadline, full) in self._pending.items()
+                    if deadline <= now
+                ]
+                for save in list(self._uncompacted):
+                    if self._uncompacted[save] <= now:
+                        del self._uncompacted[save]
+                        due.append((save, True))
+                if not due:
+                    deadlines = [deadline for deadline, full
+                                 in self._pending.values()]
+                    deadlines.extend(self._uncompacted.values())
+                    timeout = min(deadlines) - now if deadlines else None
+                    self._condition.wait(timeout)
+                    continue
+                for save, full in due:
+                    self._pending.pop(save, None)
+                self._saving += len(due)
+                self._condition.release()
+                uncompacted = []
+                try:
+                    for save, full in due:
+                        try:
+                            # Note: not all formats support full saves.
+                            if full:
+                                save(full=True)
+                            else:
+                                save()
+                        except Exception:
+                            log.error('saving dictionary %s failed',
+                                      getattr(save, '__self__', save),
+                                      exc_info=True)
+                        else:
+                            if not full and _is_journaled(save):
+                                uncompacted.append(save)
+                finally:
+                    self._condition.acquire()
+                    self._saving -= len(due)
+                    deadline = time.monotonic() + self.compact_delay
+                    for save in uncompacted:
+                        # Unless changed again in the meantime.
+                        if save not in self._pending:
+                            self._uncompacted[save] = deadline
+                    self._condition.notify_all()
+
+
+def _is_journaled(save):
+    return getattr(getattr(save, '__self__', None), 'journaled', False)
+
+
+# Shared by all dictionaries.
+dictionary_saver = DictionarySaver()
+
+
+def _background_save(dictionary):
+    save = dictionary.save
+    @functools.wraps(save)
+    def wrapper(full=False):
+        dictionary_saver.schedule(save, full=full)
+    dictionary.save = wrapper
 
 def create_dictionary(resource, threaded_save=True):
     '''Create a new dictionary.
@@ -50,15 +196,42 @@ def create_dictionary(resource, threaded_save=True):
     '''
     d = _get_dictionary_class(resource).create(resource)
     if threaded_save:
-        d.save = _threaded(_locked(d.save))
+        _background_save(d)
     return d
 
-def load_dictionary(resource, threaded_save=True):
+def load_dictionary(resource, threaded_save=True, compact=False, parser=None):
     '''Load a dictionary from a file.
 
     The format is inferred from the extension.
+
+    If <compact> is True, the dictionary entries are
+    kept in a more memory efficient storage.
+
+    If enabled, and supported by the format, the
+    dictionaries cache is used (see `plover.dictionary.cache`).
+
+    If set, and supported by the format, <parser> is called with
+    the dictionary class and resource, and must return the parsed
+    dictionary as a marshaled snapshot (see `parse_dictionary`):
+    this is used to parse dictionaries in other processes.
     '''
-    d = _get_dictionary_class(resource).load(resource)
+    dict_class = _get_dictionary_class(resource)
+    cacheable = _is_cacheable(dict_class)
+    if cacheable and cache.enabled():
+        d = cache.load(dict_class, resource, compact=compact, parser=parser)
+    elif cacheable and parser is not None:
+        d = dict_class.load(resource, compact=compact,
+                            snapshot=marshal.loads(parser(dict_class, resource)))
+    elif compact and _load_accepts(dict_class, 'compact'):
+        d = dict_class.load(resource, compact=True)
+    else:
+        d = dict_class.load(resource)
+        if compact and hasattr(d, 'use_compact_storage'):
+            d.use_compact_storage()
     if not d.readonly and threaded_save:
-        d.save = _threaded(_locked(d.save))
+        _background_save(d)
     return d
+
+def parse_dictionary(dict_class, resource):
+    '''Parse a dictionary, and return it as a marshaled snapshot.'''
+    return marshal.dumps(dict_class.load(resource)._snapshot())
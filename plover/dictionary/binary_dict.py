@@ -0,0 +1,287 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Compiled, memory-mapped, read-only dictionary format.
+
+The whole file is mapped in memory, and entries are looked up in place,
+so loading is near instantaneous whatever the size of the dictionary,
+and the pages are shared between processes using the same file.
+
+All integers are 32 bits, little-endian. The file layout is:
+
+- header: magic, version, number of entries, longest key,
+  number of hash table slots, number of prefixes, number
+  of prefix hash table slots, and size of the strings table
+- entries: (hash, key offset, key size, value offset, value size)
+- entries hash table: 1-based index of the entry, or 0 for an empty slot
+- prefixes: (hash, prefix offset, prefix size)
+- prefixes hash table: 1-based index of the prefix, or 0 for an empty slot
+- strings table: UTF-8 encoded keys (strokes joined with `/`), prefixes,
+  and (deduplicated) translations
+
+Both hash tables use open addressing with linear probing, and
+the CRC32 of the encoded key as hash.
+
+A dictionary in any other supported format can be converted with:
+
+    plover -s plover_compile_dictionary input.json output.bdict
+
+"""
+
+from array import array
+from collections.abc import ItemsView, Mapping
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from plover.steno import STROKE_DELIMITER
+from plover.steno_dictionary import StenoDictionary
+
+
+MAGIC = b'PLVRBDIC'
+VERSION = 1
+
+_HEADER = struct.Struct('<8s8I')
+_ENTRY_SIZE = 5
+_PREFIX_SIZE = 3
+
+
+def _encode_key(key):
+    return STROKE_DELIMITER.join(key).encode('utf-8')
+
+def _table_size(count):
+    # Power of 2, with a load factor of at most 50%.
+    return 1 << max(1, (2 * count).bit_length())
+
+def _build_table(hashes):
+    size = _table_size(len(hashes))
+    mask = size - 1
+    table = array('I', bytes(4 * size))
+    for n, h in enumerate(hashes):
+        slot = h & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = n + 1
+    return table
+
+
+def write_binary_dictionary(filename, entries):
+    '''Compile <entries> ((key, translation) pairs) to <filename>.'''
+    strings = bytearray()
+    string_offsets = {}
+    def add_string(data):
+        offset = string_offsets.get(data)
+        if offset is None:
+            offset = string_offsets[data] = len(strings)
+            strings.extend(data)
+        return offset, len(data)
+    records = array('I')
+    hashes = []
+    prefixes = {}
+    longest_key = 0
+    for key, value in entries:
+        key = tuple(key)
+        longest_key = max(longest_key, len(key))
+        data = _encode_key(key)
+        h = zlib.crc32(data)
+        hashes.append(h)
+        records.append(h)
+        records.extend(add_string(data))
+        records.extend(add_string(value.encode('utf-8')))
+        for n in range(1, len(key)):
+            prefixes[key[:n]] = True
+    prefix_records = array('I')
+    prefix_hashes = []
+    for prefix in prefixes:
+        data = _encode_key(prefix)
+        h = zlib.crc32(data)
+        prefix_hashes.append(h)
+        prefix_records.append(h)
+        prefix_records.extend(add_string(data))
+    table = _build_table(hashes)
+    prefix_table = _build_table(prefix_hashes)
+    words = array('I')
+    for part in (records, table, prefix_records, prefix_table):
+        words.extend(part)
+    if sys.byteorder != 'little':
+        words.byteswap()
+    header = _HEADER.pack(MAGIC, VERSION, len(hashes), longest_key,
+                          len(table), len(prefix_hashes), len(prefix_table),
+                          len(strings), 0)
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as fp:
+        fp.write(header)
+        words.tofile(fp)
+        fp.write(strings)
+    # Note: do not overwrite the file in place, as
+    # it may be mapped in memory by another process.
+    os.replace(tmp, filename)
+
+
+class _BinaryItemsView(ItemsView):
+
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class BinaryStorage(Mapping):
+    '''Read-only mapping of keys to translations over a compiled dictionary.'''
+
+    def __init__(self, buf):
+        self._buf = buf
+        (magic, version, entry_count, longest_key, table_size,
+         prefix_count, prefix_table_size, strings_size, reserved
+        ) = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError('not a compiled dictionary')
+        if version != VERSION:
+            raise ValueError('unsupported compiled dictionary version: %u' % version)
+        self.longest_key = longest_key
+        self._entry_count = entry_count
+        sizes = (
+            entry_count * _ENTRY_SIZE,
+            table_size,
+            prefix_count * _PREFIX_SIZE,
+            prefix_table_size,
+        )
+        offset = _HEADER.size
+        words_size = 4 * sum(sizes)
+        if len(buf) != offset + words_size + strings_size:
+            raise ValueError('invalid compiled dictionary size')
+        view = memoryview(buf)
+        if sys.byteorder == 'little':
+            words = view[offset:offset + words_size].cast('I')
+        else:
+            # Can't use the data in place.
+            words = array('I', view[offset:offset + words_size])
+            words.byteswap()
+        parts = []
+        start = 0
+        for size in sizes:
+            parts.append(words[start:start + size])
+            start += size
+        self._entries, self._table, self._prefixes, self._prefix_table = parts
+        self._strings = view[offset + words_size:]
+
+    def close(self):
+        self._entries = self._table = self._prefixes = self._prefix_table = None
+        self._strings = None
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._buf = None
+
+    def _find(self, table, records, record_size, data):
+        '''Return the record offset of <data>, or -1 if not found.'''
+        h = zlib.crc32(data)
+        mask = len(table) - 1
+        slot = h & mask
+        strings = self._strings
+        while True:
+            index = table[slot]
+            if not index:
+                return -1
+            offset = (index - 1) * record_size
+            if records[offset] == h:
+                start = records[offset + 1]
+                if strings[start:start + records[offset + 2]] == data:
+                    return offset
+            slot = (slot + 1) & mask
+
+    def _string(self, start, size):
+        return str(self._strings[start:start + size], 'utf-8')
+
+    def _key(self, offset):
+        entries = self._entries
+        return tuple(self._string(entries[offset + 1], entries[offset + 2])
+                     .split(STROKE_DELIMITER))
+
+    def _value(self, offset):
+        entries = self._entries
+        return self._string(entries[offset + 3], entries[offset + 4])
+
+    def is_prefix(self, key):
+        return self._find(self._prefix_table, self._prefixes,
+                          _PREFIX_SIZE, _encode_key(key)) >= 0
+
+    def get(self, key, fallback=None):
+        offset = self._find(self._table, self._entries,
+                            _ENTRY_SIZE, _encode_key(key))
+        if offset < 0:
+            return fallback
+        return self._value(offset)
+
+    def __getitem__(self, key):
+        offset = self._find(self._table, self._entries,
+                            _ENTRY_SIZE, _encode_key(key))
+        if offset < 0:
+            raise KeyError(key)
+        return self._value(offset)
+
+    def __contains__(self, key):
+        return self._find(self._table, self._entries,
+                          _ENTRY_SIZE, _encode_key(key)) >= 0
+
+    def __len__(self):
+        return self._entry_count
+
+    def __iter__(self):
+        for offset in range(0, self._entry_count * _ENTRY_SIZE, _ENTRY_SIZE):
+            yield self._key(offset)
+
+    def _iter_items(self):
+        for offset in range(0, self._entry_count * _ENTRY_SIZE, _ENTRY_SIZE):
+            yield self._key(offset), self._value(offset)
+
+    def items(self):
+        return _BinaryItemsView(self)
+
+
+class BinaryDictionary(StenoDictionary):
+
+    readonly = True
+    mergeable = False
+
+    def __init__(self):
+        super(BinaryDictionary, self).__init__()
+        self.readonly = True
+
+    def _load(self, filename):
+        with open(filename, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size:
+                buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Empty files can't be mapped.
+                buf = b''
+        if len(buf) < _HEADER.size:
+            raise ValueError('not a compiled dictionary')
+        self._dict = BinaryStorage(buf)
+        self._longest_key = self._dict.longest_key
+
+    def is_prefix(self, key):
+        return self._dict.is_prefix(key)
+
+
+def main():
+    from plover import system
+    from plover.config import DEFAULT_SYSTEM_NAME
+    from plover.dictionary.base import load_dictionary
+    from plover.registry import registry
+    parser = argparse.ArgumentParser(
+        description='Compile a dictionary to the memory-mapped binary format.')
+    parser.add_argument('-s', '--system', default=DEFAULT_SYSTEM_NAME,
+                        help='steno system used to normalize strokes')
+    parser.add_argument('input', help='dictionary to convert (e.g. a .json/.rtf file)')
+    parser.add_argument('output', help='compiled dictionary (.bdict)')
+    args = parser.parse_args()
+    registry.update()
+    system.setup(args.system)
+    d = load_dictionary(os.path.abspath(args.input), threaded_save=False)
+    write_binary_dictionary(args.output, d.items())
+    print('compiled %u entries to %s' % (len(d), args.output))
+
+
+if __name__ == '__main__':
+    main()
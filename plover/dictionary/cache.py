@@ -0,0 +1,149 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Persistent cache of parsed dictionaries.
+
+Parsing a big JSON or RTF dictionary, and normalizing all its
+strokes, is slow. So the resulting entries are saved to a cache
+file (using `marshal`, which is very fast to load), and used
+instead of the original dictionary as long as it did not change.
+
+Along with the entries, the stroke prefixes index (see
+`StenoDictionary.is_prefix`) is saved too, since it is
+almost as costly to rebuild, as well as the number of
+keys of each length.
+
+A cache file is only used if its signature matches: same cache
+format and Plover version, same steno system (since strokes are
+normalized according to it), and same dictionary path, modification
+time and size.
+
+The cache is disabled until `setup` is called.
+"""
+
+import hashlib
+import marshal
+import os
+import threading
+import time
+
+from plover import log, system, __version__
+from plover.resource import resource_filename
+from plover.steno_dictionary import JOURNAL_SUFFIX
+
+
+CACHE_VERSION = 3
+
+_directory = None
+
+_lock = threading.Lock()
+_stats = [0, 0, 0.0, 0.0]
+
+
+def setup(directory):
+    '''Enable the cache, storing files in <directory> (None to disable).'''
+    global _directory
+    if directory is not None and not os.path.exists(directory):
+        os.makedirs(directory)
+    _directory = directory
+
+def enabled():
+    return _directory is not None
+
+def stats():
+    '''Return (hits, misses, time spent on hits, time spent on misses).'''
+    with _lock:
+        return tuple(_stats)
+
+def _update_stats(hit, duration):
+    with _lock:
+        if hit:
+            _stats[0] += 1
+            _stats[2] += duration
+        else:
+            _stats[1] += 1
+            _stats[3] += duration
+
+def _system_signature():
+    return hashlib.sha1(repr((
+        system.NAME,
+        system.KEYS,
+        sorted(system.IMPLICIT_HYPHEN_KEYS),
+        sorted(system.NUMBERS.items()),
+        system.NUMBER_KEY,
+    )).encode('utf-8')).hexdigest()
+
+def cache_filename(filename):
+    '''Return the path of the cache file used for dictionary <filename>.'''
+    name = hashlib.sha1(filename.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(_directory, name + '.cache')
+
+def _signature(filename):
+    st = os.stat(filename)
+    # Snapshots include the replayed journal, if any.
+    try:
+        journal_st = os.stat(filename + JOURNAL_SUFFIX)
+    except FileNotFoundError:
+        journal = None
+    else:
+        journal = (journal_st.st_mtime_ns, journal_st.st_size)
+    return (CACHE_VERSION, __version__, _system_signature(),
+            filename, st.st_mtime_ns, st.st_size, journal)
+
+def _read(cache_file, signature):
+    try:
+        with open(cache_file, 'rb') as fp:
+            if marshal.load(fp) != signature:
+                return None
+            # Note: much faster than `marshal.load(fp)`.
+            return marshal.loads(fp.read())
+    except FileNotFoundError:
+        return None
+    except Exception:
+        log.warning('discarding invalid dictionary cache: %s',
+                    cache_file, exc_info=True)
+        return None
+
+def _write(cache_file, signature, data):
+    # Unique temporary name, since several
+    # dictionaries are loaded in parallel.
+    tmp = '%s.%u.%u.tmp' % (cache_file, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, 'wb') as fp:
+            marshal.dump(signature, fp)
+            fp.write(data)
+        os.replace(tmp, cache_file)
+    except Exception:
+        log.warning('saving dictionary cache %s failed',
+                    cache_file, exc_info=True)
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+def load(dict_class, resource, compact=False, parser=None):
+    '''Load a dictionary, using the cache if it is up to date.
+
+    On a miss, <parser> is used if set, see `load_dictionary`.
+    '''
+    start_time = time.time()
+    filename = os.path.realpath(resource_filename(resource))
+    cache_file = cache_filename(filename)
+    # Note: stat the file before parsing it, so a concurrent
+    # modification can only result in a stale signature.
+    signature = _signature(filename)
+    snapshot = _read(cache_file, signature)
+    hit = snapshot is not None
+    if hit:
+        d = dict_class.load(resource, compact=compact, snapshot=snapshot)
+    elif parser is None:
+        d = dict_class.load(resource, compact=compact)
+        _write(cache_file, signature, marshal.dumps(d._snapshot()))
+    else:
+        data = parser(dict_class, resource)
+        d = dict_class.load(resource, compact=compact,
+                            snapshot=marshal.loads(data))
+        _write(cache_file, signature, data)
+    duration = time.time() - start_time
+    _update_stats(hit, duration)
+    log.debug('dictionary cache %s: %s in %.3fs',
+              'hit' if hit else 'miss', resource, duration)
+    return d
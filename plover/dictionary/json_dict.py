@@ -6,6 +6,7 @@
 """
 
 import codecs
+import re
 
 try:
     import simplejson as json
@@ -16,9 +17,139 @@ from plover.steno_dictionary import StenoDictionary
 from plover.steno import normalize_steno
 
 
+# Size of the chunks read when streaming a dictionary.
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE_RX = re.compile(r'[ \t\n\r]*')
+# Fast path for the common case: a member with
+# a string value, and no escape sequences.
+_SIMPLE_MEMBER_RX = re.compile(r'''
+[ \t\n\r]*"([^"\\\x00-\x1f]*)"
+[ \t\n\r]*:
+[ \t\n\r]*"([^"\\\x00-\x1f]*)"
+[ \t\n\r]*([,}])
+''', re.VERBOSE)
+
+
+class _NotAnObject(Exception):
+    pass
+
+
+def _skip_whitespace(buf, pos):
+    return _WHITESPACE_RX.match(buf, pos).end()
+
+def _parse_member(buf, pos, first, decode_value):
+    '''Parse an object member (general case).
+
+    Return (key, value, separator position, separator), or None
+    for the end of an empty object. Raise `IndexError` if the
+    member is incomplete, and `ValueError` if it is invalid.
+    '''
+    pos = _skip_whitespace(buf, pos)
+    if first and buf[pos] == '}':
+        return None
+    if buf[pos] != '"':
+        raise ValueError('expecting a string at %u' % pos)
+    key, pos = json.decoder.scanstring(buf, pos + 1)
+    pos = _skip_whitespace(buf, pos)
+    if buf[pos] != ':':
+        raise ValueError('expecting \':\' at %u' % pos)
+    value, pos = decode_value(buf, _skip_whitespace(buf, pos + 1))
+    pos = _skip_whitespace(buf, pos)
+    # Note: the separator must be available, so
+    # we know a number value was not truncated.
+    separator = buf[pos]
+    if separator not in ',}':
+        raise ValueError('expecting \',\' or \'}\' at %u' % pos)
+    return key, value, pos, separator
+
+def _iter_entries(fp, encoding):
+    '''Parse the JSON object in <fp>, yielding (key, value) pairs as they are read.
+
+    Raise `_NotAnObject` if the document is not a JSON object,
+    `UnicodeDecodeError` if it cannot be decoded with <encoding>,
+    and `ValueError` for invalid JSON.
+    '''
+    decoder = codecs.getincrementaldecoder(encoding)()
+    decode_value = json.JSONDecoder().raw_decode
+    match_simple_member = _SIMPLE_MEMBER_RX.match
+    buf = ''
+    eof = False
+    def fill(pos):
+        # Drop consumed data, and read the next chunk.
+        nonlocal buf, eof
+        data = fp.read(CHUNK_SIZE)
+        eof = not data
+        buf = buf[pos:] + decoder.decode(data, final=eof)
+        return 0
+    pos = fill(0)
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos < len(buf) or eof:
+            break
+        pos = fill(pos)
+    if not buf.startswith('{', pos):
+        raise _NotAnObject()
+    pos += 1
+    first = True
+    while True:
+        # Parse the next member: `"key": value,` (or the object end).
+        m = match_simple_member(buf, pos)
+        if m is not None:
+            key, value, separator = m.groups()
+            end = m.end() - 1
+        else:
+            try:
+                member = _parse_member(buf, pos, first, decode_value)
+            except (IndexError, ValueError):
+                # Incomplete or invalid member.
+                if eof:
+                    raise ValueError('invalid JSON dictionary') from None
+                pos = fill(pos)
+                continue
+            if member is None:
+                # Empty object.
+                pos = _skip_whitespace(buf, pos)
+                break
+            key, value, end, separator = member
+        yield key, value
+        pos = end
+        if separator == '}':
+            break
+        pos += 1
+        first = False
+    # Only whitespace is allowed after the object.
+    pos += 1
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos < len(buf):
+            raise ValueError('extra data at end of JSON dictionary')
+        if eof:
+            break
+        pos = fill(pos)
+
+
 class JsonDictionary(StenoDictionary):
 
+    cacheable = True
+    journaled = True
+
     def _load(self, filename):
+        # Stream the entries, to limit peak memory usage.
+        for encoding in ('utf-8', 'latin-1'):
+            with open(filename, 'rb') as fp:
+                try:
+                    self.update((normalize_steno(key), value)
+                                for key, value in _iter_entries(fp, encoding))
+                except UnicodeDecodeError:
+                    self.clear()
+                    continue
+                except _NotAnObject:
+                    # Let the full parser handle (or report) it.
+                    self._load_document(filename)
+                return
+
+    def _load_document(self, filename):
         with open(filename, 'rb') as fp:
             contents = fp.read()
         for encoding in ('utf-8', 'latin-1'):
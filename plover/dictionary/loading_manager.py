@@ -3,19 +3,47 @@
 
 """Centralized place for dictionary loading operation."""
 
+import multiprocessing
 import threading
 import time
 
-from plover.dictionary.base import load_dictionary
+from plover.dictionary import cache
+from plover.dictionary.base import load_dictionary, parse_dictionary
 from plover.exception import DictionaryLoaderException
+from plover.registry import registry
 from plover.resource import resource_timestamp
-from plover import log
+from plover.steno_dictionary import StenoDictionary
+from plover import log, system
+
+
+def _init_worker(system_name):
+    registry.update()
+    system.setup(system_name)
 
 
 class DictionaryLoadingManager(object):
+    '''Load dictionaries in parallel.
+
+    By default, each dictionary is loaded in its own thread. Since
+    parsing is CPU bound, when <processes> is not 0, dictionaries
+    (in a supported format) are instead parsed by a pool of that
+    many worker processes, started on demand during each call
+    to `load`/`load_async` (e.g. not if all dictionaries are
+    in the cache).
+
+    If <compact> is True, dictionaries are loaded with compact
+    storage (see `StenoDictionary.use_compact_storage`).
 
-    def __init__(self):
+    If <reverse_index> is True, the reverse indexes of each loaded
+    dictionary are then built in the background, instead of on
+    first use (see `StenoDictionary.build_reverse_index`).
+    '''
+
+    def __init__(self, processes=0, compact=False, reverse_index=False):
         self.dictionaries = {}
+        self.processes = processes
+        self.compact = compact
+        self.reverse_index = reverse_index
 
     def __len__(self):
         return len(self.dictionaries)
@@ -26,41 +54,168 @@ class DictionaryLoadingManager(object):
     def __contains__(self, filename):
         return filename in self.dictionaries
 
-    def start_loading(self, filename):
+    def start_loading(self, filename, parser=None):
         op = self.dictionaries.get(filename)
         if op is not None and not op.needs_reloading():
             return op
         log.info('%s dictionary: %s', 'loading' if op is None else 'reloading', filename)
-        op = DictionaryLoadingOperation(filename)
+        op = DictionaryLoadingOperation(filename, parser, self.compact,
+                                        self.reverse_index)
         self.dictionaries[filename] = op
         return op
 
+    def start_reloading(self, filename):
+        '''Start reloading dictionary <filename> if it changed.
+
+        Return the new loading operation, to pass to `finish_reloading`
+        once done, or None if the dictionary is up to date, still being
+        loaded, or not managed.
+        '''
+        op = self.dictionaries.get(filename)
+        if op is None or not op.needs_reloading():
+            return None
+        previous_result = op.result
+        op = self.start_loading(filename)
+        op.previous_result = previous_result
+        return op
+
+    def finish_reloading(self, op, delta=True):
+        '''Return the result of a reload started with `start_reloading`.
+
+        If <delta> is True, and the previous result is a dictionary
+        that can be synced (see `StenoDictionary.sync`), only the
+        differences are applied to it, and it is returned. Since the
+        previous dictionary is updated in place, this must be called
+        from the thread using it.
+
+        Return None if the operation was superseded in the meantime.
+        '''
+        result = op.get()
+        if self.dictionaries.get(op.filename) is not op:
+            return None
+        previous_result = op.previous_result
+        if delta and isinstance(result, StenoDictionary) and \
+           type(previous_result) is type(result) and result.cacheable:
+            start_time = time.time()
+            changes = previous_result.sync(result)
+            log.info('applied %u change(s) to dictionary %s in %.3fs',
+                     changes, op.filename, time.time() - start_time)
+            op.result = result = previous_result
+        return result
+
+    def reload(self, filename, delta=True):
+        '''Reload dictionary <filename> if it changed.
+
+        Return the new result (see `finish_reloading`), or
+        None if it is up to date (or not managed).
+        '''
+        op = self.start_reloading(filename)
+        if op is None:
+            return None
+        return self.finish_reloading(op, delta=delta)
+
     def unload_outdated(self):
         for filename, op in list(self.dictionaries.items()):
             if op.needs_reloading():
                 del self.dictionaries[filename]
 
-    def load(self, filenames):
+    def load_async(self, filenames, callback, progress=None):
+        '''Start loading <filenames>, and return immediately.
+
+        Once all dictionaries are loaded, <callback> is called
+        with the results, from the loading thread (which is
+        returned).
+
+        If <progress> is set, it's called before that with the results
+        for the first dictionaries (in <filenames> order) each time more
+        of them are available, e.g. so the highest priority dictionaries
+        can be used without waiting for the others.
+        '''
         start_time = time.time()
-        self.dictionaries = {f: self.start_loading(f) for f in filenames}
-        results = [
-            self.dictionaries[f].get()
-            for f in filenames
-        ]
-        log.info('loaded %u dictionaries in %.3fs',
-                 len(results), time.time() - start_time)
+        start_stats = cache.stats()
+        filenames = list(filenames)
+        if self.processes and filenames:
+            pool = _ProcessPool(min(self.processes, len(filenames)))
+            parser = pool.parse
+        else:
+            pool = parser = None
+        self.dictionaries = {f: self.start_loading(f, parser) for f in filenames}
+        ops = [self.dictionaries[f] for f in filenames]
+        def wait():
+            results = []
+            try:
+                while len(results) < len(ops):
+                    results.append(ops[len(results)].get())
+                    # Batch the results that are already available.
+                    while len(results) < len(ops) and ops[len(results)].done():
+                        results.append(ops[len(results)].get())
+                    if progress is not None and len(results) < len(ops):
+                        log.info('loaded %u/%u dictionaries in %.3fs',
+                                 len(results), len(ops), time.time() - start_time)
+                        progress(list(results))
+            finally:
+                if pool is not None:
+                    pool.close()
+            log.info('loaded %u dictionaries in %.3fs',
+                     len(results), time.time() - start_time)
+            if cache.enabled():
+                hits, misses, hits_time, misses_time = (
+                    end - start for start, end in zip(start_stats, cache.stats()))
+                log.info('dictionaries cache: %u hit(s) in %.3fs, %u miss(es) in %.3fs',
+                         hits, hits_time, misses, misses_time)
+            callback(results)
+        thread = threading.Thread(target=wait, name='DictionaryLoading')
+        thread.start()
+        return thread
+
+    def load(self, filenames):
+        results = []
+        self.load_async(filenames, results.extend).join()
         return results
 
 
+class _ProcessPool(object):
+    '''Pool of parsing processes, started on first use.'''
+
+    def __init__(self, size):
+        self._size = size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def parse(self, dict_class, resource):
+        with self._lock:
+            if self._pool is None:
+                # Note: don't fork, as we're multi-threaded.
+                self._pool = multiprocessing.get_context('spawn').Pool(
+                    self._size, _init_worker, (system.NAME,))
+            pool = self._pool
+        return pool.apply(parse_dictionary, (dict_class, resource))
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
 class DictionaryLoadingOperation(object):
 
-    def __init__(self, filename):
+    def __init__(self, filename, parser=None, compact=False,
+                 reverse_index=False):
         self.loading_thread = threading.Thread(target=self.load)
         self.filename = filename
         self.result = None
+        self.previous_result = None
+        self.parser = parser
+        self.compact = compact
+        self.reverse_index = reverse_index
         self.loading_thread.start()
 
     def needs_reloading(self):
+        if self.result is None:
+            # Still loading.
+            return False
         try:
             new_timestamp = resource_timestamp(self.filename)
         except:
@@ -86,12 +241,23 @@ class DictionaryLoadingOperation(object):
         timestamp = None
         try:
             timestamp = resource_timestamp(self.filename)
-            self.result = load_dictionary(self.filename)
+            kwargs = {}
+            if self.parser is not None:
+                kwargs['parser'] = self.parser
+            if self.compact:
+                kwargs['compact'] = True
+            self.result = load_dictionary(self.filename, **kwargs)
+            # Note: not supported by all dictionary classes.
+            if self.reverse_index and hasattr(self.result, 'build_reverse_index'):
+                self.result.build_reverse_index(threaded=True)
         except Exception as e:
             log.debug('loading dictionary %s failed', self.filename, exc_info=True)
             self.result = DictionaryLoaderException(self.filename, e)
             self.result.timestamp = timestamp
 
+    def done(self):
+        return not self.loading_thread.is_alive()
+
     def get(self):
         self.loading_thread.join()
-        return self.result
+        return self.result
\ No newline at end of file
@@ -312,6 +312,9 @@ def format_translation(t):
 
 class RtfDictionary(StenoDictionary):
 
+    cacheable = True
+    journaled = True
+
     def _load(self, filename):
         with open(filename, 'rb') as fp:
             s = fp.read().decode('cp1252')
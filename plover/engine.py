@@ -1,18 +1,22 @@
 
 from collections import namedtuple, OrderedDict
-from functools import wraps
+from functools import partial, wraps
 from queue import Queue
 import os
 import shutil
 import threading
+import time
 
 from plover import log, system
+from plover.dictionary.base import dictionary_saver
 from plover.dictionary.loading_manager import DictionaryLoadingManager
 from plover.exception import DictionaryLoaderException, InvalidConfigurationError
 from plover.formatting import Formatter
 from plover.misc import shorten_path
+from plover.oslayer.filewatcher import FileWatcher
 from plover.registry import registry
 from plover.resource import ASSET_SCHEME, resource_filename
+from plover.search import SearchIndex
 from plover.steno import Stroke
 from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
 from plover.suggestions import Suggestions
@@ -107,6 +111,15 @@ class StenoEngine(object):
         self._translator.add_listener(self._formatter.format)
         self._dictionaries = self._translator.get_dictionary()
         self._dictionaries_manager = DictionaryLoadingManager()
+        self._search_index = SearchIndex()
+        # Incremented on each (asynchronous) dictionaries load,
+        # so the results of a superseded load can be ignored.
+        self._dictionaries_generation = 0
+        # Startup time, until the first dictionaries are usable.
+        self._startup_time = None
+        self._file_watcher = None
+        # Watched filename -> dictionary path.
+        self._watched_dictionaries = {}
         self._running_state = self._translator.get_state()
         self._keyboard_emulation = keyboard_emulation
         self._hooks = { hook: [] for hook in self.HOOKS }
@@ -140,11 +153,13 @@ class StenoEngine(object):
 
     def _stop(self):
         self._stop_extensions(self._running_extensions.keys())
+        self._watch_dictionaries(())
         if self._machine is not None:
             self._machine.stop_capture()
             self._machine = None
 
     def _start(self):
+        self._startup_time = time.time()
         self._set_output(self._config['auto_start'])
         self._update(full=True)
 
@@ -159,8 +174,13 @@ class StenoEngine(object):
         if not dictionaries_changed(dictionaries, self._dictionaries.dicts):
             # No change.
             return
+        previous_dictionaries = self._dictionaries
         self._dictionaries = StenoDictionaryCollection(dictionaries)
+        self._search_index.set_dictionaries(dictionaries)
         self._translator.set_dictionary(self._dictionaries)
+        # Detach the previous collection from the dictionaries,
+        # so it's not kept alive (and updated) anymore.
+        previous_dictionaries.close()
         self._trigger_hook('dictionaries_loaded', self._dictionaries)
 
     def _update(self, config_update=None, full=False, reset_machine=False):
@@ -237,32 +257,112 @@ class StenoEngine(object):
         if config_update:
             self._trigger_hook('config_changed', config_update)
         # Update dictionaries.
+        dictionary_saver.delay = config['dictionaries_save_delay'] / 1000
+        # Note: only used for the dictionaries (re)loaded from now on.
+        self._dictionaries_manager.compact = config['compact_dictionaries']
+        self._dictionaries_manager.reverse_index = config['prebuild_reverse_index']
+        self._dictionaries_manager.processes = config['dictionaries_loading_processes']
         config_dictionaries = OrderedDict(
             (d.path, d)
             for d in config['dictionaries']
         )
         copy_default_dictionaries(config_dictionaries.keys())
-        # Start by unloading outdated dictionaries.
-        self._dictionaries_manager.unload_outdated()
+        # Start by removing the dictionaries no longer in use: changed
+        # ones are kept until their new version is loaded (see
+        # `_on_dictionaries_loaded`).
         self._set_dictionaries([
             d for d in self._dictionaries.dicts
-            if d.path in config_dictionaries and \
-               d.path in self._dictionaries_manager
+            if d.path in config_dictionaries
         ])
-        # And then (re)load all dictionaries.
+        # And then (re)load all dictionaries, in the background: strokes
+        # are still translated using the current ones in the meantime.
+        self._dictionaries_generation += 1
+        on_loaded = partial(self._same_thread_hook, self._on_dictionaries_loaded,
+                            self._dictionaries_generation, config_dictionaries)
+        self._dictionaries_manager.load_async(
+            config_dictionaries.keys(), on_loaded,
+            # On startup, don't wait for the slowest dictionary: start
+            # using the highest priority ones as soon as they're loaded,
+            # and attach the others as they become available.
+            progress=on_loaded if full else None)
+        # Finally, watch for external changes.
+        self._watch_dictionaries(config_dictionaries.keys()
+                                 if config['watch_dictionaries'] else ())
+
+    def _on_dictionaries_loaded(self, generation, config_dictionaries, results):
+        if generation != self._dictionaries_generation:
+            # Superseded by a more recent update.
+            return
         dictionaries = []
-        for result in self._dictionaries_manager.load(config_dictionaries.keys()):
-            if isinstance(result, DictionaryLoaderException):
-                d = ErroredDictionary(result.path, result.exception)
-                # Only show an error if it's new.
-                if d != self._dictionaries.get(result.path):
-                    log.error('loading dictionary `%s` failed: %s',
-                              shorten_path(result.path), str(result.exception))
-            else:
-                d = result
+        for result in results:
+            d = self._loaded_dictionary(result)
             d.enabled = config_dictionaries[d.path].enabled
             dictionaries.append(d)
         self._set_dictionaries(dictionaries)
+        if self._startup_time is not None and \
+           (dictionaries or not config_dictionaries):
+            log.info('first dictionaries usable after %.3fs (%u/%u loaded)',
+                     time.time() - self._startup_time,
+                     len(dictionaries), len(config_dictionaries))
+            self._startup_time = None
+
+    def _loaded_dictionary(self, result):
+        if not isinstance(result, DictionaryLoaderException):
+            return result
+        d = ErroredDictionary(result.path, result.exception)
+        # Only show an error if it's new.
+        if d != self._dictionaries.get(result.path):
+            log.error('loading dictionary `%s` failed: %s',
+                      shorten_path(result.path), str(result.exception))
+        return d
+
+    def _watch_dictionaries(self, paths):
+        self._watched_dictionaries = {
+            os.path.abspath(resource_filename(path)): path
+            for path in paths
+            # Assets are not expected to change.
+            if not path.startswith(ASSET_SCHEME)
+        }
+        if not self._watched_dictionaries:
+            if self._file_watcher is not None:
+                self._file_watcher.stop()
+                self._file_watcher = None
+            return
+        if self._file_watcher is None:
+            self._file_watcher = FileWatcher(self._on_dictionary_file_changed)
+        self._file_watcher.watch(self._watched_dictionaries.keys())
+
+    def _on_dictionary_file_changed(self, filename):
+        # Called from the file watcher thread.
+        path = self._watched_dictionaries.get(filename)
+        if path is not None:
+            self._same_thread_hook(self._reload_dictionary, path)
+
+    def _reload_dictionary(self, path):
+        # Note: no-op if the dictionary is up to date (e.g. after
+        # it was saved by us), so only external changes are loaded.
+        op = self._dictionaries_manager.start_reloading(path)
+        if op is None:
+            return
+        def wait():
+            op.get()
+            self._same_thread_hook(self._on_dictionary_reloaded, op)
+        threading.Thread(target=wait, name='DictionaryReloading').start()
+
+    def _on_dictionary_reloaded(self, op):
+        # Only apply the changes in place to the dictionary in use.
+        delta = self._dictionaries.get(op.filename) is op.previous_result
+        result = self._dictionaries_manager.finish_reloading(op, delta=delta)
+        if result is None:
+            return
+        dictionaries = []
+        for d in self._dictionaries.dicts:
+            if d.path == op.filename and d is not result:
+                enabled = d.enabled
+                d = self._loaded_dictionary(result)
+                d.enabled = enabled
+            dictionaries.append(d)
+        self._set_dictionaries(dictionaries)
 
     def _start_extensions(self, extension_list):
         for extension_name in extension_list:
@@ -284,6 +384,8 @@ class StenoEngine(object):
 
     def _quit(self, code):
         self._stop()
+        # Don't lose pending changes.
+        dictionary_saver.flush()
         self.code = code
         self._trigger_hook('quit')
         return True
@@ -475,6 +577,15 @@ class StenoEngine(object):
     def get_suggestions(self, translation):
         return Suggestions(self._dictionaries).find(translation)
 
+    @with_lock
+    def search(self, pattern, field='translation', mode='prefix',
+               max_distance=1, start=0, count=None, dictionaries=None):
+        '''Search the dictionaries entries, see `SearchIndex.search`.'''
+        return self._search_index.search(pattern, field=field, mode=mode,
+                                         max_distance=max_distance,
+                                         start=start, count=count,
+                                         dictionaries=dictionaries)
+
     @property
     @with_lock
     def translator_state(self):
@@ -1,12 +1,15 @@
 
-from operator import attrgetter, itemgetter
+from array import array
 from collections import namedtuple
-from itertools import chain
+from itertools import chain, repeat
+import gc
+import threading
 
 from PyQt5.QtCore import (
     QAbstractTableModel,
     QModelIndex,
     Qt,
+    pyqtSignal,
 )
 from PyQt5.QtWidgets import (
     QComboBox,
@@ -17,6 +20,7 @@ from PyQt5.QtWidgets import (
 from plover.translation import escape_translation, unescape_translation
 from plover.misc import expand_path, shorten_path
 from plover.steno import normalize_steno
+from plover import log
 
 from plover.gui_qt.dictionary_editor_ui import Ui_DictionaryEditor
 from plover.gui_qt.utils import ToolBar, WindowState
@@ -24,6 +28,12 @@ from plover.gui_qt.utils import ToolBar, WindowState
 
 _COL_STENO, _COL_TRANS, _COL_DICT, _COL_COUNT = range(3 + 1)
 
+# Number of rows added to the view at once, see `DictionaryItemModel.fetchMore`.
+_FETCH_SIZE = 256
+
+# Number of entries filtered between checks for cancellation.
+_FILTER_CHUNK_SIZE = 4096
+
 
 class DictionaryItem(namedtuple('DictionaryItem', 'strokes translation dictionary')):
 
@@ -51,30 +61,261 @@ class DictionaryItemDelegate(QStyledItemDelegate):
         return super(DictionaryItemDelegate, self).createEditor(parent, option, index)
 
 
+class DictionaryIndex(object):
+    '''Entries of a list of dictionaries, sorted on each column.
+
+    Entries are stored as plain `(strokes, translation, dictionary)`
+    tuples. For each column, the sorted view is an array of indexes
+    into those entries: it's computed on first use, and then kept up
+    to date on edits (made through `set` and `delete`).
+    '''
+
+    def __init__(self, dictionary_list):
+        self._dictionary_list = dictionary_list
+        self._priority = {id(d): n for n, d in enumerate(dictionary_list)}
+        # Note: removed entries are replaced by None.
+        self._entries = None
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def _key_parts(self, column):
+        priority = self._priority
+        def strokes(entry):
+            return '/'.join(entry[0])
+        def translation(entry):
+            return entry[1]
+        def dictionary_path(entry):
+            return entry[2].path
+        def dictionary_priority(entry):
+            return priority[id(entry[2])]
+        if column == _COL_STENO:
+            return strokes, dictionary_priority
+        if column == _COL_TRANS:
+            return translation, dictionary_priority, strokes
+        return dictionary_path, dictionary_priority, strokes
+
+    def sort_key(self, column):
+        '''Return the sort key function for <column>.
+
+        Ties are broken by dictionary priority and strokes, so
+        each entry has its own position in each sorted view.
+        '''
+        parts = self._key_parts(column)
+        def key(entry):
+            return tuple(part(entry) for part in parts)
+        return key
+
+    def _order(self, column):
+        entries = self._entries
+        if entries is None:
+            entries = self._entries = []
+            # Note: called from a worker thread, while the
+            # dictionaries may be updated by the engine.
+            for dictionary in self._dictionary_list:
+                entries.extend(map(tuple.__add__, dictionary.copy_items(),
+                                   repeat((dictionary,))))
+        order = self._orders.get(column)
+        if order is not None:
+            return order
+        parts = self._key_parts(column)
+        steno_order = self._orders.get(_COL_STENO)
+        if steno_order is not None:
+            # The other keys end with the steno one.
+            order = steno_order.tolist()
+            parts = parts[:-1]
+        else:
+            order = [n for n, entry in enumerate(entries) if entry is not None]
+        # Sort on each part of the key, starting from the least
+        # significant one (relying on the sort stability): this
+        # is much faster than sorting on tuples.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for part in reversed(parts):
+                values = dict(zip(order, map(part, map(entries.__getitem__, order))))
+                order.sort(key=values.__getitem__)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        order = self._orders[column] = array('L', order)
+        return order
+
+    def _bisect(self, column, order, entry):
+        key = self.sort_key(column)
+        entries = self._entries
+        value = key(entry)
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(entries[order[mid]]) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def rows(self, column, descending=False, match=None, is_cancelled=None):
+        '''Return the entries sorted on <column>.
+
+        Only the entries for which <match> returns True are included if
+        set. Return None if <is_cancelled> returns True in the meantime.
+        '''
+        with self._lock:
+            order = self._order(column)
+            entries = self._entries
+            if match is None:
+                rows = list(map(entries.__getitem__, order))
+            else:
+                rows = []
+                for start in range(0, len(order), _FILTER_CHUNK_SIZE):
+                    if is_cancelled is not None and is_cancelled():
+                        return None
+                    chunk = order[start:start + _FILTER_CHUNK_SIZE]
+                    rows.extend(filter(match, map(entries.__getitem__, chunk)))
+        if descending:
+            rows.reverse()
+        return rows
+
+    def _add(self, entry):
+        n = len(self._entries)
+        self._entries.append(entry)
+        for column, order in self._orders.items():
+            order.insert(self._bisect(column, order, entry), n)
+
+    def _remove(self, entry):
+        entries = self._entries
+        positions = []
+        for column, order in self._orders.items():
+            pos = self._bisect(column, order, entry)
+            if pos == len(order) or entries[order[pos]] != entry:
+                return
+            positions.append((order, pos))
+        for order, pos in positions:
+            n = order.pop(pos)
+        entries[n] = None
+
+    def set(self, strokes, translation, dictionary):
+        with self._lock:
+            old_translation = dictionary.get(strokes)
+            dictionary[strokes] = translation
+            if self._entries is None:
+                return
+            if old_translation is not None:
+                self._remove((strokes, old_translation, dictionary))
+            self._add((strokes, translation, dictionary))
+
+    def delete(self, strokes, dictionary):
+        with self._lock:
+            translation = dictionary[strokes]
+            del dictionary[strokes]
+            if self._entries is not None:
+                self._remove((strokes, translation, dictionary))
+
+
 class DictionaryItemModel(QAbstractTableModel):
 
-    def __init__(self, dictionary_list, sort_column, sort_order):
+    # Emitted by the worker thread with the new
+    # rows, and the generation of the request.
+    _rows_ready = pyqtSignal(int, object)
+
+    def __init__(self, dictionary_list, sort_column, sort_order, search=None):
         super(DictionaryItemModel, self).__init__()
         self._dictionary_list = dictionary_list
+        # Search function (see `StenoEngine.search`), used when filtering.
+        self._search = search
+        self._index = DictionaryIndex(dictionary_list)
         self._operations = []
+        # All rows: only the first `_fetched` ones are part of the model.
         self._entries = []
+        self._fetched = 0
         self._sort_column = sort_column
         self._sort_order = sort_order
+        self._filters = (None, None)
+        # Filtering and sorting are done on a worker thread, a new
+        # request cancels the pending one (and its results are ignored).
+        self._generation = 0
+        self._cancel = None
+        self._rows_ready.connect(self._on_rows_ready)
         self._update_entries()
 
     def _update_entries(self, strokes_filter=None, translation_filter=None):
-        self._entries = []
-        for dictionary in self._dictionary_list:
-            for strokes, translation in dictionary.items():
-                if strokes_filter is not None and \
-                   not '/'.join(strokes).startswith(strokes_filter):
-                    continue
-                if translation_filter is not None and \
-                   not translation.startswith(translation_filter):
-                    continue
-                item = DictionaryItem(strokes, translation, dictionary)
-                self._entries.append(item)
-        self.sort(self._sort_column, self._sort_order)
+        self.cancel()
+        self._generation += 1
+        self._filters = (strokes_filter, translation_filter)
+        self._cancel = cancel = threading.Event()
+        generation = self._generation
+        column = self._sort_column
+        descending = self._sort_order == Qt.DescendingOrder
+        def run():
+            try:
+                rows = self._compute_rows(column, descending,
+                                          strokes_filter, translation_filter,
+                                          cancel.is_set)
+            except Exception:
+                log.error('updating dictionary editor entries failed', exc_info=True)
+                return
+            if rows is not None and not cancel.is_set():
+                self._rows_ready.emit(generation, rows)
+        thread = threading.Thread(target=run, name='DictionaryEditorModel')
+        thread.daemon = True
+        thread.start()
+
+    def _compute_rows(self, column, descending,
+                      strokes_filter, translation_filter,
+                      is_cancelled):
+        if not strokes_filter and not translation_filter:
+            return self._index.rows(column, descending)
+        def match(entry):
+            if strokes_filter and \
+               not '/'.join(entry[0]).startswith(strokes_filter):
+                return False
+            if translation_filter and \
+               not entry[1].startswith(translation_filter):
+                return False
+            return True
+        if self._search is None:
+            return self._index.rows(column, descending, match, is_cancelled)
+        rows = list(filter(match, self._search_entries(strokes_filter,
+                                                       translation_filter)))
+        if is_cancelled():
+            return None
+        rows.sort(key=self._index.sort_key(column), reverse=descending)
+        return rows
+
+    def _search_entries(self, strokes_filter, translation_filter):
+        # Note: the translation search is case insensitive,
+        # the results are filtered again by the caller.
+        if strokes_filter:
+            pattern, field = strokes_filter, 'strokes'
+        else:
+            pattern, field = translation_filter, 'translation'
+        dictionaries = {id(dictionary) for dictionary in self._dictionary_list}
+        paths = {dictionary.path for dictionary in self._dictionary_list}
+        for result in self._search(pattern, field=field, dictionaries=paths):
+            if id(result.dictionary) in dictionaries:
+                yield result
+
+    def _on_rows_ready(self, generation, rows):
+        if generation != self._generation:
+            return
+        self._cancel = None
+        # Keep the new rows that have not been edited yet.
+        new_rows = [
+            item for item in self._entries[:self._fetched]
+            if not item[0] and not item[1]
+        ]
+        self.modelAboutToBeReset.emit()
+        self._entries = new_rows + rows
+        self._fetched = min(len(self._entries), len(new_rows) + _FETCH_SIZE)
+        self.modelReset.emit()
+
+    def cancel(self):
+        '''Cancel the pending filtering/sorting, if any.'''
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+
+    def _item(self, row):
+        return DictionaryItem(*self._entries[row])
 
     @property
     def has_undo(self):
@@ -108,7 +349,7 @@ class DictionaryItemModel(QAbstractTableModel):
         if old_item is None:
             # Undo addition.
             try:
-                del new_item.dictionary[new_item.strokes]
+                self._index.delete(new_item.strokes, new_item.dictionary)
             except KeyError:
                 pass
             try:
@@ -125,7 +366,7 @@ class DictionaryItemModel(QAbstractTableModel):
             return
         # Undo update.
         try:
-            del new_item.dictionary[new_item.strokes]
+            self._index.delete(new_item.strokes, new_item.dictionary)
         except KeyError:
             pass
         try:
@@ -136,10 +377,11 @@ class DictionaryItemModel(QAbstractTableModel):
             # the result of the undo.
             self.new_row(0, item=old_item, record=False)
         else:
-            old_item.dictionary[old_item.strokes] = old_item.translation
+            self._index.set(*old_item)
             self._entries[row] = old_item
-            self.dataChanged.emit(self.index(row, _COL_STENO),
-                                  self.index(row, _COL_TRANS))
+            if row < self._fetched:
+                self.dataChanged.emit(self.index(row, _COL_STENO),
+                                      self.index(row, _COL_TRANS))
 
     def undo(self, op=None):
         op = self._operations.pop()
@@ -150,7 +392,20 @@ class DictionaryItemModel(QAbstractTableModel):
             self._undo(*op)
 
     def rowCount(self, parent):
-        return 0 if parent.isValid() else len(self._entries)
+        return 0 if parent.isValid() else self._fetched
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._fetched < len(self._entries)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(_FETCH_SIZE, len(self._entries) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
 
     def columnCount(self, parent):
         return _COL_COUNT
@@ -168,46 +423,37 @@ class DictionaryItemModel(QAbstractTableModel):
     def data(self, index, role):
         if not index.isValid() or role not in (Qt.EditRole, Qt.DisplayRole):
             return None
-        item = self._entries[index.row()]
+        strokes, translation, dictionary = self._entries[index.row()]
         column = index.column()
         if column == _COL_STENO:
-            return '/'.join(item.strokes)
+            return '/'.join(strokes)
         if column == _COL_TRANS:
-            return escape_translation(item.translation)
+            return escape_translation(translation)
         if column == _COL_DICT:
-            return shorten_path(item.dictionary.path)
+            return shorten_path(dictionary.path)
 
     def flags(self, index):
         if not index.isValid():
             return Qt.NoItemFlags
         f = Qt.ItemIsEnabled | Qt.ItemIsSelectable
-        item = self._entries[index.row()]
-        if not item.dictionary.readonly:
+        dictionary = self._entries[index.row()][2]
+        if not dictionary.readonly:
             f |= Qt.ItemIsEditable
         return f
 
     def filter(self, strokes_filter=None, translation_filter=None):
-        self.modelAboutToBeReset.emit()
         self._update_entries(strokes_filter, translation_filter)
-        self.modelReset.emit()
 
     def sort(self, column, order):
-        self.layoutAboutToBeChanged.emit()
-        if column == _COL_DICT:
-            key = attrgetter('dictionary_path')
-        else:
-            key = itemgetter(column)
-        self._entries.sort(key=key,
-                           reverse=(order == Qt.DescendingOrder))
         self._sort_column = column
         self._sort_order = order
-        self.layoutChanged.emit()
+        self._update_entries(*self._filters)
 
     def setData(self, index, value, role=Qt.EditRole, record=True):
         assert role == Qt.EditRole
         row = index.row()
         column = index.column()
-        old_item = self._entries[row]
+        old_item = self._item(row)
         strokes, translation, dictionary = old_item
         if column == _COL_STENO:
             strokes = normalize_steno(value.strip())
@@ -225,7 +471,7 @@ class DictionaryItemModel(QAbstractTableModel):
             if dictionary == old_item.dictionary:
                 return False
         try:
-            del old_item.dictionary[old_item.strokes]
+            self._index.delete(old_item.strokes, old_item.dictionary)
         except KeyError:
             pass
         if not old_item.strokes and not old_item.translation:
@@ -235,7 +481,7 @@ class DictionaryItemModel(QAbstractTableModel):
                 old_item = None
         new_item = DictionaryItem(strokes, translation, dictionary)
         self._entries[row] = new_item
-        dictionary[strokes] = translation
+        self._index.set(strokes, translation, dictionary)
         if record:
             self._operations.append((old_item, new_item))
         self.dataChanged.emit(index, index)
@@ -246,10 +492,12 @@ class DictionaryItemModel(QAbstractTableModel):
             if row == 0 and not self._entries:
                 dictionary = self._dictionary_list[0]
             else:
-                dictionary = self._entries[row].dictionary
+                dictionary = self._entries[row][2]
             item = DictionaryItem((), '', dictionary)
+        row = min(row, self._fetched)
         self.beginInsertRows(QModelIndex(), row, row)
         self._entries.insert(row, item)
+        self._fetched += 1
         if record:
             self._operations.append((None, item))
         self.endInsertRows()
@@ -258,11 +506,15 @@ class DictionaryItemModel(QAbstractTableModel):
         assert row_list
         operations = []
         for row in sorted(row_list, reverse=True):
-            self.beginRemoveRows(QModelIndex(), row, row)
-            item = self._entries.pop(row)
-            self.endRemoveRows()
+            if row < self._fetched:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                item = DictionaryItem(*self._entries.pop(row))
+                self._fetched -= 1
+                self.endRemoveRows()
+            else:
+                item = DictionaryItem(*self._entries.pop(row))
             try:
-                del item.dictionary[item.strokes]
+                self._index.delete(item.strokes, item.dictionary)
             except KeyError:
                 pass
             else:
@@ -288,12 +540,14 @@ class DictionaryEditor(QDialog, Ui_DictionaryEditor, WindowState):
         sort_column, sort_order = _COL_STENO, Qt.AscendingOrder
         self._model = DictionaryItemModel(dictionary_list,
                                           sort_column,
-                                          sort_order)
+                                          sort_order,
+                                          search=engine.search)
         self._model.dataChanged.connect(self.on_data_changed)
         self.table.sortByColumn(sort_column, sort_order)
         self.table.setModel(self._model)
         self.table.setSortingEnabled(True)
-        self.table.resizeColumnsToContents()
+        # Note: the rows are loaded in the background.
+        self._model.modelReset.connect(self._on_first_rows)
         self.table.setItemDelegate(DictionaryItemDelegate(dictionary_list))
         self.table.selectionModel().selectionChanged.connect(self.on_selection_changed)
         background = self.table.palette().highlightedText().color().name()
@@ -318,6 +572,10 @@ class DictionaryEditor(QDialog, Ui_DictionaryEditor, WindowState):
         self.restore_state()
         self.finished.connect(self.save_state)
 
+    def _on_first_rows(self):
+        self._model.modelReset.disconnect(self._on_first_rows)
+        self.table.resizeColumnsToContents()
+
     @property
     def _selection(self):
         return list(sorted(
@@ -378,6 +636,7 @@ class DictionaryEditor(QDialog, Ui_DictionaryEditor, WindowState):
         self._model.filter(strokes_filter=None, translation_filter=None)
 
     def on_finished(self, result):
+        self._model.cancel()
         with self._engine:
             self._engine.dictionaries.save(dictionary.path
                                            for dictionary
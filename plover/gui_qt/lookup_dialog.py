@@ -1,6 +1,8 @@
 
 from PyQt5.QtCore import QEvent, Qt
 
+from plover.steno import sort_steno_strokes
+from plover.suggestions import Suggestion
 from plover.translation import unescape_translation
 
 from plover.gui_qt.lookup_dialog_ui import Ui_LookupDialog
@@ -20,6 +22,9 @@ class LookupDialog(Tool, Ui_LookupDialog):
     ROLE = 'lookup'
     SHORTCUT = 'Ctrl+L'
 
+    # Maximum number of other matching translations shown.
+    MAX_MATCHES = 20
+
     def __init__(self, engine):
         super(LookupDialog, self).__init__(engine)
         self.setupUi(self)
@@ -42,4 +47,29 @@ class LookupDialog(Tool, Ui_LookupDialog):
     def on_lookup(self, pattern):
         translation = unescape_translation(pattern.strip())
         suggestion_list = self._engine.get_suggestions(translation)
+        if translation:
+            suggestion_list.extend(self._find_matches(translation, suggestion_list))
         self._update_suggestions(suggestion_list)
+
+    def _find_matches(self, translation, suggestion_list):
+        ''' Find other translations starting with <translation>,
+        or, if there are none, close to it (e.g. misspelled). '''
+        seen = {suggestion.text for suggestion in suggestion_list}
+        for mode in ('prefix', 'fuzzy'):
+            matches = []
+            for result in self._engine.search(translation, mode=mode,
+                                              count=self.MAX_MATCHES * 4):
+                if result.translation in seen:
+                    continue
+                seen.add(result.translation)
+                # Ignore overridden or disabled entries.
+                steno_list = self._engine.reverse_lookup(result.translation)
+                if not steno_list:
+                    continue
+                matches.append(Suggestion(result.translation,
+                                          sort_steno_strokes(steno_list)))
+                if len(matches) == self.MAX_MATCHES:
+                    break
+            if matches:
+                return matches
+        return []
@@ -99,7 +99,7 @@ class PaperTape(Tool, Ui_PaperTape):
 
     def _paper_format(self, stroke):
         text = self._all_keys_filler * 1
-        keys = stroke.steno_keys[:]
+        keys = list(stroke.steno_keys)
         if any(key in self._numbers for key in keys):
             keys.append('#')
         for key in keys:
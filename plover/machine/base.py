@@ -38,6 +38,7 @@ class StenotypeBase(object):
         keys = self.get_keys()
         self.keymap = Keymap(keys, keys)
         self.keymap.set_mappings(zip(keys, keys))
+        self._keymap_changed()
         self.stroke_subscribers = []
         self.state_subscribers = []
         self.state = STATE_STOPPED
@@ -45,6 +46,11 @@ class StenotypeBase(object):
     def set_keymap(self, keymap):
         """Setup machine keymap."""
         self.keymap = keymap
+        self._keymap_changed()
+
+    def _keymap_changed(self):
+        """Called when the keymap is set, e.g. to update decoding tables."""
+        pass
 
     def start_capture(self):
         """Begin listening for output from the stenotype machine."""
@@ -168,6 +174,62 @@ class ThreadedStenotypeBase(StenotypeBase, threading.Thread):
             pass
         self._stopped()
 
+class SerialReader(object):
+    """Buffered reads from a serial port.
+
+    Everything available is read at once into a preallocated buffer,
+    and data is returned as `memoryview` slices of that buffer, to avoid
+    copies: so a slice is only valid until the next call to `fill`.
+    """
+
+    def __init__(self, serial_port, size=4096):
+        self.serial_port = serial_port
+        self.size = size
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        # Pending data is in [_start:_end].
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def fill(self, count=1):
+        """Read at least <count> bytes, and everything already available.
+
+        Return the number of bytes read: less than <count> on timeout
+        (or if the buffer is full).
+        """
+        start, end = self._start, self._end
+        if start:
+            # Move pending data to the start of the buffer.
+            self._view[:end - start] = self._view[start:end]
+            self._start, self._end = 0, end - start
+        end = self._end
+        count = min(max(count, self.serial_port.inWaiting()), self.size - end)
+        if count <= 0:
+            return 0
+        raw = self.serial_port.read(count)
+        self._view[end:end + len(raw)] = raw
+        self._end += len(raw)
+        return len(raw)
+
+    def find(self, sub):
+        """Return the offset of <sub> in the pending data, or -1."""
+        pos = self._buffer.find(sub, self._start, self._end)
+        return pos if pos < 0 else pos - self._start
+
+    def take(self, count=None):
+        """Consume and return the next <count> bytes (all by default)."""
+        start = self._start
+        end = self._end if count is None else start + count
+        self._start = end
+        return self._view[start:end]
+
+    def clear(self):
+        self._start = self._end = 0
+
+
 class SerialStenotypeBase(ThreadedStenotypeBase):
     """For use with stenotype machines that connect via serial port.
 
@@ -260,17 +322,13 @@ class SerialStenotypeBase(ThreadedStenotypeBase):
             self.serial_params.get('timeout', 1.0) / packet_size,
             0.01,
         )
-        packet = b''
+        reader = SerialReader(self.serial_port)
         while not self.finished.isSet():
-            raw = self.serial_port.read(packet_size - len(packet))
-            if not raw:
-                if packet:
+            if not reader.fill(packet_size - len(reader)):
+                if len(reader):
                     log.error('discarding incomplete packet: %s',
-                              binascii.hexlify(packet))
-                packet = b''
-                continue
-            packet += raw
-            if len(packet) != packet_size:
+                              binascii.hexlify(reader.take()))
+                reader.clear()
                 continue
-            yield packet
-            packet = b''
+            while len(reader) >= packet_size:
+                yield reader.take(packet_size)
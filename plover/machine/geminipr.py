@@ -25,6 +25,17 @@ STENO_KEY_CHART = ("Fn", "#1", "#2", "#3", "#4", "#5", "#6",
 
 BYTES_PER_STROKE = 6
 
+# Keys of each possible value of each packet byte (without the MSB).
+_BYTES_KEYS = tuple(
+    tuple(
+        tuple(STENO_KEY_CHART[i * 7 + j - 1]
+              for j in range(1, 8)
+              if b & (0x80 >> j))
+        for b in range(0x80)
+    )
+    for i in range(BYTES_PER_STROKE)
+)
+
 
 class GeminiPr(SerialStenotypeBase):
     """Standard stenotype interface for a Gemini PR machine.
@@ -40,19 +51,31 @@ class GeminiPr(SerialStenotypeBase):
         res2
     '''
 
+    def _keymap_changed(self):
+        # Actions mask of each possible value of each packet byte.
+        actions_mask = self.keymap.actions_mask
+        self._tables = tuple(
+            tuple(actions_mask(keys) for keys in byte_keys)
+            for byte_keys in _BYTES_KEYS
+        )
+
+    def _decode(self, packet):
+        """Return the actions mask of a packet, or None if it's invalid."""
+        b0, b1, b2, b3, b4, b5 = packet
+        if not (b0 & 0x80) or (b1 | b2 | b3 | b4 | b5) & 0x80:
+            return None
+        t0, t1, t2, t3, t4, t5 = self._tables
+        return (t0[b0 & 0x7f] | t1[b1] | t2[b2] |
+                t3[b3] | t4[b4] | t5[b5])
+
     def run(self):
         """Overrides base class run method. Do not call directly."""
         self._ready()
         for packet in self._iter_packets(BYTES_PER_STROKE):
-            if not (packet[0] & 0x80) or sum(b & 0x80 for b in packet[1:]):
+            mask = self._decode(packet)
+            if mask is None:
                 log.error('discarding invalid packet: %s',
                           binascii.hexlify(packet))
                 continue
-            steno_keys = []
-            for i, b in enumerate(packet):
-                for j in range(1, 8):
-                    if (b & (0x80 >> j)):
-                        steno_keys.append(STENO_KEY_CHART[i * 7 + j - 1])
-            steno_keys = self.keymap.keys_to_actions(steno_keys)
-            if steno_keys:
-                self._notify(steno_keys)
+            if mask:
+                self._notify(self.keymap.mask_actions(mask))
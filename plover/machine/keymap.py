@@ -20,6 +20,12 @@ class Keymap(object):
         self._mappings = {}
         # key -> action
         self._bindings = {}
+        # Bit of each action, and cache of
+        # actions masks -> actions, see `mask_actions`.
+        self._action_bits = OrderedDict((action, 1 << n)
+                                        for n, action
+                                        in enumerate(self._actions))
+        self._masks_actions = {}
 
     def get_keys(self):
         return self._keys.keys()
@@ -97,6 +103,29 @@ class Keymap(object):
                 action_list.append(action)
         return action_list
 
+    def actions_mask(self, key_list):
+        '''Return the bitmask of the actions bound to <key_list>.
+
+        Each action is assigned a bit (in actions order), 'no-op' and
+        unbound keys are ignored. See `mask_actions` for the reverse.
+        '''
+        mask = 0
+        for key in key_list:
+            action = self._bindings.get(key)
+            if action is not None and action != 'no-op':
+                mask |= self._action_bits[action]
+        return mask
+
+    def mask_actions(self, mask):
+        '''Return the list of actions of a bitmask (see `actions_mask`).'''
+        actions = self._masks_actions.get(mask)
+        if actions is None:
+            actions = self._masks_actions[mask] = tuple(
+                action for action, bit in self._action_bits.items()
+                if mask & bit
+            )
+        return list(actions)
+
     def keys(self):
         return self._mappings.keys()
 
@@ -3,9 +3,8 @@
 
 "Thread-based monitoring of a stenotype machine using the passport protocol."
 
-from itertools import zip_longest
-
-from plover.machine.base import SerialStenotypeBase
+from plover import log
+from plover.machine.base import SerialReader, SerialStenotypeBase
 
 # Passport protocol is documented here:
 # http://www.eclipsecat.com/?q=system/files/Passport%20protocol_0.pdf
@@ -24,42 +23,41 @@ class Passport(SerialStenotypeBase):
     SERIAL_PARAMS = dict(SerialStenotypeBase.SERIAL_PARAMS)
     SERIAL_PARAMS.update(baudrate=38400)
 
-    def __init__(self, params):
-        super(Passport, self).__init__(params)
-        self.packet = []
-
-    def _read(self, b):
-        b = chr(b)
-        self.packet.append(b)
-        if b == '>':
-            self._handle_packet(''.join(self.packet))
-            del self.packet[:]
+    def _keymap_changed(self):
+        # Actions mask of each possible (key, shadow) pair:
+        # keys with a shadow below 8 are not registered.
+        actions_mask = self.keymap.actions_mask
+        self._table = {
+            key + shadow: actions_mask((key,))
+            for key in self.get_keys()
+            for shadow in '89abcdefABCDEF'
+        }
+
+    def _decode(self, packet):
+        """Return the actions mask of a packet."""
+        encoded = packet.split('/')[1]
+        table = self._table
+        mask = 0
+        for n in range(0, len(encoded), 2):
+            mask |= table.get(encoded[n:n + 2], 0)
+        return mask
 
     def _handle_packet(self, packet):
-        encoded = packet.split('/')[1]
-        steno_keys = []
-        for key, shadow in grouper(encoded, 2, 0):
-            shadow = int(shadow, base=16)
-            if shadow >= 8:
-                steno_keys.append(key)
-        steno_keys = self.keymap.keys_to_actions(steno_keys)
-        if steno_keys:
-            self._notify(steno_keys)
+        mask = self._decode(packet)
+        if mask:
+            self._notify(self.keymap.mask_actions(mask))
 
     def run(self):
         """Overrides base class run method. Do not call directly."""
         self._ready()
-
+        reader = SerialReader(self.serial_port)
         while not self.finished.isSet():
             # Grab data from the serial port.
-            raw = self.serial_port.read(max(1, self.serial_port.inWaiting()))
-
-            for b in raw:
-                self._read(b)
-
-
-def grouper(iterable, n, fillvalue=None):
-    "Collect data into fixed-length chunks or blocks"
-    # grouper('ABCDEFG', 3, 'x') --> ABC DEF Gxx
-    args = [iter(iterable)] * n
-    return zip_longest(fillvalue=fillvalue, *args)
+            reader.fill()
+            while True:
+                end = reader.find(b'>')
+                if end < 0:
+                    break
+                self._handle_packet(str(reader.take(end + 1), 'latin-1'))
+            if len(reader) == reader.size:
+                log.error('discarding invalid packet: %s', bytes(reader.take()))
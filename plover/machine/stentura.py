@@ -146,7 +146,9 @@ Unknown.
 
 """
 
+from array import array
 import struct
+import sys
 
 from plover import log
 import plover.machine.base
@@ -221,6 +223,13 @@ _CRC_TABLE = [
 ]
 
 
+# Table for computing the CRC 2 bytes at a time: the new CRC
+# after processing the 16 bits word (little endian) <w> from
+# CRC <c> is `_CRC_TABLE16[c ^ w]`.
+_CRC_TABLE16 = array('H', [t ^ hi for hi in range(256) for t in _CRC_TABLE])
+_CRC_TABLE16 = array('H', map(_CRC_TABLE16.__getitem__, _CRC_TABLE16))
+
+
 def _crc(data, offset=None, size=None):
     """Compute the Crc algorithm used by the stentura protocol.
 
@@ -237,8 +246,8 @@ def _crc(data, offset=None, size=None):
     Check  : BB3D
 
     Args:
-    - data: The data to checksum. The data should be an iterable that returns
-            bytes
+    - data: The data to checksum. The data should be a bytes-like object,
+            or an iterable that returns bytes.
 
     Returns: The computed crc for the data.
 
@@ -247,11 +256,24 @@ def _crc(data, offset=None, size=None):
         offset = 0
     if size is None:
         size = len(data) - offset
+    try:
+        data = memoryview(data)
+    except TypeError:
+        data = memoryview(bytes(data))
+    data = data[offset:offset + size]
     checksum = 0
-    for n in range(offset, offset + size):
-        b = data[n]
-        checksum = (_CRC_TABLE[(checksum ^ b) & 0xff] ^
-                    ((checksum >> 8) & 0xff))
+    if size & 1:
+        checksum = _CRC_TABLE[data[0]]
+        data = data[1:]
+    if sys.byteorder == 'little':
+        words = data.cast('H')
+    else:
+        words = array('H')
+        words.frombytes(data)
+        words.byteswap()
+    table = _CRC_TABLE16
+    for w in words:
+        checksum = table[checksum ^ w]
     return checksum
 
 
@@ -294,9 +316,23 @@ def _parse_stroke(a, b, c, d):
             if (fullstroke & (1 << (23 - i)))]
 
 
+# Valid strokes bytes: with the 2 most significant bits set.
+_STROKE_BYTES = bytes(range(0b11000000, 0x100))
+
+# Compiled struct for reading strokes.
+_STROKE_STRUCT = struct.Struct('>I')
+
+# Cache of parsed strokes, by value (as a 32 bits big endian integer).
+_STROKES_CACHE = {}
+_STROKES_CACHE_SIZE = 4096
+
+
 def _parse_strokes(data):
     """Parse strokes from a buffer and return a sequence of strokes.
 
+    The whole buffer (usually a full 512 bytes block) is validated and
+    unpacked at once, and parsed strokes are cached by value.
+
     Args:
     - data: A byte buffer.
 
@@ -306,15 +342,22 @@ def _parse_strokes(data):
     - _ProtocolViolationException if the data doesn't follow the protocol.
 
     """
-    strokes = []
     if (len(data) % 4) != 0:
         raise _ProtocolViolationException(
             "Data size is not divisible by 4: %d" % (len(data)))
-    for b in data:
-        if (b & 0b11000000) != 0b11000000:
-            raise _ProtocolViolationException("Data is not stroke: 0x%X" % (b))
-    for a, b, c, d in zip(*([iter(data)] * 4)):
-        strokes.append(_parse_stroke(a, b, c, d))
+    data = bytes(data)
+    invalid = data.translate(None, _STROKE_BYTES)
+    if invalid:
+        raise _ProtocolViolationException("Data is not stroke: 0x%X" % (invalid[0]))
+    cache = _STROKES_CACHE
+    strokes = []
+    for value, in _STROKE_STRUCT.iter_unpack(data):
+        keys = cache.get(value)
+        if keys is None:
+            if len(cache) >= _STROKES_CACHE_SIZE:
+                cache.clear()
+            keys = cache[value] = tuple(_parse_stroke(*value.to_bytes(4, 'big')))
+        strokes.append(list(keys))
     return strokes
 
 # Actions
@@ -409,6 +452,47 @@ def _make_reset(buf, seq):
     return _make_request(buf, _RESET, seq)
 
 
+def _make_read_requests():
+    """Precompute the READC request packets of each sequence number.
+
+    Returns: A list of (packet, crc) for each sequence number, with the
+    packet for reading 512 bytes from block 0 at byte 0, and its CRC.
+
+    """
+    requests = []
+    for seq in range(256):
+        packet = bytearray(18)
+        _make_read(packet, seq, 0, 0)
+        requests.append((packet, _SHORT_STRUCT.unpack_from(packet, 16)[0]))
+    return requests
+
+_READ_REQUESTS = _make_read_requests()
+_POSITION_STRUCT = struct.Struct('<2H')
+
+
+def _make_read_request(seq, block, byte):
+    """Make a packet with the READC command, for reading 512 bytes.
+
+    Same as `_make_read`, but using a precomputed packet for <seq>:
+    only the position and CRC are updated. Since the CRC is linear,
+    and the position is at the end of the checksummed header, the new
+    CRC is the precomputed one XORed with the CRC of the position.
+
+    Args:
+    - seq: The sequence number of the packet.
+    - block: The index of the file block to read.
+    - byte: The byte offset within the block at which to start reading.
+
+    Returns: The packet (only valid until the sequence number is reused).
+
+    """
+    packet, crc = _READ_REQUESTS[seq]
+    _POSITION_STRUCT.pack_into(packet, 12, block, byte)
+    crc ^= _CRC_TABLE16[_CRC_TABLE16[block] ^ byte]
+    _SHORT_STRUCT.pack_into(packet, 16, crc)
+    return packet
+
+
 def _validate_response(packet):
     """Validate a response packet.
 
@@ -558,6 +642,41 @@ class _SequenceCounter(object):
         return cur
 
 
+def _read_block(port, stop, seq, response_buf, block, byte):
+    """Read the next chunk (up to 512 bytes) of the current file.
+
+    The file should be opened first.
+
+    Args:
+    - port: The port to use.
+    - stop: The event used to request stopping.
+    - seq: A _SequenceCounter instance to use to track packets.
+    - response_buf: Buffer to use for response packet.
+    - block: The index of the file block to read.
+    - byte: The byte offset within the block at which to start reading.
+
+    Returns: The new position (block, byte) and a buffer as a slice of
+    response_buf holding the data read (empty at the end of the file).
+
+    Raises:
+    _ProtocolViolationException: If the protocol is violated.
+    _StopException: If a stop is requested.
+    _ConnectionLostException: If we can't seem to talk to the machine.
+
+    """
+    packet = _make_read_request(seq(), block, byte)
+    response = _send_receive(port, stop, packet, response_buf)
+    p1 = _SHORT_STRUCT.unpack_from(response, 8)[0]
+    if not ((p1 == 0 and len(response) == 14) or  # No data.
+            (p1 == len(response) - 16)):          # Data.
+        raise _ProtocolViolationException()
+    byte += p1
+    if byte >= 512:
+        block += 1
+        byte -= 512
+    return block, byte, response[14:14 + p1]
+
+
 def _read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte):
     """Read the full contents of the current file from beginning to end.
 
@@ -567,7 +686,7 @@ def _read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte):
     - port: The port to use.
     - stop: The event used to request stopping.
     - seq: A _SequenceCounter instance to use to track packets.
-    - request_buf: Buffer to use for request packet.
+    - request_buf: Unused (request packets are precomputed).
     - response_buf: Buffer to use for response packet.
     - stroke_buf: Buffer to use for strokes read from the file.
 
@@ -579,21 +698,40 @@ def _read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte):
     """
     bytes_read = 0
     while True:
-        packet = _make_read(request_buf, seq(), block, byte, length=512)
-        response = _send_receive(port, stop, packet, response_buf)
-        p1 = _SHORT_STRUCT.unpack(response[8:10])[0]
-        if not ((p1 == 0 and len(response) == 14) or  # No data.
-                (p1 == len(response) - 16)):          # Data.
-            raise _ProtocolViolationException()
-        if p1 == 0:
+        block, byte, data = _read_block(port, stop, seq, response_buf, block, byte)
+        if not data:
             return block, byte, buffer(stroke_buf, 0, bytes_read)
-        data = buffer(response, 14, p1)
         _write_to_buffer(stroke_buf, bytes_read, data)
         bytes_read += len(data)
-        byte += p1
-        if byte >= 512:
-            block += 1
-            byte -= 512
+
+
+def _catch_up(port, stop, seq, response_buf, block, byte):
+    """Skip to the end of the current file.
+
+    The file is read as fast as possible: blocks are only validated,
+    not copied or parsed.
+
+    Args:
+    - port: The port to use.
+    - stop: The event used to request stopping.
+    - seq: A _SequenceCounter instance to use to track packets.
+    - response_buf: Buffer to use for response packet.
+    - block: The index of the file block to start from.
+    - byte: The byte offset within the block at which to start.
+
+    Returns: The position (block, byte) of the end of the file.
+
+    Raises:
+    _ProtocolViolationException: If the protocol is violated.
+    _StopException: If a stop is requested.
+    _ConnectionLostException: If we can't seem to talk to the machine.
+
+    """
+    while True:
+        block, byte, data = _read_block(port, stop, seq, response_buf, block, byte)
+        if not data:
+            return block, byte
+
 
 def _loop(port, stop, callback, ready_callback, timeout=1):
     """Enter into a loop talking to the machine and returning strokes.
@@ -626,19 +764,24 @@ def _loop(port, stop, callback, ready_callback, timeout=1):
     # allow resizing the original bytearray(), so make sure our buffers are big
     # enough to begin with.
     request_buf, response_buf = _allocate_buffer(), _allocate_buffer()
-    stroke_buf = _allocate_buffer()
     seq = _SequenceCounter()
     request = _make_open(request_buf, seq(), b'A', b'REALTIME.000')
     # Any checking needed on the response packet?
     _send_receive(port, stop, request, response_buf)
     # Do a full read to get to the current position in the realtime file.
-    block, byte = 0, 0
-    block, byte, _ = _read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte)
+    block, byte = _catch_up(port, stop, seq, response_buf, 0, 0)
     ready_callback()
+    # Incomplete stroke at the end of the last chunk read.
+    partial = b''
     while True:
-        block, byte, data = _read(port, stop, seq, request_buf, response_buf, stroke_buf, block, byte)
-        strokes = _parse_strokes(data)
-        for stroke in strokes:
+        block, byte, data = _read_block(port, stop, seq, response_buf, block, byte)
+        if not data:
+            continue
+        if partial:
+            data = partial + bytes(data)
+        end = len(data) - len(data) % 4
+        partial = bytes(data[end:])
+        for stroke in _parse_strokes(data[:end]):
             callback(stroke)
 
 
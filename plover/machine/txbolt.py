@@ -29,6 +29,14 @@ STENO_KEY_CHART = ("S-", "T-", "K-", "P-", "W-", "H-",  # 00
                    "-F", "-R", "-P", "-B", "-L", "-G",  # 10
                    "-T", "-S", "-D", "-Z", "#")         # 11
 
+# Keys of each possible byte value.
+_BYTE_KEYS = tuple(
+    tuple(STENO_KEY_CHART[(byte >> 6) * 6 + i]
+          for i in range(5 if byte >> 6 == 3 else 6)
+          if (byte >> i) & 1)
+    for byte in range(0x100)
+)
+
 
 class TxBolt(plover.machine.base.SerialStenotypeBase):
     """TX Bolt interface.
@@ -50,41 +58,54 @@ class TxBolt(plover.machine.base.SerialStenotypeBase):
         super(TxBolt, self).__init__(params)
         self._reset_stroke_state()
 
+    def _keymap_changed(self):
+        # Actions mask of each possible byte value.
+        actions_mask = self.keymap.actions_mask
+        self._table = tuple(actions_mask(keys) for keys in _BYTE_KEYS)
+
     def _reset_stroke_state(self):
-        self._pressed_keys = []
+        self._pressed_mask = 0
         self._last_key_set = 0
 
     def _finish_stroke(self):
-        steno_keys = self.keymap.keys_to_actions(self._pressed_keys)
-        if steno_keys:
-            self._notify(steno_keys)
+        if self._pressed_mask:
+            self._notify(self.keymap.mask_actions(self._pressed_mask))
         self._reset_stroke_state()
 
+    def _decode(self, raw):
+        table = self._table
+        mask_actions = self.keymap.mask_actions
+        pressed_mask = self._pressed_mask
+        last_key_set = self._last_key_set
+        for byte in raw:
+            key_set = byte >> 6
+            if key_set <= last_key_set:
+                # Starting a new stroke, finish previous one.
+                if pressed_mask:
+                    self._notify(mask_actions(pressed_mask))
+                pressed_mask = 0
+            last_key_set = key_set
+            pressed_mask |= table[byte]
+            if key_set == 3:
+                # Last possible set, the stroke is finished.
+                if pressed_mask:
+                    self._notify(mask_actions(pressed_mask))
+                pressed_mask = last_key_set = 0
+        self._pressed_mask = pressed_mask
+        self._last_key_set = last_key_set
+
     def run(self):
         """Overrides base class run method. Do not call directly."""
         settings = self.serial_port.getSettingsDict()
         settings['timeout'] = 0.1 # seconds
         self.serial_port.applySettingsDict(settings)
         self._ready()
+        reader = plover.machine.base.SerialReader(self.serial_port)
         while not self.finished.isSet():
             # Grab data from the serial port, or wait for timeout if none available.
-            raw = self.serial_port.read(max(1, self.serial_port.inWaiting()))
-
-            if not raw:
+            if not reader.fill():
                 # Timeout, finish the current stroke.
                 self._finish_stroke()
                 continue
 
-            for byte in raw:
-                key_set = byte >> 6
-                if key_set <= self._last_key_set:
-                    # Starting a new stroke, finish previous one.
-                    self._finish_stroke()
-                self._last_key_set = key_set
-                for i in range(5 if key_set == 3 else 6):
-                    if (byte >> i) & 1:
-                        key = STENO_KEY_CHART[(key_set * 6) + i]
-                        self._pressed_keys.append(key)
-                if key_set == 3:
-                    # Last possible set, the stroke is finished.
-                    self._finish_stroke()
+            self._decode(reader.take())
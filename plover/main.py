@@ -7,13 +7,14 @@
 
 import argparse
 import atexit
+import multiprocessing
 import os
 import sys
 import subprocess
 import traceback
 
 # This need to be imported before pkg_resources.
-from plover.oslayer.config import CONFIG_DIR, PLUGINS_DIR
+from plover.oslayer.config import CACHE_DIR, CONFIG_DIR, PLUGINS_DIR
 
 import pkg_resources
 
@@ -22,6 +23,7 @@ if sys.platform.startswith('darwin'):
 
 import plover.oslayer.processlock
 from plover.config import CONFIG_FILE, Config
+from plover.dictionary import cache as dictionary_cache
 from plover.registry import registry
 from plover import log
 from plover import __name__ as __software_name__
@@ -45,6 +47,8 @@ def init_config_dir():
 
 def main():
     """Launch plover."""
+    # Needed by frozen builds (for dictionaries loading worker processes).
+    multiprocessing.freeze_support()
     description = "Run the plover stenotype engine. This is a graphical application."
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument('--version', action='version', version='%s %s'
@@ -64,6 +68,7 @@ def main():
     log.info('Plover %s', __version__)
     log.info('configuration directory: %s', CONFIG_DIR)
     log.info('plugins directory: %s', PLUGINS_DIR)
+    log.info('cache directory: %s', CACHE_DIR)
 
     registry.update()
 
@@ -127,6 +132,10 @@ def main():
             # This must be done after calling init_config_dir, so
             # Plover's configuration directory actually exists.
             log.setup_logfile()
+            try:
+                dictionary_cache.setup(CACHE_DIR)
+            except OSError:
+                log.warning('disabling dictionaries cache', exc_info=True)
             config = Config()
             config.target_file = CONFIG_FILE
             code = gui.main(config)
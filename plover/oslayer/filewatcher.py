@@ -0,0 +1,324 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+#
+# filewatcher.py - Cross platform files changes notification.
+
+"""Watch files for changes.
+
+On Linux, inotify is used, so no work is done until a watched file
+actually changes; on other platforms, or if inotify is not available,
+the files are periodically polled.
+
+Changes are debounced: the callback is only called once a file has
+not changed for `delay` seconds, so a program saving a file in several
+steps (e.g. write to a temporary file, remove the original, and rename)
+only results in one notification.
+"""
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from plover import log
+
+
+class _FileWatcherBase(object):
+
+    def __init__(self, callback, delay=0.2):
+        '''Call <callback> with the (absolute) filename of each changed file.
+
+        Note: the callback is called from the watcher thread.
+        '''
+        self.delay = delay
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._filenames = frozenset()
+        # Filename -> notification deadline.
+        self._pending = {}
+        self._thread = None
+        self._stopped = False
+
+    def watch(self, filenames):
+        '''Set the list of watched files.'''
+        filenames = frozenset(os.path.abspath(f) for f in filenames)
+        with self._lock:
+            if filenames == self._filenames:
+                return
+            self._filenames = filenames
+            for filename in list(self._pending):
+                if filename not in filenames:
+                    del self._pending[filename]
+            if self._thread is None:
+                self._stopped = False
+                try:
+                    self._start()
+                except:
+                    self._filenames = frozenset()
+                    raise
+                self._thread = threading.Thread(target=self._run,
+                                                name='FileWatcher',
+                                                daemon=True)
+                self._thread.start()
+            else:
+                self._update()
+        self._wakeup()
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopped = True
+            self._thread = None
+        self._wakeup()
+        thread.join()
+
+    def _changed(self, filenames):
+        deadline = time.monotonic() + self.delay
+        with self._lock:
+            for filename in filenames:
+                if filename in self._filenames:
+                    self._pending[filename] = deadline
+
+    def _notify(self):
+        '''Notify due changes, and return the time until the next deadline (or None).'''
+        now = time.monotonic()
+        with self._lock:
+            due = [f for f, deadline in self._pending.items() if deadline <= now]
+            for filename in due:
+                del self._pending[filename]
+            timeout = None
+            if self._pending:
+                timeout = max(0, min(self._pending.values()) - now)
+        for filename in sorted(due):
+            try:
+                self._callback(filename)
+            except Exception:
+                log.error('file watcher callback failed', exc_info=True)
+        return timeout
+
+    def _start(self):
+        pass
+
+    def _update(self):
+        pass
+
+    def _wakeup(self):
+        raise NotImplementedError()
+
+    def _run(self):
+        raise NotImplementedError()
+
+
+class PollingFileWatcher(_FileWatcherBase):
+    '''Check watched files every <interval> seconds.'''
+
+    def __init__(self, callback, delay=0.2, interval=2.0):
+        super(PollingFileWatcher, self).__init__(callback, delay=delay)
+        self.interval = interval
+        self._event = threading.Event()
+        self._stats = {}
+
+    @staticmethod
+    def _stat(filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _wakeup(self):
+        self._event.set()
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while True:
+            with self._lock:
+                if self._stopped:
+                    break
+                filenames = self._filenames
+            now = time.monotonic()
+            if now >= next_poll:
+                changed = []
+                stats = {}
+                for filename in filenames:
+                    st = self._stat(filename)
+                    # Note: a new file is only recorded.
+                    if filename in self._stats and st != self._stats[filename]:
+                        changed.append(filename)
+                    stats[filename] = st
+                self._stats = stats
+                self._changed(changed)
+                next_poll = now + self.interval
+            timeout = self._notify()
+            timeout = next_poll - time.monotonic() if timeout is None \
+                else min(timeout, next_poll - time.monotonic())
+            self._event.wait(max(0, timeout))
+            self._event.clear()
+
+
+if sys.platform.startswith('linux'):
+
+    import ctypes
+    import ctypes.util
+
+    IN_MODIFY      = 0x00000002
+    IN_ATTRIB      = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM  = 0x00000040
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    IN_Q_OVERFLOW  = 0x00004000
+    IN_IGNORED     = 0x00008000
+    IN_ONLYDIR     = 0x01000000
+    IN_CLOEXEC     = 0o2000000
+    IN_NONBLOCK    = 0o4000
+
+    # Watch the parent directories, since most programs
+    # replace files (e.g. rename a temporary file over it).
+    _WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE |
+                   IN_MOVED_FROM | IN_MOVED_TO |
+                   IN_CREATE | IN_DELETE | IN_ONLYDIR)
+
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _inotify_init1 = _libc.inotify_init1
+        _inotify_add_watch = _libc.inotify_add_watch
+        _inotify_rm_watch = _libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        _libc = None
+    else:
+        _inotify_init1.argtypes = (ctypes.c_int,)
+        _inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        _inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+
+
+    class InotifyFileWatcher(_FileWatcherBase):
+
+        def __init__(self, callback, delay=0.2):
+            if _libc is None:
+                raise OSError('inotify is not available')
+            super(InotifyFileWatcher, self).__init__(callback, delay=delay)
+            self._fd = None
+            self._wakeup_fds = None
+            # Used if inotify cannot be started (e.g. too many open files).
+            self._fallback = None
+            # Watch descriptor -> directory, and directory -> watch descriptor.
+            self._wd_directories = {}
+            self._directory_wds = {}
+
+        def _start(self):
+            fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+            try:
+                self._wakeup_fds = os.pipe()
+            except OSError:
+                os.close(fd)
+                raise
+            self._fd = fd
+            self._update()
+
+        def watch(self, filenames):
+            if self._fallback is None:
+                try:
+                    super(InotifyFileWatcher, self).watch(filenames)
+                    return
+                except OSError as e:
+                    log.warning('inotify failed (%s), falling back to polling', e)
+                    self._fallback = PollingFileWatcher(self._callback, delay=self.delay)
+            self._fallback.watch(filenames)
+
+        def stop(self):
+            if self._fallback is not None:
+                self._fallback.stop()
+            super(InotifyFileWatcher, self).stop()
+
+        def _update(self):
+            directories = {os.path.dirname(f) for f in self._filenames}
+            for directory in set(self._directory_wds) - directories:
+                wd = self._directory_wds.pop(directory)
+                del self._wd_directories[wd]
+                _inotify_rm_watch(self._fd, wd)
+            for directory in directories - set(self._directory_wds):
+                wd = _inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+                if wd < 0:
+                    log.warning('cannot watch %s: %s', directory,
+                                os.strerror(ctypes.get_errno()))
+                    continue
+                self._directory_wds[directory] = wd
+                self._wd_directories[wd] = directory
+
+        def _wakeup(self):
+            with self._lock:
+                if self._wakeup_fds is not None:
+                    os.write(self._wakeup_fds[1], b'\0')
+
+        def _read_events(self):
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            changed = set()
+            offset = 0
+            with self._lock:
+                while offset < len(data):
+                    wd, mask, cookie, size = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset:offset + size].rstrip(b'\0')
+                    offset += size
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost, assume everything changed.
+                        changed.update(self._filenames)
+                        continue
+                    directory = self._wd_directories.get(wd)
+                    if directory is None:
+                        continue
+                    if mask & IN_IGNORED:
+                        # The directory is gone.
+                        del self._wd_directories[wd]
+                        del self._directory_wds[directory]
+                        continue
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+            self._changed(changed)
+
+        def _run(self):
+            fd = self._fd
+            wakeup_fd = self._wakeup_fds[0]
+            try:
+                timeout = None
+                while True:
+                    readable = select.select((fd, wakeup_fd), (), (), timeout)[0]
+                    if wakeup_fd in readable:
+                        os.read(wakeup_fd, 1024)
+                        with self._lock:
+                            if self._stopped:
+                                break
+                    if fd in readable:
+                        self._read_events()
+                    timeout = self._notify()
+            finally:
+                with self._lock:
+                    os.close(fd)
+                    for wakeup_fd in self._wakeup_fds:
+                        os.close(wakeup_fd)
+                    self._fd = self._wakeup_fds = None
+                    self._wd_directories.clear()
+                    self._directory_wds.clear()
+
+
+def FileWatcher(callback, delay=0.2):
+    '''Create the best available file watcher for the platform.'''
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyFileWatcher(callback, delay=delay)
+        except OSError:
+            log.warning('inotify is not available, falling back to polling')
+    return PollingFileWatcher(callback, delay=delay)
@@ -0,0 +1,387 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Search dictionaries entries by strokes or translation.
+
+The index is built in a background thread on first use (searches
+scan the dictionaries until it's ready), and then kept up to date:
+changes to the dictionaries are recorded, and applied on the next
+search (or the index is rebuilt if a big chunk of it changed).
+
+For each field, the distinct texts are kept sorted, so prefix matches
+are found with a binary search. For substring matches, the sorted texts
+are joined into one string, searched with `str.find`. Fuzzy matches are
+found by generating the variants of the pattern within the maximum edit
+distance (restricted to the characters in use), and looking them up.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+import gc
+from itertools import compress, islice, repeat
+from operator import contains, itemgetter
+import threading
+
+from plover.steno import STROKE_DELIMITER
+
+
+SearchResult = namedtuple('SearchResult', 'strokes translation dictionary')
+
+FIELDS = ('strokes', 'translation')
+MODES = ('prefix', 'substring', 'fuzzy')
+
+# Used to join texts, for substring searches.
+_SEPARATOR = '\0'
+
+# Field -> texts of a list of entries (or items).
+_TEXTS = {
+    'strokes': lambda entries: map(STROKE_DELIMITER.join,
+                                   map(itemgetter(0), entries)),
+    'translation': lambda entries: map(str.lower, map(itemgetter(1), entries)),
+}
+
+
+def _edits(text, alphabet):
+    '''Return the variants of <text> at an edit distance of 1 (insertion,
+    deletion, substitution, or transposition of 2 adjacent characters).
+    '''
+    splits = [(text[:n], text[n:]) for n in range(len(text) + 1)]
+    edits = set()
+    for left, right in splits:
+        if right:
+            edits.add(left + right[1:])
+            if len(right) > 1:
+                edits.add(left + right[1] + right[0] + right[2:])
+            for c in alphabet:
+                edits.add(left + c + right[1:])
+        for c in alphabet:
+            edits.add(left + c + right)
+    edits.discard(text)
+    return edits
+
+
+class _FieldIndex(object):
+
+    def __init__(self, text_of):
+        # Entry -> indexed text.
+        self.text_of = text_of
+        # Text -> entries.
+        self.entries = {}
+        self._sorted = []
+        # Characters in use.
+        self._alphabet = set()
+        # Joined texts, and offset of each text,
+        # for substring searches. Built on demand.
+        self._blob = None
+        self._offsets = None
+
+    def build(self, texts, entries):
+        index = {}
+        get = index.get
+        for text, entry in zip(texts, entries):
+            text_entries = get(text)
+            if text_entries is None:
+                index[text] = [entry]
+            else:
+                text_entries.append(entry)
+        self.entries = index
+        self._sorted = sorted(index)
+        self._alphabet = set(_SEPARATOR.join(self._sorted))
+        self._alphabet.discard(_SEPARATOR)
+        self._blob = self._offsets = None
+
+    def add(self, entry):
+        text = self.text_of(entry)
+        text_entries = self.entries.get(text)
+        if text_entries is not None:
+            text_entries.append(entry)
+            return
+        self.entries[text] = [entry]
+        insort(self._sorted, text)
+        self._alphabet.update(text)
+        self._blob = self._offsets = None
+
+    def remove(self, entry):
+        text = self.text_of(entry)
+        text_entries = self.entries[text]
+        text_entries.remove(entry)
+        if text_entries:
+            return
+        del self.entries[text]
+        del self._sorted[bisect_left(self._sorted, text)]
+        self._blob = self._offsets = None
+
+    def prefix_matches(self, pattern):
+        '''Yield the texts starting with <pattern>, in order.'''
+        texts = self._sorted
+        for n in range(bisect_left(texts, pattern), len(texts)):
+            text = texts[n]
+            if not text.startswith(pattern):
+                break
+            yield text
+
+    def substring_matches(self, pattern):
+        '''Yield the texts containing <pattern>: prefix matches
+        first, and then the others, each group in order.
+        '''
+        yield from self.prefix_matches(pattern)
+        if not pattern or _SEPARATOR in pattern:
+            return
+        if self._blob is None:
+            offsets = array('L')
+            offset = 0
+            for text in self._sorted:
+                offsets.append(offset)
+                offset += len(text) + 1
+            self._blob = _SEPARATOR.join(self._sorted)
+            self._offsets = offsets
+        blob, offsets, texts = self._blob, self._offsets, self._sorted
+        pos = blob.find(pattern)
+        while pos >= 0:
+            n = bisect_right(offsets, pos) - 1
+            start = offsets[n]
+            text = texts[n]
+            if pos != start:
+                yield text
+            # Each text is only returned once.
+            pos = blob.find(pattern, start + len(text) + 1)
+
+    def fuzzy_matches(self, pattern, max_distance):
+        '''Yield the texts within <max_distance> edits of <pattern>,
+        closest first, and in order for the same distance.
+        '''
+        entries = self.entries
+        if pattern in entries:
+            yield pattern
+        seen = {pattern}
+        variants = seen
+        for distance in range(max_distance):
+            new_variants = set()
+            for variant in variants:
+                new_variants.update(_edits(variant, self._alphabet))
+            variants = new_variants - seen
+            seen |= variants
+            yield from sorted(v for v in variants if v in entries)
+
+
+class SearchIndex(object):
+    '''Index of the entries of a list of dictionaries.
+
+    Note: all dictionaries are indexed, including disabled ones.
+    '''
+
+    def __init__(self, dictionaries=()):
+        self._lock = threading.Lock()
+        self._dictionaries = []
+        # Dictionary priority, by identity.
+        self._priority = {}
+        self._fields = self._new_fields()
+        self._size = 0
+        self._built = False
+        # Background build thread, while building.
+        self._builder = None
+        # Incremented when the dictionaries change,
+        # so an outdated build is discarded.
+        self._generation = 0
+        # Changed (dictionary, key) pairs, not yet applied.
+        self._pending = set()
+        self.set_dictionaries(dictionaries)
+
+    @staticmethod
+    def _new_fields():
+        return {
+            'strokes': _FieldIndex(lambda e: STROKE_DELIMITER.join(e[0])),
+            'translation': _FieldIndex(lambda e: e[1].lower()),
+        }
+
+    def set_dictionaries(self, dictionaries):
+        with self._lock:
+            old_dictionaries = self._dictionaries
+            for d in old_dictionaries:
+                d.remove_change_listener(self._change_listener)
+            self._dictionaries = list(dictionaries)
+            self._priority = {id(d): n for n, d in enumerate(self._dictionaries)}
+            for d in self._dictionaries:
+                d.add_change_listener(self._change_listener)
+            if not self._built:
+                self._generation += 1
+                return
+            # Dictionaries that were added or removed.
+            changed = [d for d in old_dictionaries if id(d) not in self._priority]
+            old_ids = set(map(id, old_dictionaries))
+            changed.extend(d for d in self._dictionaries if id(d) not in old_ids)
+        for d in changed:
+            self._change_listener(d, d)
+
+    def _change_listener(self, dictionary, keys):
+        with self._lock:
+            if self._builder is not None:
+                # Applied once built.
+                self._pending.update((dictionary, key) for key in keys)
+                return
+            if not self._built:
+                return
+            # Rebuilding the index from scratch is faster than
+            # updating each entry when a big chunk of it changed.
+            if (len(self._pending) + len(keys)) * 16 > self._size:
+                self._built = False
+                self._pending.clear()
+                return
+            self._pending.update((dictionary, key) for key in keys)
+
+    def build(self, threaded=False):
+        '''Build the index now, instead of on first search.
+
+        If <threaded> is True, it's built in a background thread,
+        and the thread is returned (None if already built).
+        '''
+        with self._lock:
+            thread = None if self._built else self._start_build()
+        if threaded:
+            return thread
+        if thread is not None:
+            thread.join()
+
+    def _start_build(self):
+        # Note: must be called with the lock held.
+        if self._builder is None:
+            # Changes from now on are recorded, and applied
+            # once built: so none are missed, even if they
+            # happen while the dictionaries are copied.
+            self._pending.clear()
+            self._builder = threading.Thread(
+                target=self._build, name='SearchIndex', daemon=True,
+                args=(list(self._dictionaries), self._generation))
+            self._builder.start()
+        return self._builder
+
+    def _build(self, dictionaries, generation):
+        fields = None
+        # Note: disable the garbage collector while building the
+        # index, as it's otherwise repeatedly (and needlessly)
+        # triggered by the creation of all those containers.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # Note: entries are stored as plain tuples, and only
+            # converted to `SearchResult` when returned.
+            entries = []
+            for d in dictionaries:
+                entries.extend(map(tuple.__add__, d.copy_items(), repeat((d,))))
+            fields = self._new_fields()
+            for field, index in fields.items():
+                index.build(_TEXTS[field](entries), entries)
+        finally:
+            if gc_enabled:
+                gc.enable()
+            with self._lock:
+                self._builder = None
+                if fields is not None and generation == self._generation:
+                    self._fields = fields
+                    self._size = len(entries)
+                    self._built = True
+
+    def _scan(self, pattern, field, mode, max_distance, dictionaries):
+        '''Return a field index of the entries matching <pattern>, from
+        a scan of the dictionaries: used until the index is built.
+        '''
+        index = _FieldIndex(self._fields[field].text_of)
+        texts_of = _TEXTS[field]
+        # Note: only the matching items are turned into entries.
+        items = [(d, d.copy_items()) for d in self._dictionaries
+                 if dictionaries is None or d.path in dictionaries]
+        if mode == 'prefix':
+            match = lambda texts: map(str.startswith, texts, repeat(pattern))
+        elif mode == 'substring':
+            match = lambda texts: map(contains, texts, repeat(pattern))
+        else:
+            alphabet = set()
+            for d, d_items in items:
+                alphabet.update(''.join(texts_of(d_items)))
+            variants = new_variants = {pattern}
+            for distance in range(max_distance):
+                new_variants = set().union(*(
+                    _edits(variant, alphabet) for variant in new_variants
+                )) - variants
+                variants |= new_variants
+            match = lambda texts: map(variants.__contains__, texts)
+        matches = []
+        for d, d_items in items:
+            matches.extend(map(tuple.__add__,
+                               compress(d_items, match(texts_of(d_items))),
+                               repeat((d,))))
+        # Note: the matching texts are then found in this
+        # smaller index like they would be in the full one.
+        index.build(texts_of(matches), matches)
+        return index
+
+    def _update(self):
+        strokes_field = self._fields['strokes']
+        for d, key in self._pending:
+            for entry in strokes_field.entries.get(STROKE_DELIMITER.join(key), ()):
+                if entry[2] is d and entry[0] == key:
+                    for field in self._fields.values():
+                        field.remove(entry)
+                    self._size -= 1
+                    break
+            if id(d) not in self._priority:
+                continue
+            value = d.get(key)
+            if value is not None:
+                entry = (key, value, d)
+                for field in self._fields.values():
+                    field.add(entry)
+                self._size += 1
+        self._pending.clear()
+
+    def search(self, pattern, field='translation', mode='prefix',
+               max_distance=1, start=0, count=None, dictionaries=None):
+        '''Search for entries matching <pattern>.
+
+        <field> is either 'strokes' (e.g. `STPH/-G`), or 'translation'
+        (case insensitive). <mode> is one of:
+
+        - 'prefix': entries starting with <pattern>
+        - 'substring': entries containing <pattern>, prefix matches first
+        - 'fuzzy': entries within <max_distance> edits of <pattern>,
+          closest first
+
+        Matches are otherwise sorted by text, and then by dictionary
+        priority. Only entries from <dictionaries> (paths) are returned
+        if set.
+
+        Return a list of up to <count> (all if None) `SearchResult`,
+        skipping the first <start> matches.
+        '''
+        if field not in self._fields:
+            raise ValueError('invalid search field: %r' % field)
+        if mode not in MODES:
+            raise ValueError('invalid search mode: %r' % mode)
+        if field == 'translation':
+            pattern = pattern.lower()
+        with self._lock:
+            if self._built:
+                self._update()
+                index = self._fields[field]
+            else:
+                self._start_build()
+                index = self._scan(pattern, field, mode,
+                                   max_distance, dictionaries)
+            if mode == 'prefix':
+                texts = index.prefix_matches(pattern)
+            elif mode == 'substring':
+                texts = index.substring_matches(pattern)
+            else:
+                texts = index.fuzzy_matches(pattern, max_distance)
+            priority = self._priority
+            def sort_key(entry):
+                return priority[id(entry[2])], len(entry[0]), entry[0]
+            results = (
+                entry
+                for text in texts
+                for entry in sorted(index.entries[text], key=sort_key)
+                if dictionaries is None or entry[2].path in dictionaries
+            )
+            stop = None if count is None else start + count
+            return list(map(SearchResult._make, islice(results, start, stop)))
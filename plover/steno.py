@@ -11,7 +11,10 @@ Stroke -- A data model class that encapsulates a sequence of steno keys.
 
 """
 
+import functools
 import re
+import sys
+import threading
 
 from plover import system
 
@@ -21,7 +24,15 @@ STROKE_DELIMITER = '/'
 _NUMBERS = set('0123456789')
 _IMPLICIT_NUMBER_RX = re.compile('(^|[1-4])([6-9])')
 
+# Note: the same few thousands strokes are used over and over in
+# dictionaries, so the results are cached (and interned, so they
+# can be shared by all dictionaries). The cache is cleared when
+# changing system (see `plover.system.setup`).
+@functools.lru_cache(maxsize=None)
 def normalize_stroke(stroke):
+    return sys.intern(_normalize_stroke(stroke))
+
+def _normalize_stroke(stroke):
     letters = set(stroke)
     if letters & _NUMBERS:
         if system.NUMBER_KEY in letters:
@@ -40,8 +51,7 @@ def normalize_stroke(stroke):
 
 def normalize_steno(strokes_string):
     """Convert steno strings to one common form."""
-    return tuple(normalize_stroke(stroke) for stroke
-                 in strokes_string.split(STROKE_DELIMITER))
+    return tuple(map(normalize_stroke, strokes_string.split(STROKE_DELIMITER)))
 
 def sort_steno_keys(steno_keys):
     return sorted(steno_keys, key=lambda x: system.KEY_ORDER.get(x, -1))
@@ -51,6 +61,44 @@ def sort_steno_strokes(strokes_list):
     return sorted(strokes_list, key=lambda x: (len(x), sum(map(len, x))))
 
 
+# Bit of each key in stroke masks, for the current system: the system
+# keys come first, in steno order, then the number keys; other keys are
+# given a new bit on first use. Reset when changing system, see
+# `Stroke.cache_clear`.
+_KEY_BITS = {}
+# Held when adding keys to `_KEY_BITS`, so each gets its own bit.
+_KEY_BITS_LOCK = threading.Lock()
+# Mask of the (unprocessed) keys -> interned stroke.
+_STROKES = {}
+
+def _key_bit(key):
+    with _KEY_BITS_LOCK:
+        return _add_key_bit(key)
+
+def _add_key_bit(key):
+    # Note: `_KEY_BITS_LOCK` must be held.
+    bit = _KEY_BITS.get(key)
+    if bit is None:
+        bit = _KEY_BITS[key] = 1 << len(_KEY_BITS)
+    return bit
+
+def keys_mask(steno_keys):
+    """Return the bitmask of a sequence of steno keys."""
+    mask = 0
+    key_bits = _KEY_BITS
+    for key in steno_keys:
+        bit = key_bits.get(key)
+        if bit is None:
+            bit = _key_bit(key)
+        mask |= bit
+    return mask
+
+def mask_keys(mask):
+    """Return the steno keys of a bitmask (see `keys_mask`)."""
+    with _KEY_BITS_LOCK:
+        return [key for key, bit in _KEY_BITS.items() if mask & bit]
+
+
 class Stroke(object):
     """A standardized data model for stenotype machine strokes.
 
@@ -62,9 +110,28 @@ class Stroke(object):
     stenographic ordering on the keys, and combines the keys into a single
     string (called RTFCRE for historical reasons).
 
+    Strokes are immutable, and interned: creating a stroke from the same
+    keys returns the same instance. Each stroke also has an integer
+    bitmask form of its keys (`mask`), used for hashing and equality.
+
     """
 
-    def __init__(self, steno_keys) :
+    def __new__(cls, steno_keys, *args, **kwargs):
+        mask = 0
+        key_bits = _KEY_BITS
+        for key in steno_keys:
+            bit = key_bits.get(key)
+            if bit is None:
+                bit = _key_bit(key)
+            mask |= bit
+        if cls is not Stroke:
+            return cls._create(mask_keys(mask))
+        stroke = _STROKES.get(mask)
+        if stroke is None:
+            stroke = _STROKES[mask] = cls._create(mask_keys(mask))
+        return stroke
+
+    def __init__(self, steno_keys):
         """Create a steno stroke by formatting steno keys.
 
         Arguments:
@@ -72,6 +139,35 @@ class Stroke(object):
         steno_keys -- A sequence of pressed keys.
 
         """
+        # Note: the stroke is already fully initialized by `__new__`,
+        # this is kept so subclasses can still call it.
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Create a steno stroke from a bitmask (see `keys_mask`)."""
+        stroke = _STROKES.get(mask) if cls is Stroke else None
+        if stroke is None:
+            stroke = cls(mask_keys(mask))
+        return stroke
+
+    @staticmethod
+    def cache_clear():
+        """Clear the strokes cache, and reset the keys bitmasks.
+
+        Called when changing system (see `plover.system.setup`).
+        """
+        with _KEY_BITS_LOCK:
+            _STROKES.clear()
+            _KEY_BITS.clear()
+            for key in system.KEYS:
+                _add_key_bit(key)
+            for key in sort_steno_keys(system.NUMBERS.values()):
+                _add_key_bit(key)
+
+    @classmethod
+    def _create(cls, steno_keys):
+        self = super(Stroke, cls).__new__(cls)
+
         # Remove duplicate keys and save local versions of the input 
         # parameters.
         steno_keys_set = set(steno_keys)
@@ -96,25 +192,41 @@ class Stroke(object):
             post = ''.join(k.strip('-') for k in steno_keys if k[0] == '-')
             self.rtfcre = '-'.join([pre, post]) if post else pre
 
-        self.steno_keys = steno_keys
+        # Note: a tuple, since it's shared by all the identical strokes.
+        self._steno_keys = tuple(steno_keys)
+        self.mask = keys_mask(steno_keys)
 
         # Determine if this stroke is a correction stroke.
         self.is_correction = (self.rtfcre == system.UNDO_STROKE_STENO)
+        return self
+
+    @property
+    def steno_keys(self):
+        """The steno keys of the stroke, in steno order (a tuple)."""
+        return self._steno_keys
+
+    def __reduce__(self):
+        return type(self), (self._steno_keys,)
 
     def __str__(self):
         if self.is_correction:
             prefix = '*'
         else:
             prefix = ''
-        return '%sStroke(%s : %s)' % (prefix, self.rtfcre, self.steno_keys)
+        return '%sStroke(%s : %s)' % (prefix, self.rtfcre, list(self._steno_keys))
+
+    def __hash__(self):
+        return self.mask
 
     def __eq__(self, other):
-        return (isinstance(other, Stroke)
-                and self.steno_keys == other.steno_keys)
+        # Note: masks are only comparable for the same system,
+        # so the keys are checked too when they're the same.
+        return self is other or (isinstance(other, Stroke)
+                                 and self.mask == other.mask
+                                 and self._steno_keys == other._steno_keys)
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __repr__(self):
         return str(self)
-
@@ -7,11 +7,185 @@ A steno dictionary maps sequences of steno strokes to translations.
 
 """
 
+from collections.abc import ItemsView, MutableMapping
+from functools import partial
 import collections
+import json
 import os
 import shutil
+import sys
+import threading
 
+from plover import log
 from plover.resource import ASSET_SCHEME, resource_filename, resource_timestamp
+from plover.steno import STROKE_DELIMITER
+from plover.suggestions import MODS, SuggestionIndex
+
+
+# Suffix of the journal file, see `StenoDictionary.save`.
+JOURNAL_SUFFIX = '.journal'
+
+
+# Number of bits used for each stroke ID in a packed key.
+_STROKE_ID_BITS = 24
+_STROKE_ID_MASK = (1 << _STROKE_ID_BITS) - 1
+
+
+class _CompactItemsView(ItemsView):
+
+    def __iter__(self):
+        unpack = self._mapping.unpack
+        for packed, value in self._mapping._entries.items():
+            yield unpack(packed), value
+
+
+class CompactStorage(MutableMapping):
+    '''Memory efficient storage for steno dictionary entries.
+
+    Stroke strings are interned and assigned an integer ID, and each
+    key is packed into a single integer of consecutive stroke IDs.
+    Translations are deduplicated through a table.
+
+    Keys are still passed in and returned as tuples of strokes.
+    '''
+
+    def __init__(self, entries=()):
+        # Stroke to ID, and ID to stroke (0 is reserved).
+        self._stroke_ids = {}
+        self._strokes = [None]
+        self._values = {}
+        self._entries = {}
+        for key, value in entries:
+            self[key] = value
+
+    def pack(self, key, add=False):
+        '''Pack <key> into an integer.
+
+        Return None if <key> uses an unknown stroke, unless
+        <add> is True, in which case new IDs are allocated.
+        '''
+        stroke_ids = self._stroke_ids
+        packed = 0
+        shift = 0
+        for stroke in key:
+            stroke_id = stroke_ids.get(stroke)
+            if stroke_id is None:
+                if not add:
+                    return None
+                stroke_id = len(self._strokes)
+                if stroke_id > _STROKE_ID_MASK:
+                    raise ValueError('too many different strokes')
+                stroke = sys.intern(stroke)
+                self._strokes.append(stroke)
+                stroke_ids[stroke] = stroke_id
+            packed |= stroke_id << shift
+            shift += _STROKE_ID_BITS
+        return packed
+
+    def unpack(self, packed):
+        strokes = self._strokes
+        key = []
+        while packed:
+            key.append(strokes[packed & _STROKE_ID_MASK])
+            packed >>= _STROKE_ID_BITS
+        return tuple(key)
+
+    def intern_key(self, key):
+        '''Return <key> using the interned stroke strings.'''
+        return self.unpack(self.pack(key, add=True))
+
+    def intern_value(self, value):
+        return self._values.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        unpack = self.unpack
+        for packed in self._entries:
+            yield unpack(packed)
+
+    def __getitem__(self, key):
+        packed = self.pack(key)
+        if packed is None:
+            raise KeyError(key)
+        return self._entries[packed]
+
+    def __setitem__(self, key, value):
+        self._entries[self.pack(key, add=True)] = self.intern_value(value)
+
+    def __delitem__(self, key):
+        packed = self.pack(key)
+        if packed is None:
+            raise KeyError(key)
+        del self._entries[packed]
+
+    def __contains__(self, key):
+        packed = self.pack(key)
+        return packed is not None and packed in self._entries
+
+    def get(self, key, fallback=None):
+        packed = self.pack(key)
+        if packed is None:
+            return fallback
+        return self._entries.get(packed, fallback)
+
+    def items(self):
+        return _CompactItemsView(self)
+
+    def clear(self):
+        self._stroke_ids.clear()
+        del self._strokes[1:]
+        self._values.clear()
+        self._entries.clear()
+
+
+# Marker for missing entries.
+_MISSING = object()
+
+
+def _reverse_add(reverse, casereverse, value, rkey):
+    rkeys = reverse.get(value)
+    if rkeys is None:
+        reverse[value] = rkey
+        lowercase = value.lower()
+        variants = casereverse.get(lowercase)
+        if variants is None:
+            casereverse[lowercase] = value
+        elif isinstance(variants, list):
+            variants.append(value)
+        else:
+            casereverse[lowercase] = [variants, value]
+    elif isinstance(rkeys, list):
+        rkeys.append(rkey)
+    else:
+        reverse[value] = [rkeys, rkey]
+
+def _reverse_remove(reverse, casereverse, value, rkey):
+    rkeys = reverse[value]
+    if isinstance(rkeys, list):
+        rkeys.remove(rkey)
+        if len(rkeys) == 1:
+            reverse[value] = rkeys[0]
+        return
+    del reverse[value]
+    lowercase = value.lower()
+    variants = casereverse[lowercase]
+    if isinstance(variants, list):
+        variants.remove(value)
+        if len(variants) == 1:
+            casereverse[lowercase] = variants[0]
+    else:
+        del casereverse[lowercase]
+
+
+def _journal_header(filename):
+    '''Return the journal header for <filename>: its
+    modification time and size, so a journal is only
+    replayed against the file it was written for.
+    '''
+    st = os.stat(filename)
+    return {'base': [st.st_mtime_ns, st.st_size]}
 
 
 class StenoDictionary(object):
@@ -23,24 +197,81 @@ class StenoDictionary(object):
     Attributes:
     longest_key -- A read only property holding the length of the longest key.
     timestamp -- File last modification time, used to detect external changes.
+    compact -- True if entries are kept in a `CompactStorage`, see
+    `use_compact_storage`.
+
+    The reverse indexes used by `reverse_lookup` and `casereverse_lookup`
+    are only built on first use (see `build_reverse_index`), and kept in
+    sync after that.
 
     """
 
     # False if class support creation.
     readonly = False
 
+    # False if the entries must not be merged in a collection's lookup
+    # index, e.g. because they are not all held in memory. Note: set
+    # automatically for subclasses overriding `get`/`__getitem__`,
+    # see `__init_subclass__`.
+    mergeable = True
+
+    # True if the dictionary is fully described by its entries, so it
+    # can be snapshotted and restored (see `_snapshot`), e.g. to save
+    # it to the dictionaries cache, or to parse it in another process.
+    cacheable = False
+
+    # True if changes are saved to an append-only journal, see `save`.
+    journaled = False
+
+    # Maximum number of records in the journal: past
+    # that, the next save rewrites the whole file.
+    journal_max_records = 1000
+
     def __init__(self):
         self._dict = {}
+        self.compact = False
         self._longest_key_length = 0
+        # Number of keys of each length: the last
+        # item is always for the longest keys.
+        self._key_lengths = [0]
         self._longest_listener_callbacks = set()
-        self.reverse = collections.defaultdict(list)
-        # Case-insensitive reverse dict
-        self.casereverse = collections.defaultdict(collections.Counter)
+        self._change_listener_callbacks = set()
+        # Reference count of each proper prefix of the keys.
+        self._prefixes = collections.Counter()
+        # Reverse dict: translation to key, or list of keys (packed
+        # in compact mode), and case-insensitive reverse dict: lowercase
+        # translation to translation, or list of translations. Those
+        # are None until built.
+        self._reverse = None
+        self._casereverse = None
+        # Views of the reverse indexes for `reverse` and `casereverse`,
+        # only built on access, and reset on change.
+        self._reverse_views = None
+        # Held when updating the entries, so the
+        # reverse indexes can be built in the background.
+        self._lock = threading.Lock()
         self.filters = []
         self.timestamp = 0
         self.readonly = False
-        self.enabled = True
+        self._enabled = True
         self.path = None
+        # Keys changed since the last save, or None if they are
+        # not tracked: the next save must rewrite the whole file.
+        self._unsaved = None
+        self._journal_records = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super(StenoDictionary, cls).__init_subclass__(**kwargs)
+        # Subclasses with their own lookup (e.g. computing translations
+        # from the keys) don't necessarily keep their entries in `_dict`:
+        # unless stated otherwise, they are walked, not merged, and any
+        # key may be a prefix of one of their entries.
+        if 'get' not in cls.__dict__ and '__getitem__' not in cls.__dict__:
+            return
+        if 'mergeable' not in cls.__dict__:
+            cls.mergeable = False
+        if cls.is_prefix is StenoDictionary.is_prefix:
+            cls.is_prefix = StenoDictionary._is_any_prefix
 
     def __str__(self):
         return '%s(%r)' % (self.__class__.__name__, self.path)
@@ -58,11 +289,21 @@ class StenoDictionary(object):
         return d
 
     @classmethod
-    def load(cls, resource):
+    def load(cls, resource, compact=False, snapshot=None):
         filename = resource_filename(resource)
         timestamp = resource_timestamp(filename)
         d = cls()
-        d._load(filename)
+        if snapshot is None:
+            if compact:
+                d.use_compact_storage()
+            d._load(filename)
+        else:
+            # Already parsed (e.g. from the cache).
+            d._restore(snapshot)
+            if compact:
+                d.use_compact_storage()
+        if cls.journaled:
+            d._replay_journal(filename)
         if resource.startswith(ASSET_SCHEME) or \
            not os.access(filename, os.W_OK):
             d.readonly = True
@@ -70,9 +311,37 @@ class StenoDictionary(object):
         d.timestamp = timestamp
         return d
 
-    def save(self):
+    def save(self, full=False):
+        '''Save the dictionary.
+
+        For journaled formats, changes since the last save are
+        appended to a journal next to the file, replayed on load.
+        The whole file is only rewritten (and the journal removed)
+        if <full> is True, or the journal is getting too big.
+        '''
         assert not self.readonly
         filename = resource_filename(self.path)
+        with self._lock:
+            unsaved = self._unsaved
+            if self.journaled:
+                self._unsaved = set()
+            if full or unsaved is None or \
+               self._journal_records + len(unsaved) > self.journal_max_records:
+                records = None
+            else:
+                records = [(key, self._dict.get(key, _MISSING))
+                           for key in unsaved]
+        try:
+            if records is None:
+                self._save_file(filename)
+            elif records:
+                self._append_journal(filename, records)
+        except:
+            # Unknown state, make sure the next save starts afresh.
+            self._unsaved = None
+            raise
+
+    def _save_file(self, filename):
         # Write the new file to a temp location.
         tmp = filename + '.tmp'
         self._save(tmp)
@@ -81,6 +350,157 @@ class StenoDictionary(object):
         shutil.move(tmp, filename)
         # And update our timestamp.
         self.timestamp = timestamp
+        # The journal is now obsolete.
+        if self.journaled:
+            try:
+                os.unlink(filename + JOURNAL_SUFFIX)
+            except FileNotFoundError:
+                pass
+            self._journal_records = 0
+
+    def _append_journal(self, filename, records):
+        # One JSON array per line: [strokes, translation],
+        # or [strokes] for a deleted entry.
+        lines = []
+        for key, value in records:
+            record = [STROKE_DELIMITER.join(key)]
+            if value is not _MISSING:
+                record.append(value)
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        with open(filename + JOURNAL_SUFFIX, 'a', encoding='utf-8', newline='\n') as fp:
+            if not fp.tell():
+                # New journal: start with the header.
+                lines.insert(0, json.dumps(_journal_header(filename)) + '\n')
+            fp.write(''.join(lines))
+        self._journal_records += len(records)
+
+    def _replay_journal(self, filename):
+        try:
+            fp = open(filename + JOURNAL_SUFFIX, encoding='utf-8', newline='\n')
+        except FileNotFoundError:
+            records = 0
+        else:
+            with fp, self._lock:
+                records = 0
+                try:
+                    header = json.loads(fp.readline())
+                except ValueError:
+                    header = None
+                if header != _journal_header(filename):
+                    # Written against another version of the file
+                    # (e.g. edited by hand since), or incomplete.
+                    log.warning('discarding outdated dictionary journal: %s',
+                                filename + JOURNAL_SUFFIX)
+                    fp.seek(0, os.SEEK_END)
+                    discard = True
+                else:
+                    discard = False
+                for line in fp:
+                    if not line.endswith('\n'):
+                        # Interrupted write, ignore.
+                        break
+                    try:
+                        record = json.loads(line)
+                        key = tuple(record[0].split(STROKE_DELIMITER))
+                        if len(record) == 1:
+                            try:
+                                self._pop(key)
+                            except KeyError:
+                                pass
+                        else:
+                            self._set(key, record[1])
+                    except (ValueError, TypeError, IndexError,
+                            AttributeError) as e:
+                        raise ValueError('invalid journal record: %r' % line) from e
+                    records += 1
+            self._update_longest_key()
+            if discard:
+                # Note: the next save starts a new one.
+                try:
+                    os.unlink(filename + JOURNAL_SUFFIX)
+                except OSError:
+                    pass
+        self._journal_records = records
+        self._unsaved = set()
+
+    def use_compact_storage(self):
+        '''Switch to a more memory efficient storage for the entries.
+
+        Lookups are a little slower, since keys must be converted
+        to their packed representation first. To keep the memory
+        savings, the dictionary is not merged in a collection's
+        lookup index anymore.
+        '''
+        if self.compact:
+            return
+        self.mergeable = False
+        with self._lock:
+            entries = list(self._dict.items())
+            self._dict = CompactStorage()
+            self._prefixes.clear()
+            self._key_lengths = [0]
+            self._reverse = self._casereverse = self._reverse_views = None
+            self.compact = True
+            for key, value in entries:
+                self._set(key, value)
+
+    def _snapshot(self):
+        '''Return a copy of the entries, and of the prefixes
+        and key lengths indexes.
+
+        The result only contains builtin types, and can be
+        restored with `_restore` (see `plover.dictionary.cache`).
+        '''
+        with self._lock:
+            return (dict(self._dict.items()), dict(self._prefixes),
+                    list(self._key_lengths))
+
+    def _restore(self, snapshot):
+        entries, prefixes, key_lengths = snapshot
+        assert not self.compact and not self._dict
+        with self._lock:
+            self._dict = entries
+            self._prefixes = collections.Counter(prefixes)
+            self._key_lengths = list(key_lengths)
+        self._update_longest_key()
+
+    def sync(self, other):
+        '''Update the entries in place to match those of <other>.
+
+        Only the differences are applied, so the prefixes and reverse
+        indexes are updated incrementally, and listeners are only
+        notified of the keys that were added, changed or removed:
+        used to reload a dictionary after an external modification.
+
+        Return the number of changed keys.
+        '''
+        assert self.cacheable and other.cacheable
+        with self._lock, other._lock:
+            entries = self._dict
+            new_entries = other._dict
+            if self.compact or other.compact:
+                removed = [key for key in entries if key not in new_entries]
+            else:
+                removed = list(entries.keys() - new_entries.keys())
+            changed = [(key, value) for key, value in new_entries.items()
+                       if entries.get(key, _MISSING) != value]
+            for key in removed:
+                self._pop(key)
+            for key, value in changed:
+                self._set(key, value)
+            # The file on disk is now the reference.
+            if self.journaled:
+                self._unsaved = set()
+                self._journal_records = other._journal_records
+            else:
+                self._unsaved = None
+        self.timestamp = other.timestamp
+        self.readonly = other.readonly
+        self._update_longest_key()
+        keys = removed + [key for key, value in changed]
+        if keys:
+            self._notify_change(keys)
+        return len(keys)
 
     def _load(self, filename):
         raise NotImplementedError()
@@ -93,6 +513,18 @@ class StenoDictionary(object):
         """The length of the longest key in the dict."""
         return self._longest_key
 
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        # All the entries are affected.
+        self._notify_change(self._dict.keys())
+
     def __len__(self):
         return self._dict.__len__()
 
@@ -103,62 +535,253 @@ class StenoDictionary(object):
         return self._dict.__getitem__(key)
 
     def clear(self):
-        self._dict.clear()
-        self.reverse.clear()
-        self.casereverse.clear()
-        self._longest_key = 0
+        keys = list(self._dict) if self._change_listener_callbacks else ()
+        with self._lock:
+            self._unsaved = None
+            self._dict.clear()
+            self._prefixes.clear()
+            self._key_lengths = [0]
+            if self._reverse is not None:
+                self._reverse.clear()
+                self._casereverse.clear()
+                self._reverse_views = None
+        self._update_longest_key()
+        self._notify_change(keys)
 
     def items(self):
         return self._dict.items()
 
+    def copy_items(self):
+        '''Return a list of the entries.
+
+        Unlike iterating over `items`, this is safe to use from
+        another thread while the dictionary is being updated.
+        '''
+        with self._lock:
+            return list(self._dict.items())
+
     def update(self, *args, **kwargs):
         assert not self.readonly
-        longest_key = 0
-        _dict = self._dict
-        reverse = self.reverse
-        casereverse = self.casereverse
-        for iterable in args + (kwargs,):
-            if isinstance(iterable, (dict, StenoDictionary)):
-                iterable = iterable.items()
-            for key, value in iterable:
-                longest_key = max(longest_key, len(key))
-                _dict[key] = value
-                reverse[value].append(key)
-                casereverse[value.lower()][value] += 1
-        self._longest_key = max(self._longest_key, longest_key)
+        # Only keep track of updated keys if someone is listening,
+        # or they must be saved to the journal.
+        keys = [] if self._change_listener_callbacks \
+            or self._unsaved is not None else None
+        with self._lock:
+            for iterable in args + (kwargs,):
+                if isinstance(iterable, (dict, StenoDictionary)):
+                    iterable = iterable.items()
+                if self.compact or self._reverse is not None:
+                    for key, value in iterable:
+                        self._set(key, value)
+                        if keys is not None:
+                            keys.append(key)
+                    continue
+                # Fast path, used when loading.
+                _dict = self._dict
+                prefixes = self._prefixes
+                key_lengths = self._key_lengths
+                for key, value in iterable:
+                    if key not in _dict:
+                        key_len = len(key)
+                        if key_len >= len(key_lengths):
+                            key_lengths.extend([0] * (key_len + 1 - len(key_lengths)))
+                        key_lengths[key_len] += 1
+                        for n in range(1, key_len):
+                            prefixes[key[:n]] += 1
+                    _dict[key] = value
+                    if keys is not None:
+                        keys.append(key)
+            if self._unsaved is not None:
+                self._unsaved.update(keys)
+        self._update_longest_key()
+        if keys:
+            self._notify_change(keys)
+
+    def _set(self, key, value):
+        if self.compact:
+            rkey = self._dict.pack(key, add=True)
+            value = self._dict.intern_value(value)
+            entries = self._dict._entries
+        else:
+            rkey = key
+            entries = self._dict
+        old_value = entries.get(rkey, _MISSING)
+        if old_value is _MISSING:
+            self._add_key_length(len(key))
+            if len(key) > 1:
+                self._add_prefixes(self._dict.unpack(rkey)
+                                   if self.compact else key)
+        elif self._reverse is not None:
+            _reverse_remove(self._reverse, self._casereverse, old_value, rkey)
+        entries[rkey] = value
+        if self._reverse is not None:
+            _reverse_add(self._reverse, self._casereverse, value, rkey)
+            self._reverse_views = None
 
     def __setitem__(self, key, value):
         assert not self.readonly
-        self._longest_key = max(self._longest_key, len(key))
-        self._dict[key] = value
-        self.reverse[value].append(key)
-        self.casereverse[value.lower()][value] += 1
+        with self._lock:
+            self._set(key, value)
+            if self._unsaved is not None:
+                self._unsaved.add(key)
+        self._update_longest_key()
+        self._notify_change((key,))
 
     def get(self, key, fallback=None):
         return self._dict.get(key, fallback)
 
+    def _pop(self, key):
+        if self.compact:
+            rkey = self._dict.pack(key)
+            entries = self._dict._entries
+        else:
+            rkey = key
+            entries = self._dict
+        value = entries.pop(rkey, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        self._remove_key_length(len(key))
+        self._remove_prefixes(key)
+        if self._reverse is not None:
+            _reverse_remove(self._reverse, self._casereverse, value, rkey)
+            self._reverse_views = None
+        if self._unsaved is not None:
+            self._unsaved.add(key)
+
     def __delitem__(self, key):
         assert not self.readonly
-        value = self._dict.pop(key)
-        self.reverse[value].remove(key)
-        counter = self.casereverse[value.lower()]
-        count = counter.pop(value) - 1
-        if count:
-            counter[value] = count
-        if len(key) == self.longest_key:
-            if self._dict:
-                self._longest_key = max(len(x) for x in self._dict)
-            else:
-                self._longest_key = 0
+        with self._lock:
+            self._pop(key)
+        self._update_longest_key()
+        self._notify_change((key,))
 
     def __contains__(self, key):
         return self.get(key) is not None
 
+    def _add_key_length(self, key_len):
+        key_lengths = self._key_lengths
+        if key_len >= len(key_lengths):
+            key_lengths.extend([0] * (key_len + 1 - len(key_lengths)))
+        key_lengths[key_len] += 1
+
+    def _remove_key_length(self, key_len):
+        key_lengths = self._key_lengths
+        key_lengths[key_len] -= 1
+        # Drop the counts for lengths no longer in use.
+        while not key_lengths[-1] and len(key_lengths) > 1:
+            key_lengths.pop()
+
+    def _update_longest_key(self):
+        self._longest_key = len(self._key_lengths) - 1
+
+    def _add_prefixes(self, key):
+        prefixes = self._prefixes
+        for n in range(1, len(key)):
+            prefixes[key[:n]] += 1
+
+    def _remove_prefixes(self, key):
+        prefixes = self._prefixes
+        for n in range(1, len(key)):
+            prefix = key[:n]
+            count = prefixes[prefix] - 1
+            if count:
+                prefixes[prefix] = count
+            else:
+                del prefixes[prefix]
+
+    def is_prefix(self, key):
+        '''Return True if <key> is a proper prefix of at least one entry.'''
+        return key in self._prefixes
+
+    def _is_any_prefix(self, key):
+        # Used when the prefixes are unknown (see `__init_subclass__`).
+        return True
+
+    def build_reverse_index(self, threaded=False):
+        '''Build the reverse indexes now, instead of on first use.
+
+        If <threaded> is True, they are built in a background thread,
+        and the thread is returned.
+        '''
+        if threaded:
+            thread = threading.Thread(target=self._reverse_index)
+            thread.start()
+            return thread
+        self._reverse_index()
+
+    def _reverse_index(self):
+        if self._reverse is None:
+            with self._lock:
+                if self._reverse is None:
+                    reverse = {}
+                    casereverse = {}
+                    entries = self._dict._entries if self.compact else self._dict
+                    for rkey, value in entries.items():
+                        _reverse_add(reverse, casereverse, value, rkey)
+                    self._casereverse = casereverse
+                    self._reverse = reverse
+        return self._reverse, self._casereverse
+
+    def _build_reverse_views(self):
+        views = self._reverse_views
+        if views is not None:
+            return views
+        reverse, casereverse = self._reverse_index()
+        with self._lock:
+            unpack = self._dict.unpack if self.compact else None
+            reverse_view = collections.defaultdict(list)
+            for value, rkeys in reverse.items():
+                if not isinstance(rkeys, list):
+                    rkeys = (rkeys,)
+                reverse_view[value] = [unpack(rkey) for rkey in rkeys] \
+                    if unpack is not None else list(rkeys)
+            casereverse_view = collections.defaultdict(collections.Counter)
+            for lowercase, variants in casereverse.items():
+                if not isinstance(variants, list):
+                    variants = (variants,)
+                casereverse_view[lowercase] = collections.Counter({
+                    value: len(reverse_view[value]) for value in variants
+                })
+            views = self._reverse_views = (reverse_view, casereverse_view)
+        return views
+
+    @property
+    def reverse(self):
+        '''Translation -> list of keys.
+
+        Note: built on access (and after each change), so prefer
+        `reverse_lookup`.
+        '''
+        return self._build_reverse_views()[0]
+
+    @property
+    def casereverse(self):
+        '''Lowercase translation -> Counter of translations (with
+        their number of keys).
+
+        Note: built on access (and after each change), so prefer
+        `casereverse_lookup`.
+        '''
+        return self._build_reverse_views()[1]
+
     def reverse_lookup(self, value):
-        return self.reverse[value]
+        rkeys = self._reverse_index()[0].get(value)
+        if rkeys is None:
+            return []
+        if not isinstance(rkeys, list):
+            rkeys = (rkeys,)
+        if self.compact:
+            unpack = self._dict.unpack
+            return [unpack(rkey) for rkey in rkeys]
+        return list(rkeys)
 
     def casereverse_lookup(self, value):
-        return list(self.casereverse[value].keys())
+        variants = self._reverse_index()[1].get(value)
+        if variants is None:
+            return []
+        if isinstance(variants, list):
+            return list(variants)
+        return [variants]
 
     @property
     def _longest_key(self):
@@ -178,6 +801,23 @@ class StenoDictionary(object):
     def remove_longest_key_listener(self, callback):
         self._longest_listener_callbacks.remove(callback)
 
+    def _notify_change(self, keys):
+        for callback in self._change_listener_callbacks:
+            callback(self, keys)
+
+    def add_change_listener(self, callback):
+        '''Add a listener for entries changes.
+
+        <callback> is called with the dictionary and the collection
+        of keys that were added, updated or removed. Note: all keys
+        are reported as changed when the dictionary is enabled or
+        disabled.
+        '''
+        self._change_listener_callbacks.add(callback)
+
+    def remove_change_listener(self, callback):
+        self._change_listener_callbacks.remove(callback)
+
 
 class StenoDictionaryCollection(object):
 
@@ -186,15 +826,131 @@ class StenoDictionaryCollection(object):
         self.filters = []
         self.longest_key = 0
         self.longest_key_callbacks = set()
+        # Longest key of each dictionary, and number of
+        # dictionaries for each of those lengths.
+        self._dicts_longest_key = []
+        self._longest_keys = collections.Counter()
+        self._longest_key_listeners = []
+        # Merged index: for each key, the translation
+        # from the highest priority enabled dictionary.
+        self._index = {}
+        # Proper prefixes of the enabled dictionaries' keys.
+        self._prefixes = set()
+        # Reverse indexes of the merged index (see `StenoDictionary`),
+        # so only the outlines that are not overridden by a higher
+        # priority dictionary are included. Built on first use.
+        self._reverse = None
+        self._casereverse = None
+        # Suggestions index of the translations in the reverse index.
+        self._suggestions = None
+        # Dictionaries covered by the index: all the dictionaries above
+        # the first enabled one that is not mergeable. The others, if
+        # any, are walked when a key is not found in the index.
+        self._merged = []
+        self._unmerged = []
         self.set_dicts(dicts)
 
+    def _remove_listeners(self):
+        for d, listener in zip(self.dicts, self._longest_key_listeners):
+            d.remove_longest_key_listener(listener)
+            d.remove_change_listener(self._change_listener)
+        self._longest_key_listeners = []
+
+    def close(self):
+        '''Stop tracking changes to the dictionaries, and release the index.
+
+        Used when the collection is replaced: the dictionaries don't hold
+        a reference to it anymore, so it can be garbage collected. It's
+        still usable (lookups walk the dictionaries), but slower, and the
+        longest key is not kept up to date.
+        '''
+        self._remove_listeners()
+        self._index = {}
+        self._prefixes = set()
+        self._reverse = self._casereverse = self._suggestions = None
+        self._merged = []
+        self._unmerged = self.dicts[:]
+
     def set_dicts(self, dicts):
-        for d in self.dicts:
-            d.remove_longest_key_listener(self._longest_key_listener)
+        self._remove_listeners()
         self.dicts = dicts[:]
-        for d in self.dicts:
-            d.add_longest_key_listener(self._longest_key_listener)
-        self._longest_key_listener()
+        self._dicts_longest_key = [d.longest_key for d in self.dicts]
+        self._longest_keys = collections.Counter(self._dicts_longest_key)
+        for n, d in enumerate(self.dicts):
+            listener = partial(self._longest_key_listener, n)
+            d.add_longest_key_listener(listener)
+            d.add_change_listener(self._change_listener)
+            self._longest_key_listeners.append(listener)
+        self._set_longest_key(max(self._longest_keys, default=0))
+        self._rebuild_index()
+
+    def _merge_boundary(self):
+        for n, d in enumerate(self.dicts):
+            if d.enabled and not d.mergeable:
+                return n
+        return len(self.dicts)
+
+    def _rebuild_index(self):
+        n = self._merge_boundary()
+        self._merged = self.dicts[:n]
+        self._unmerged = self.dicts[n:]
+        index = {}
+        prefixes = set()
+        # Start with the lowest priority dictionary,
+        # so higher priority entries override it.
+        for d in reversed(self._merged):
+            if d.enabled:
+                index.update(d._dict)
+                prefixes.update(d._prefixes)
+        self._index = index
+        self._prefixes = prefixes
+        self._reverse = self._casereverse = self._suggestions = None
+        # Empty translations are skipped during lookups,
+        # and don't shadow lower priority dictionaries.
+        for key in [k for k, v in index.items() if not v]:
+            self._index_key(key)
+
+    def _index_key(self, key):
+        old_value = self._index.get(key)
+        value = self._lookup(key, dicts=self._merged)
+        if value:
+            self._index[key] = value
+        else:
+            self._index.pop(key, None)
+        if self._reverse is not None and value != old_value:
+            reverse = self._reverse
+            suggestions = self._suggestions
+            if old_value:
+                _reverse_remove(reverse, self._casereverse, old_value, key)
+                if suggestions is not None and old_value not in reverse:
+                    suggestions.remove(old_value)
+            if value:
+                if suggestions is not None and value not in reverse:
+                    suggestions.add(value)
+                _reverse_add(reverse, self._casereverse, value, key)
+        for n in range(1, len(key)):
+            prefix = key[:n]
+            if any(d.enabled and d.is_prefix(prefix) for d in self._merged):
+                self._prefixes.add(prefix)
+            else:
+                self._prefixes.discard(prefix)
+
+    def _change_listener(self, dictionary, keys):
+        if self._merge_boundary() != len(self._merged):
+            # A dictionary that is not mergeable was enabled
+            # or disabled: the set of merged dictionaries changed.
+            self._rebuild_index()
+            return
+        if not any(d is dictionary for d in self._merged):
+            # Not indexed, nothing to update.
+            return
+        # Rebuilding the index from scratch is faster than
+        # updating each key when a big chunk of it changed.
+        if len(keys) * 16 > len(self._index):
+            self._rebuild_index()
+            return
+        for key in keys:
+            self._index_key(key)
 
     def _lookup(self, key, dicts=None, filters=()):
         if dicts is None:
@@ -221,14 +977,50 @@ class StenoDictionaryCollection(object):
         return str(self)
 
     def lookup(self, key):
-        return self._lookup(key, filters=self.filters)
+        if self.filters:
+            return self._lookup(key, filters=self.filters)
+        return self.raw_lookup(key)
 
     def raw_lookup(self, key):
-        return self._lookup(key)
+        value = self._index.get(key)
+        if value is None and self._unmerged:
+            return self._lookup(key, dicts=self._unmerged)
+        return value
+
+    def is_prefix(self, key):
+        '''Return True if <key> is a proper prefix of at least one entry
+        from an enabled dictionary.
+
+        Note: filters are not taken into account.
+        '''
+        if key in self._prefixes:
+            return True
+        return any(d.enabled and d.is_prefix(key) for d in self._unmerged)
+
+    def _reverse_index(self):
+        if self._reverse is None:
+            reverse = {}
+            casereverse = {}
+            for key, value in self._index.items():
+                _reverse_add(reverse, casereverse, value, key)
+            self._reverse = reverse
+            self._casereverse = casereverse
+        return self._reverse, self._casereverse
 
     def reverse_lookup(self, value):
+        if not value:
+            # Empty translations are not indexed.
+            return self._walk_reverse_lookup(value, 0)
+        keys = self._reverse_index()[0].get(value, [])
+        keys = list(keys) if isinstance(keys, list) else [keys]
+        if self._unmerged:
+            keys.extend(self._walk_reverse_lookup(value, len(self._merged)))
+        return keys
+
+    def _walk_reverse_lookup(self, value, start):
         keys = []
-        for n, d in enumerate(self.dicts):
+        for n in range(start, len(self.dicts)):
+            d = self.dicts[n]
             if not d.enabled:
                 continue
             for k in d.reverse_lookup(value):
@@ -237,13 +1029,36 @@ class StenoDictionaryCollection(object):
                     keys.append(k)
         return keys
 
+    def suggestion_variants(self, text):
+        '''Return the variants of <text> (see `plover.suggestions.MODS`)
+        with at least one outline that is not overridden.
+        '''
+        if self._suggestions is None:
+            self._suggestions = SuggestionIndex(self._reverse_index()[0])
+        variants = self._suggestions.variants(text)
+        if not self._unmerged:
+            return variants
+        variants = set(variants)
+        return [
+            mod % text for mod in MODS
+            if mod % text in variants or
+            self._walk_reverse_lookup(mod % text, len(self._merged))
+        ]
+
     def casereverse_lookup(self, value):
-        for d in self.dicts:
+        '''Return the translations, with at least one outline that is
+        not overridden by a higher priority dictionary, that are equal
+        to <value> when lowercased (or None if there's none).
+        '''
+        variants = self._reverse_index()[1].get(value, [])
+        variants = list(variants) if isinstance(variants, list) else [variants]
+        for d in self._unmerged:
             if not d.enabled:
                 continue
-            key = d.casereverse_lookup(value)
-            if key:
-                return key
+            for variant in d.casereverse_lookup(value):
+                if variant not in variants:
+                    variants.append(variant)
+        return variants or None
 
     def first_writable(self):
         '''Return the first writable dictionary.'''
@@ -297,12 +1112,22 @@ class StenoDictionaryCollection(object):
     def remove_longest_key_listener(self, callback):
         self.longest_key_callbacks.remove(callback)
     
-    def _longest_key_listener(self, ignored=None):
-        if self.dicts:
-            new_longest_key = max(d.longest_key for d in self.dicts)
-        else:
-            new_longest_key = 0
-        if new_longest_key != self.longest_key:
-            self.longest_key = new_longest_key
+    def _longest_key_listener(self, n, longest_key):
+        old_longest_key = self._dicts_longest_key[n]
+        self._dicts_longest_key[n] = longest_key
+        longest_keys = self._longest_keys
+        longest_keys[longest_key] += 1
+        longest_keys[old_longest_key] -= 1
+        if not longest_keys[old_longest_key]:
+            del longest_keys[old_longest_key]
+            if old_longest_key == self.longest_key:
+                self._set_longest_key(max(longest_keys))
+                return
+        if longest_key > self.longest_key:
+            self._set_longest_key(longest_key)
+
+    def _set_longest_key(self, longest_key):
+        if longest_key != self.longest_key:
+            self.longest_key = longest_key
             for c in self.longest_key_callbacks:
-                c(new_longest_key)
+                c(longest_key)
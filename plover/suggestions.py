@@ -6,6 +6,74 @@ from plover.steno import sort_steno_strokes
 Suggestion = collections.namedtuple('Suggestion', 'text steno_list')
 
 
+# Variants of a translation looked up for suggestions.
+MODS = (
+    u'%s',  # Same
+    u'{^%s}',  # Prefix
+    u'{^}%s',
+    u'{^%s^}',  # Infix
+    u'{^}%s{^}',
+    u'{%s^}',  # Suffix
+    u'%s{^}',
+    u'{&%s}',  # Fingerspell
+    u'{#%s}',  # Command
+)
+
+_MODS_AFFIXES = tuple(tuple(mod.split(u'%s')) for mod in MODS)
+
+
+def split_mods(translation):
+    '''Yield (core text, mod index) for each of `MODS` matching <translation>.
+
+    Each core text is only yielded once (with the first matching mod):
+    e.g. `{^}` is both a prefix and a suffix of the empty text.
+    '''
+    cores = set()
+    for n, (prefix, suffix) in enumerate(_MODS_AFFIXES):
+        if len(translation) >= len(prefix) + len(suffix) and \
+           translation.startswith(prefix) and translation.endswith(suffix):
+            core = translation[len(prefix):len(translation) - len(suffix)]
+            if core not in cores:
+                cores.add(core)
+                yield core, n
+
+
+class SuggestionIndex(object):
+    '''Map the core text of translations to their variants (see `MODS`).
+
+    For example, `{^ing}` is recorded as a variant of `ing`,
+    along with `ing` itself, `{&ing}`, ...
+    '''
+
+    def __init__(self, translations=()):
+        # Core text -> {variant: mod index}.
+        self._index = {}
+        for translation in translations:
+            self.add(translation)
+
+    def add(self, translation):
+        for core, n in split_mods(translation):
+            variants = self._index.get(core)
+            if variants is None:
+                self._index[core] = {translation: n}
+            else:
+                variants[translation] = n
+
+    def remove(self, translation):
+        for core, n in split_mods(translation):
+            variants = self._index[core]
+            del variants[translation]
+            if not variants:
+                del self._index[core]
+
+    def variants(self, text):
+        '''Return the indexed variants of <text>, in `MODS` order.'''
+        variants = self._index.get(text)
+        if variants is None:
+            return []
+        return sorted(variants, key=variants.get)
+
+
 class Suggestions(object):
     def __init__(self, dictionary):
         self.dictionary = dictionary
@@ -13,18 +81,6 @@ class Suggestions(object):
     def find(self, translation):
         suggestions = []
 
-        mods = [
-            u'%s',  # Same
-            u'{^%s}',  # Prefix
-            u'{^}%s',
-            u'{^%s^}',  # Infix
-            u'{^}%s{^}',
-            u'{%s^}',  # Suffix
-            u'%s{^}',
-            u'{&%s}',  # Fingerspell
-            u'{#%s}',  # Command
-        ]
-
         possible_translations = set([translation])
 
         # Only strip spaces, so patterns with \n or \t are correctly handled.
@@ -40,8 +96,16 @@ class Suggestions(object):
         if similar_words:
             possible_translations |= set(similar_words)
 
+        # Only dictionaries collections maintain an index of the variants.
+        suggestion_variants = getattr(self.dictionary, 'suggestion_variants', None)
+
         for t in possible_translations:
-            for modded_translation in [mod % t for mod in mods]:
+            if suggestion_variants is None:
+                variants = [mod % t for mod in MODS]
+            else:
+                # Only the variants with an outline are returned.
+                variants = suggestion_variants(t)
+            for modded_translation in variants:
                 strokes_list = self.dictionary.reverse_lookup(modded_translation)
                 if not strokes_list:
                     continue
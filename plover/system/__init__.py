@@ -62,5 +62,9 @@ def setup(system_name):
         system_symbols[symbol] = init(mod)
     system_symbols['NAME'] = system_name
     globals().update(system_symbols)
+    # Normalized strokes and strokes masks depend on the system.
+    from plover.steno import normalize_stroke, Stroke
+    normalize_stroke.cache_clear()
+    Stroke.cache_clear()
 
 NAME = None
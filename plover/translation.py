@@ -351,6 +351,10 @@ class Translator(object):
         for i in range(len(translations)+1):
             replaced = translations[i:]
             strokes = [s for t in replaced for s in t.strokes]
+            # Skip candidates that no dictionary entry starts with.
+            if strokes and not self._dictionary.is_prefix(
+                tuple(s.rtfcre for s in strokes)):
+                continue
             strokes.append(stroke)
             mapping = self.lookup(strokes, suffixes)
             if mapping is not None:
@@ -369,7 +373,7 @@ class Translator(object):
                 suffix_mapping = self._dictionary.lookup(dict_key)
                 if suffix_mapping is None:
                     continue
-                keys = strokes[-1].steno_keys[:]
+                keys = list(strokes[-1].steno_keys)
                 keys.remove(key)
                 copy = strokes[:]
                 copy[-1] = Stroke(keys)
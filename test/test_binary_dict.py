@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for binary_dict.py."""
+
+import os
+import tempfile
+import unittest
+
+from plover.dictionary.base import load_dictionary
+from plover.dictionary.binary_dict import BinaryDictionary, write_binary_dictionary
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+
+from .utils import make_dict
+
+
+ENTRIES = {
+    ('S',): 'is',
+    ('KAT',): 'cat',
+    ('KAT', 'A', 'LOG'): 'catalog',
+    ('KAFR', '-Z'): u'café',
+    ('-G',): '{^ing}',
+    ('KR-G',): '{^ing}',
+    ('TK-LS',): '',
+}
+
+
+class BinaryDictionaryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'test.bdict')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _compile(self, entries):
+        write_binary_dictionary(self.filename, entries.items())
+        return BinaryDictionary.load(self.filename)
+
+    def test_load_dictionary(self):
+        d = self._compile(ENTRIES)
+        self.assertTrue(d.readonly)
+        self.assertEqual(len(d), len(ENTRIES))
+        self.assertEqual(d.longest_key, 3)
+        self.assertEqual(dict(d.items()), ENTRIES)
+        self.assertCountEqual(d, ENTRIES.keys())
+        for key, value in ENTRIES.items():
+            self.assertEqual(d[key], value)
+            self.assertEqual(d.get(key), value)
+        self.assertIsNone(d.get(('KAT', 'A')))
+        self.assertEqual(d.get(('STKPW',), 'x'), 'x')
+        with self.assertRaises(KeyError):
+            d[('KAT', 'A')]
+        self.assertTrue(d.is_prefix(('KAT',)))
+        self.assertTrue(d.is_prefix(('KAT', 'A')))
+        self.assertFalse(d.is_prefix(('KAT', 'A', 'LOG')))
+        self.assertFalse(d.is_prefix(('S',)))
+        self.assertCountEqual(d.reverse_lookup('{^ing}'), [('-G',), ('KR-G',)])
+        self.assertEqual(d.casereverse_lookup(u'café'), [u'café'])
+        with self.assertRaises(AssertionError):
+            d[('S',)] = 'a'
+        with self.assertRaises(ValueError):
+            BinaryDictionary.create(self.filename)
+
+    def test_empty_dictionary(self):
+        d = self._compile({})
+        self.assertEqual(len(d), 0)
+        self.assertEqual(d.longest_key, 0)
+        self.assertIsNone(d.get(('S',)))
+
+    def test_invalid_dictionary(self):
+        for contents in (b'', b'{"S": "a"}', b'PLVRBDIC' + b'\0' * 40):
+            with open(self.filename, 'wb') as fp:
+                fp.write(contents)
+            with self.assertRaises(ValueError):
+                BinaryDictionary.load(self.filename)
+
+    def test_collection(self):
+        user = StenoDictionary()
+        user[('KAT',)] = 'Cat'
+        user[('KAT', 'A')] = 'cata'
+        main = self._compile(ENTRIES)
+        low = StenoDictionary()
+        low[('STKPW',)] = 'z'
+        dc = StenoDictionaryCollection([user, main, low])
+        self.assertEqual(dc.lookup(('KAT',)), 'Cat')
+        self.assertEqual(dc.lookup(('S',)), 'is')
+        self.assertEqual(dc.lookup(('STKPW',)), 'z')
+        self.assertIsNone(dc.lookup(('TK-LS',)))
+        self.assertTrue(dc.is_prefix(('KAFR',)))
+        self.assertTrue(dc.is_prefix(('KAT',)))
+        main.enabled = False
+        self.assertEqual(dc.lookup(('STKPW',)), 'z')
+        self.assertIsNone(dc.lookup(('S',)))
+        self.assertFalse(dc.is_prefix(('KAFR',)))
+        low[('STKPW',)] = 'y'
+        self.assertEqual(dc.lookup(('STKPW',)), 'y')
+        main.enabled = True
+        self.assertEqual(dc.lookup(('S',)), 'is')
+
+    def test_load_from_json(self):
+        with make_dict(b'{"KAT/A/LOG": "catalog", "S": "is"}', 'json') as source:
+            write_binary_dictionary(self.filename,
+                                    load_dictionary(source, threaded_save=False).items())
+        d = load_dictionary(self.filename)
+        self.assertIsInstance(d, BinaryDictionary)
+        self.assertEqual(dict(d.items()), {
+            ('KAT', 'A', 'LOG'): 'catalog',
+            ('S',): 'is',
+        })
@@ -123,7 +123,12 @@ DEFAULTS = {
     'machine_specific_options': { 'arpeggiate': False },
     'system_name': config.DEFAULT_SYSTEM_NAME,
     'system_keymap': DEFAULT_KEYMAP,
-    'dictionaries': [DictionaryConfig(p) for p in english_stenotype.DEFAULT_DICTIONARIES]
+    'dictionaries': [DictionaryConfig(p) for p in english_stenotype.DEFAULT_DICTIONARIES],
+    'dictionaries_save_delay': config.DEFAULT_DICTIONARIES_SAVE_DELAY,
+    'watch_dictionaries': True,
+    'compact_dictionaries': False,
+    'prebuild_reverse_index': False,
+    'dictionaries_loading_processes': 0,
 }
 
 CONFIG_TESTS = (
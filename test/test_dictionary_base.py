@@ -0,0 +1,55 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for dictionary/base.py."""
+
+import unittest
+
+from mock import patch
+
+from plover.dictionary import base
+from plover.steno_dictionary import StenoDictionary
+
+
+class PluginDictionary(StenoDictionary):
+
+    # Note: no `compact` parameter.
+    @classmethod
+    def load(cls, resource):
+        d = cls()
+        d.update({('S',): 's', ('T', 'P'): 'tp'})
+        d.path = resource
+        return d
+
+
+class PluginObject(object):
+
+    readonly = True
+    cacheable = False
+
+    @classmethod
+    def load(cls, resource):
+        d = cls()
+        d.path = resource
+        return d
+
+
+class LoadDictionaryTestCase(unittest.TestCase):
+
+    def _load(self, dict_class, **kwargs):
+        with patch.object(base, '_get_dictionary_class', return_value=dict_class):
+            return base.load_dictionary('plugin.dict', threaded_save=False, **kwargs)
+
+    def test_plugin_compact(self):
+        d = self._load(PluginDictionary)
+        self.assertFalse(d.compact)
+        # The storage is converted after loading.
+        d = self._load(PluginDictionary, compact=True)
+        self.assertIsInstance(d, PluginDictionary)
+        self.assertTrue(d.compact)
+        self.assertEqual(dict(d.items()), {('S',): 's', ('T', 'P'): 'tp'})
+        self.assertTrue(d.is_prefix(('T',)))
+        # Or left as is if not supported.
+        d = self._load(PluginObject, compact=True)
+        self.assertIsInstance(d, PluginObject)
+        self.assertEqual(d.path, 'plugin.dict')
@@ -0,0 +1,111 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for dictionary/cache.py."""
+
+import os
+import tempfile
+import unittest
+
+from mock import patch
+
+from plover.dictionary import cache
+from plover.dictionary.base import load_dictionary
+from plover.dictionary.json_dict import JsonDictionary
+
+from .utils import make_dict
+
+
+class DictionaryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        cache.setup(self.tmpdir.name)
+
+    def tearDown(self):
+        cache.setup(None)
+        self.tmpdir.cleanup()
+
+    def _load(self, filename):
+        with patch.object(JsonDictionary, '_load',
+                          side_effect=JsonDictionary._load,
+                          autospec=True) as parser:
+            d = load_dictionary(filename, threaded_save=False)
+        return d, parser.call_count
+
+    def test_cache(self):
+        with make_dict(b'{"S/T": "st", "TEFT": "test"}', 'json') as filename:
+            expected = {('S', 'T'): 'st', ('TEFT',): 'test'}
+            hits, misses = cache.stats()[:2]
+            # First load: parse the file, and fill the cache.
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 1)
+            self.assertEqual(dict(d.items()), expected)
+            self.assertTrue(os.path.exists(cache.cache_filename(os.path.realpath(filename))))
+            self.assertEqual(cache.stats()[:2], (hits, misses + 1))
+            # Second load: use the cache.
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 0)
+            self.assertEqual(dict(d.items()), expected)
+            self.assertEqual(d.longest_key, 2)
+            self.assertTrue(d.is_prefix(('S',)))
+            self.assertEqual(d.path, filename)
+            self.assertEqual(d.timestamp, os.path.getmtime(filename))
+            self.assertFalse(d.readonly)
+            self.assertEqual(cache.stats()[:2], (hits + 1, misses + 1))
+            d = load_dictionary(filename, threaded_save=False, compact=True)
+            self.assertTrue(d.compact)
+            self.assertEqual(dict(d.items()), expected)
+            self.assertTrue(d.is_prefix(('S',)))
+            self.assertEqual(cache.stats()[:2], (hits + 2, misses + 1))
+            # Changing the file invalidates the cache.
+            with open(filename, 'wb') as fp:
+                fp.write(b'{"S/T": "st", "TEFT": "tested", "-G": "{^ing}"}')
+            st = os.stat(filename)
+            os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 1)
+            self.assertEqual(d[('TEFT',)], 'tested')
+            self.assertEqual(d[('-G',)], '{^ing}')
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 0)
+            self.assertEqual(len(d), 3)
+
+    def test_journal(self):
+        with make_dict(b'{"S": "is"}', 'json') as filename:
+            journal = filename + '.journal'
+            d, parse_count = self._load(filename)
+            d[('TEFT',)] = 'test'
+            d.save()
+            self.assertTrue(os.path.exists(journal))
+            # The journal changed: parse the file again.
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 1)
+            self.assertEqual(dict(d.items()), {('S',): 'is', ('TEFT',): 'test'})
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 0)
+            self.assertEqual(dict(d.items()), {('S',): 'is', ('TEFT',): 'test'})
+            # Same if it's removed.
+            os.unlink(journal)
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 1)
+            self.assertEqual(dict(d.items()), {('S',): 'is'})
+
+    def test_invalid_cache(self):
+        with make_dict(b'{"S": "is"}', 'json') as filename:
+            self._load(filename)
+            with open(cache.cache_filename(os.path.realpath(filename)), 'wb') as fp:
+                fp.write(b'garbage')
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 1)
+            self.assertEqual(dict(d.items()), {('S',): 'is'})
+            d, parse_count = self._load(filename)
+            self.assertEqual(parse_count, 0)
+
+    def test_disabled(self):
+        cache.setup(None)
+        with make_dict(b'{"S": "is"}', 'json') as filename:
+            for n in range(2):
+                d, parse_count = self._load(filename)
+                self.assertEqual(parse_count, 1)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
@@ -0,0 +1,148 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for the dictionary saver (dictionary/base.py)."""
+
+import os
+import threading
+import time
+import unittest
+
+from plover.dictionary.base import (
+    DictionarySaver, dictionary_saver, load_dictionary,
+)
+from plover.dictionary.json_dict import JsonDictionary
+
+from .utils import make_dict
+
+
+class FakeDictionary(object):
+
+    journaled = False
+
+    def __init__(self, fail=False):
+        self.saves = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def save(self, full=False):
+        with self.lock:
+            self.saves.append(full)
+        if self.fail:
+            raise IOError('disk full')
+
+
+class FakeJournaledDictionary(FakeDictionary):
+
+    journaled = True
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class DictionarySaverTestCase(unittest.TestCase):
+
+    def test_merged_saves(self):
+        saver = DictionarySaver(delay=0.2)
+        d1, d2 = FakeDictionary(), FakeDictionary()
+        for n in range(10):
+            saver.schedule(d1.save)
+        saver.schedule(d2.save)
+        saver.schedule(d2.save, full=True)
+        saver.schedule(d2.save)
+        # Nothing is saved until the delay expired.
+        self.assertEqual(d1.saves, [])
+        self.assertEqual(d2.saves, [])
+        self.assertTrue(saver.flush(timeout=5))
+        # One save per dictionary, full if any request was.
+        self.assertEqual(d1.saves, [False])
+        self.assertEqual(d2.saves, [True])
+        self.assertTrue(saver.flush(timeout=5))
+        self.assertEqual(d1.saves, [False])
+
+    def test_debounce(self):
+        saver = DictionarySaver(delay=0.3)
+        d = FakeDictionary()
+        start = time.monotonic()
+        # Each new request restarts the delay.
+        for n in range(3):
+            saver.schedule(d.save)
+            time.sleep(0.1)
+        self.assertEqual(d.saves, [])
+        deadline = time.monotonic() + 5
+        while not d.saves and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(d.saves, [False])
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+
+    def test_failed_save(self):
+        saver = DictionarySaver(delay=0)
+        d1, d2 = FakeDictionary(fail=True), FakeDictionary()
+        saver.schedule(d1.save)
+        saver.schedule(d2.save)
+        self.assertTrue(saver.flush(timeout=5))
+        self.assertEqual(d1.saves, [False])
+        self.assertEqual(d2.saves, [False])
+
+    def test_idle_compaction(self):
+        saver = DictionarySaver(delay=0, compact_delay=0.3)
+        d1, d2 = FakeDictionary(), FakeJournaledDictionary()
+        saver.schedule(d1.save)
+        saver.schedule(d2.save)
+        self.assertTrue(wait_for(lambda: d2.saves == [False]))
+        # Still in use: compaction is postponed.
+        time.sleep(0.2)
+        saver.schedule(d2.save)
+        time.sleep(0.2)
+        self.assertEqual(d2.saves, [False, False])
+        # Idle: the journaled dictionary is compacted, once.
+        self.assertTrue(wait_for(lambda: len(d2.saves) == 3))
+        self.assertEqual(d2.saves, [False, False, True])
+        time.sleep(0.5)
+        self.assertTrue(saver.flush(timeout=5))
+        self.assertEqual(d1.saves, [False])
+        self.assertEqual(d2.saves, [False, False, True])
+
+    def test_flush_compaction(self):
+        saver = DictionarySaver(delay=0, compact_delay=60)
+        d1, d2 = FakeJournaledDictionary(), FakeJournaledDictionary()
+        saver.schedule(d1.save)
+        self.assertTrue(wait_for(lambda: d1.saves == [False]))
+        saver.schedule(d2.save)
+        self.assertTrue(saver.flush(timeout=5))
+        self.assertEqual(d1.saves, [False, True])
+        self.assertIn(d2.saves, ([True], [False, True]))
+        self.assertTrue(saver.flush(timeout=5))
+        self.assertEqual(d1.saves, [False, True])
+        self.assertIn(d2.saves, ([True], [False, True]))
+
+    def test_background_save(self):
+        with make_dict(b'{"S": "a"}', 'json') as filename:
+            d = load_dictionary(filename)
+            self.assertIsInstance(d, JsonDictionary)
+            d[('T',)] = 't'
+            d.save()
+            d[('-G',)] = '{^ing}'
+            d.save(full=True)
+            self.assertTrue(dictionary_saver.flush(timeout=5))
+            d = load_dictionary(filename, threaded_save=False)
+            self.assertEqual(dict(d.items()), {
+                ('S',): 'a',
+                ('T',): 't',
+                ('-G',): '{^ing}',
+            })
+
+    def test_flush_journal(self):
+        with make_dict(b'{"S": "a"}', 'json') as filename:
+            d = load_dictionary(filename)
+            d[('T',)] = 't'
+            d.save()
+            self.assertTrue(dictionary_saver.flush(timeout=5))
+            # The file is up to date, and the journal gone.
+            self.assertFalse(os.path.exists(filename + '.journal'))
+            with open(filename, encoding='utf-8') as fp:
+                self.assertIn('"T": "t"', fp.read())
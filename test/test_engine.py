@@ -1,6 +1,9 @@
 
+import gc
 import os
+import threading
 import unittest
+import weakref
 from contextlib import contextmanager
 from functools import partial
 
@@ -8,6 +11,7 @@ import mock
 
 from plover import system
 from plover.config import DEFAULT_SYSTEM_NAME, DictionaryConfig
+from plover.dictionary import loading_manager
 from plover.engine import ErroredDictionary, StenoEngine
 from plover.registry import Registry
 from plover.machine.base import StenotypeBase
@@ -33,6 +37,11 @@ class FakeConfig(object):
         'start_capitalized'         : True,
         'start_attached'            : False,
         'enabled_extensions'        : set(),
+        'dictionaries_save_delay'   : 500,
+        'watch_dictionaries'        : False,
+        'compact_dictionaries'      : False,
+        'prebuild_reverse_index'    : False,
+        'dictionaries_loading_processes': 0,
     }
 
     def __init__(self, **kwargs):
@@ -96,7 +105,9 @@ class FakeKeyboardEmulation(object):
 class FakeEngine(StenoEngine):
 
     def _in_engine_thread(self):
-        return True
+        # Hooks from other threads (e.g. dictionaries
+        # loading) are queued, see `_process_queue`.
+        return threading.current_thread() is threading.main_thread()
 
     def quit(self, code=0):
         self._same_thread_hook(self._quit, code)
@@ -129,6 +140,11 @@ class EngineTestCase(unittest.TestCase):
             del self.engine
             del self.events
 
+    def _process_queue(self, count=1):
+        for __ in range(count):
+            func, args, kwargs = self.engine._queue.get(timeout=5)
+            func(*args, **kwargs)
+
     def test_engine(self):
         with self._setup():
             # Config load.
@@ -208,6 +224,7 @@ class EngineTestCase(unittest.TestCase):
                 make_dict(b'', 'json', 'invalid2') as invalid_dict_2, \
                 self._setup():
             self.engine.start()
+            self._process_queue()
             for test in (
                 # Load one valid dictionary.
                 [[
@@ -251,15 +268,184 @@ class EngineTestCase(unittest.TestCase):
                 self.events = []
                 config_update = { 'dictionaries': list(config_dictionaries), }
                 self.engine.config = dict(config_update)
+                self._process_queue()
                 self.assertEqual(self.events[0], ('config_changed', (config_update,), {}))
                 check_loaded_events(self.events[1:], test[1:])
             # Simulate an outdated dictionary.
             self.events = []
             self.engine.dictionaries[valid_dict_1].timestamp -= 1
             self.engine.config = {}
+            self._process_queue()
+            # Note: it's kept until reloaded.
             check_loaded_events(self.events, [[
-                (invalid_dict_2, True, True),
-            ], [
                 (valid_dict_1, False, False),
                 (invalid_dict_2, True, True),
             ]])
+
+    def test_reloading_changed_dictionary(self):
+        with \
+                make_dict(b'{"S": "1"}', 'json', 'valid1') as dict_1, \
+                make_dict(b'{"T": "2"}', 'json', 'valid2') as dict_2, \
+                self._setup():
+            self.engine.start()
+            self.engine.config = {'dictionaries': [
+                DictionaryConfig(dict_1, False),
+                DictionaryConfig(dict_2, True),
+            ]}
+            self._process_queue(2)
+            first, second = self.engine.dictionaries.dicts
+            # No change: nothing is reloaded.
+            self.events = []
+            self.engine._reload_dictionary(dict_2)
+            self.assertEqual(self.events, [])
+            # Only the changed dictionary is reloaded, in place.
+            with open(dict_1, 'w') as fp:
+                fp.write('{"S": "3", "T": "4"}')
+            os.utime(dict_1, (first.timestamp + 1, first.timestamp + 1))
+            self.engine._reload_dictionary(dict_1)
+            self._process_queue()
+            self.assertEqual(self.events, [])
+            self.assertEqual(self.engine.dictionaries.dicts, [first, second])
+            self.assertEqual(dict(first.items()), {('S',): '3', ('T',): '4'})
+            self.assertEqual(self.engine.dictionaries.lookup(('T',)), '2')
+            # Enabled state is preserved.
+            self.assertFalse(first.enabled)
+            # Replaced on error.
+            with open(dict_2, 'w') as fp:
+                fp.write('{')
+            os.utime(dict_2, (second.timestamp + 1, second.timestamp + 1))
+            self.engine._reload_dictionary(dict_2)
+            self._process_queue()
+            self.assertEqual(len(self.events), 1)
+            self.assertEqual(self.events[0][0], 'dictionaries_loaded')
+            reloaded_1, reloaded_2 = self.engine.dictionaries.dicts
+            self.assertIs(reloaded_1, first)
+            self.assertIsInstance(reloaded_2, ErroredDictionary)
+            self.assertTrue(reloaded_2.enabled)
+
+    def test_changed_dictionary_kept_while_loading(self):
+        with \
+                make_dict(b'{"S": "1"}', 'json', 'valid1') as dict_1, \
+                self._setup():
+            self.engine.start()
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            first, = self.engine.dictionaries.dicts
+            with open(dict_1, 'w') as fp:
+                fp.write('{"S": "3"}')
+            os.utime(dict_1, (first.timestamp + 1, first.timestamp + 1))
+            self.engine.config = {}
+            # The current version is used until the new one is loaded.
+            self.assertEqual(self.engine.dictionaries.dicts, [first])
+            self.assertEqual(self.engine.lookup(('S',)), '1')
+            self._process_queue()
+            self.assertEqual(self.engine.lookup(('S',)), '3')
+
+    def test_replaced_dictionaries_collection(self):
+        with \
+                make_dict(b'{"S": "1"}', 'json', 'valid1') as dict_1, \
+                make_dict(b'{"T": "2"}', 'json', 'valid2') as dict_2, \
+                self._setup():
+            self.engine.start()
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            first, = self.engine.dictionaries.dicts
+            previous = weakref.ref(self.engine.dictionaries)
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1),
+                                                   DictionaryConfig(dict_2)]}
+            self._process_queue()
+            self.assertEqual(len(self.engine.dictionaries.dicts), 2)
+            # The previous collection is not kept alive by the dictionaries.
+            self.events = []
+            gc.collect()
+            self.assertIsNone(previous())
+            first[('S',)] = '3'
+            self.assertEqual(self.engine.lookup(('S',)), '3')
+
+    def test_compact_dictionaries(self):
+        with \
+                make_dict(b'{"S": "1", "T/-P": "2"}', 'json', 'valid1') as dict_1, \
+                self._setup(compact_dictionaries=True):
+            self.engine.start()
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            d, = self.engine.dictionaries.dicts
+            self.assertTrue(d.compact)
+            self.assertEqual(self.engine.lookup(('T', '-P')), '2')
+
+    def test_loading_processes(self):
+        with \
+                make_dict(b'{"S": "1", "T/-P": "2"}', 'json', 'valid1') as dict_1, \
+                self._setup(dictionaries_loading_processes=1):
+            self.engine.start()
+            self.assertEqual(self.engine._dictionaries_manager.processes, 1)
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            self.assertEqual(self.engine.lookup(('T', '-P')), '2')
+
+    def test_asynchronous_loading(self):
+        with \
+                make_dict(b'{"S": "1"}', 'json', 'valid1') as dict_1, \
+                make_dict(b'{"T": "2"}', 'json', 'valid2') as dict_2, \
+                self._setup():
+            self.engine.start()
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            first, = self.engine.dictionaries.dicts
+            # The current dictionaries are used until the new ones are loaded.
+            self.events = []
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1),
+                                                   DictionaryConfig(dict_2)]}
+            self.assertEqual([e[0] for e in self.events], ['config_changed'])
+            self.assertEqual(self.engine.dictionaries.dicts, [first])
+            self.assertEqual(self.engine.lookup(('S',)), '1')
+            self._process_queue()
+            self.assertEqual([e[0] for e in self.events],
+                             ['config_changed', 'dictionaries_loaded'])
+            self.assertEqual([d.path for d in self.engine.dictionaries.dicts],
+                             [dict_1, dict_2])
+            # Superseded loads are ignored.
+            self.events = []
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_2)]}
+            self.engine.config = {'dictionaries': [DictionaryConfig(dict_1)]}
+            self._process_queue(2)
+            loaded = [e[1][0] for e in self.events if e[0] == 'dictionaries_loaded']
+            self.assertEqual([d.path for d in loaded[-1].dicts], [dict_1])
+            self.assertIs(loaded[-1], self.engine.dictionaries)
+            self.assertFalse(any(d.path == dict_2
+                                 for collection in loaded[1:]
+                                 for d in collection.dicts))
+
+    def test_progressive_startup(self):
+        with \
+                make_dict(b'{"S": "1"}', 'json', 'user') as user_dict, \
+                make_dict(b'{"S": "2", "T": "3"}', 'json', 'main') as main_dict, \
+                self._setup(dictionaries=[DictionaryConfig(user_dict),
+                                          DictionaryConfig(main_dict)]):
+            main_dict_loading = threading.Event()
+            load_dictionary = loading_manager.load_dictionary
+            def slow_load_dictionary(filename, **kwargs):
+                if filename == main_dict:
+                    main_dict_loading.wait(5)
+                return load_dictionary(filename, **kwargs)
+            with mock.patch('plover.dictionary.loading_manager.load_dictionary',
+                            slow_load_dictionary):
+                self.engine.start()
+                # The highest priority dictionary is usable right away.
+                self._process_queue()
+                self.assertEqual([d.path for d in self.engine.dictionaries.dicts],
+                                 [user_dict])
+                self.assertEqual(self.engine.lookup(('S',)), '1')
+                self.assertIsNone(self.engine.lookup(('T',)))
+                # The others are attached once loaded.
+                main_dict_loading.set()
+                self._process_queue()
+            self.assertEqual([d.path for d in self.engine.dictionaries.dicts],
+                             [user_dict, main_dict])
+            self.assertEqual(self.engine.lookup(('S',)), '1')
+            self.assertEqual(self.engine.lookup(('T',)), '3')
+            # With a `dictionaries_loaded` event for each step.
+            self.assertEqual([[d.path for d in e[1][0].dicts]
+                              for e in self.events
+                              if e[0] == 'dictionaries_loaded'],
+                             [[user_dict], [user_dict, main_dict]])
@@ -0,0 +1,118 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Tests for filewatcher.py."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from mock import patch
+
+from plover.oslayer import filewatcher
+
+
+class FileWatcherTestCase(unittest.TestCase):
+
+    watcher_class = None
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.changed = []
+        self.event = threading.Event()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _callback(self, filename):
+        self.changed.append(filename)
+        self.event.set()
+
+    def _create_watcher(self):
+        return self.watcher_class(self._callback, delay=0.1)
+
+    def _write(self, filename, contents):
+        with open(filename, 'w') as fp:
+            fp.write(contents)
+
+    def _wait(self, timeout=5.0):
+        self.assertTrue(self.event.wait(timeout))
+        # Make sure there's no extra notification.
+        time.sleep(0.3)
+        self.event.clear()
+
+    def test_watcher(self):
+        if self.watcher_class is None:
+            raise unittest.SkipTest('abstract test case')
+        watched = os.path.join(self.directory, 'watched.json')
+        other = os.path.join(self.directory, 'other.json')
+        self._write(watched, '{}')
+        self._write(other, '{}')
+        watcher = self._create_watcher()
+        try:
+            watcher.watch([watched])
+            # Wait for the initial scan (polling).
+            time.sleep(0.2)
+            # Changes to other files are ignored.
+            self._write(other, '{"S": "s"}')
+            self._write(watched, '{"S": "s"}')
+            self._wait()
+            self.assertEqual(self.changed, [watched])
+            # A save storm results in a single notification.
+            self.changed = []
+            tmp = watched + '.tmp'
+            for n in range(5):
+                self._write(tmp, '{"T": "%u"}' % n)
+                os.replace(tmp, watched)
+                time.sleep(0.02)
+            self._wait()
+            self.assertEqual(self.changed, [watched])
+            # No notification after being stopped.
+            watcher.stop()
+            self.changed = []
+            self._write(watched, '{}')
+            time.sleep(0.5)
+            self.assertEqual(self.changed, [])
+        finally:
+            watcher.stop()
+
+
+class PollingFileWatcherTestCase(FileWatcherTestCase):
+
+    watcher_class = filewatcher.PollingFileWatcher
+
+    def _create_watcher(self):
+        return self.watcher_class(self._callback, delay=0.1, interval=0.05)
+
+
+@unittest.skipIf(not sys.platform.startswith('linux'), 'Linux only')
+class InotifyFileWatcherTestCase(FileWatcherTestCase):
+
+    watcher_class = getattr(filewatcher, 'InotifyFileWatcher', None)
+
+    def test_fallback(self):
+        watched = os.path.join(self.directory, 'watched.json')
+        self._write(watched, '{}')
+        watcher = self._create_watcher()
+        try:
+            # inotify cannot be started (e.g. too many open files).
+            with patch.object(filewatcher, '_inotify_init1', return_value=-1), \
+                    self.assertLogs('plover', level='WARNING'):
+                watcher.watch([watched])
+            self.assertIsInstance(watcher._fallback, filewatcher.PollingFileWatcher)
+            self.assertIsNone(watcher._thread)
+            # Let the polling watcher do its initial scan.
+            time.sleep(0.2)
+            self._write(watched, '{"S": "s"}')
+            self._wait()
+            self.assertEqual(self.changed, [watched])
+            # Updating the list of files is handled by the polling watcher too.
+            watcher.watch([])
+            self.assertEqual(watcher._fallback._filenames, frozenset())
+        finally:
+            watcher.stop()
+        self.assertIsNone(watcher._fallback._thread)
@@ -0,0 +1,43 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for geminipr.py."""
+
+import unittest
+
+from plover.machine.geminipr import GeminiPr
+from plover.machine.keymap import Keymap
+
+
+def decode(machine, packet):
+    mask = machine._decode(packet)
+    return None if mask is None else machine.keymap.mask_actions(mask)
+
+
+class TestCase(unittest.TestCase):
+
+    def test_decode(self):
+        params = {k: v[0] for k, v in GeminiPr.get_option_info().items()}
+        m = GeminiPr(params)
+        # First key of each byte.
+        self.assertCountEqual(decode(m, b'\xc0\x40\x40\x40\x40\x40'),
+                              ['Fn', 'S1-', 'R-', 'pwr', '-P', '#7'])
+        # Last key of each byte.
+        self.assertCountEqual(decode(m, b'\x81\x01\x01\x01\x01\x01'),
+                              ['#6', 'H-', 'res2', '-R', '-D', '-Z'])
+        self.assertEqual(decode(m, b'\x80\x00\x00\x00\x00\x00'), [])
+        # Invalid packets.
+        self.assertIsNone(decode(m, b'\x00\x00\x00\x00\x00\x00'))
+        self.assertIsNone(decode(m, b'\x80\x00\x80\x00\x00\x00'))
+        # The keymap is folded into the decoding tables
+        # (unbound keys, like A-, are ignored).
+        keymap = Keymap(GeminiPr.get_keys(), ('S-', 'T-', '#'))
+        keymap.set_mappings({
+            'S-': ('S1-', 'S2-'),
+            'T-': ('T-',),
+            '#': ('#1', '#7'),
+            'no-op': ('Fn',),
+        })
+        m.set_keymap(keymap)
+        self.assertEqual(decode(m, b'\xc0\x70\x20\x00\x00\x40'), ['S-', 'T-', '#'])
+        self.assertEqual(decode(m, b'\xc0\x00\x00\x00\x00\x00'), [])
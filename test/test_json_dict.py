@@ -4,8 +4,12 @@
 
 """Unit tests for json.py."""
 
+import os
 import unittest
 
+from mock import patch
+
+from plover.dictionary import json_dict
 from plover.dictionary.json_dict import JsonDictionary
 
 from .utils import make_dict
@@ -40,6 +44,52 @@ class JsonDictionaryTestCase(unittest.TestCase):
             with make_dict(contents.encode('utf-8')) as filename:
                 self.assertRaises(exception, JsonDictionary.load, filename)
 
+    def test_streaming(self):
+        contents = (
+            u'{\n"S": "a",\n"S/T": "st" , "KAT":"caf\u00e9",\n'
+            u'"TEFT": "{^\\"\\n\\t\\"^}",  "T\\u00c9ST": "x" ,\n'
+            u'"-G": 42,\n"-Z": 1.5e3, "TK-LS": null, "S": "b"\n}\n'
+        ).encode('utf-8')
+        expected = {
+            ('S',): u'b',
+            ('S', 'T'): u'st',
+            ('KAT',): u'caf\u00e9',
+            ('TEFT',): u'{^"\n\t"^}',
+            (u'T\u00c9ST',): u'x',
+            ('-G',): 42,
+            ('-Z',): 1500.0,
+            ('TK-LS',): None,
+        }
+        # Check all possible chunk boundaries.
+        for chunk_size in (1, 2, 3, 7, 1024):
+            with patch.object(json_dict, 'CHUNK_SIZE', chunk_size):
+                for encoding in ('utf-8', 'latin-1'):
+                    with make_dict(contents.decode('utf-8').encode(encoding)) as filename:
+                        d = JsonDictionary.load(filename)
+                        self.assertEqual(dict(d.items()), expected)
+                for simple_contents, simple_expected in (
+                    (b'{}', {}),
+                    (b' \n{ \n}\n ', {}),
+                    (b'{"S": "a"}', {('S',): u'a'}),
+                ):
+                    with make_dict(simple_contents) as filename:
+                        d = JsonDictionary.load(filename)
+                        self.assertEqual(dict(d.items()), simple_expected)
+                for invalid_contents in (
+                    b'',
+                    b'{',
+                    b'{"S": "a",}',
+                    b'{"S": "a"} {}',
+                    b'{"S": "a"',
+                    b'{"S": 1',
+                    b'{"S" "a"}',
+                    b'{S: "a"}',
+                    b'{"S": "a\tb"}',
+                    b'{"S": tru}',
+                ):
+                    with make_dict(invalid_contents) as filename:
+                        self.assertRaises(ValueError, JsonDictionary.load, filename)
+
     def test_save_dictionary(self):
         for contents, expected in (
             # Simple test.
@@ -65,3 +115,107 @@ class JsonDictionaryTestCase(unittest.TestCase):
                 with open(filename, 'rb') as fp:
                     contents = fp.read().decode('utf-8')
                 self.assertEqual(contents, expected)
+
+    def test_journal(self):
+        with make_dict(b'{\n"S": "a",\n"T/KAT": "cat"\n}') as filename:
+            journal = filename + '.journal'
+            def read_file(filename):
+                with open(filename, 'rb') as fp:
+                    return fp.read().decode('utf-8')
+            def load():
+                return dict(JsonDictionary.load(filename).items())
+            d = JsonDictionary.load(filename)
+            d[('TEFT',)] = u'café'
+            d[('S',)] = u'b'
+            d.update({('A', 'B', 'C'): u'abc'})
+            del d[('T', 'KAT')]
+            d.save()
+            # Only the journal was updated.
+            self.assertEqual(read_file(filename), u'{\n"S": "a",\n"T/KAT": "cat"\n}')
+            # Note: the first line is the header.
+            self.assertCountEqual(read_file(journal).splitlines()[1:], [
+                u'["TEFT", "café"]',
+                u'["S", "b"]',
+                u'["A/B/C", "abc"]',
+                u'["T/KAT"]',
+            ])
+            expected = {
+                ('S',): u'b',
+                ('TEFT',): u'café',
+                ('A', 'B', 'C'): u'abc',
+            }
+            self.assertEqual(load(), expected)
+            d2 = JsonDictionary.load(filename)
+            self.assertEqual(d2.longest_key, 3)
+            # No change, no write.
+            d.save()
+            self.assertEqual(len(read_file(journal).splitlines()), 5)
+            del d[('A', 'B', 'C')]
+            d.save()
+            del expected[('A', 'B', 'C')]
+            self.assertEqual(load(), expected)
+            self.assertEqual(JsonDictionary.load(filename).longest_key, 1)
+            # An interrupted write is ignored.
+            with open(journal, 'ab') as fp:
+                fp.write(b'["S", "c')
+            self.assertEqual(load(), expected)
+            # But not an invalid record.
+            with open(journal, 'ab') as fp:
+                fp.write(b'"]\n["S"\n')
+            self.assertRaises(ValueError, JsonDictionary.load, filename)
+            # A full save removes the journal.
+            d.save(full=True)
+            self.assertFalse(os.path.exists(journal))
+            self.assertEqual(read_file(filename), u'{\n"S": "b",\n"TEFT": "café"\n}')
+            self.assertEqual(load(), expected)
+            # So does a save when the journal is too big.
+            d = JsonDictionary.load(filename)
+            d.journal_max_records = 2
+            d[('S',)] = u'c'
+            d[('T',)] = u't'
+            d.save()
+            self.assertTrue(os.path.exists(journal))
+            d[('TEFT',)] = u'test'
+            d.save()
+            self.assertFalse(os.path.exists(journal))
+            self.assertEqual(load(), {
+                ('S',): u'c',
+                ('T',): u't',
+                ('TEFT',): u'test',
+            })
+            # And clearing the dictionary.
+            d[('S',)] = u'd'
+            d.save()
+            self.assertTrue(os.path.exists(journal))
+            d.clear()
+            d.save()
+            self.assertFalse(os.path.exists(journal))
+            self.assertEqual(load(), {})
+
+    def test_outdated_journal(self):
+        with make_dict(b'{\n"S": "a"\n}') as filename:
+            journal = filename + '.journal'
+            d = JsonDictionary.load(filename)
+            d[('TEFT',)] = u'test'
+            d.save()
+            self.assertTrue(os.path.exists(journal))
+            # Edit the file by hand.
+            with open(filename, 'wb') as fp:
+                fp.write(b'{\n"S": "a",\n"T": "t"\n}')
+            # The journal was written for the previous version, discard it.
+            with self.assertLogs('plover', level='WARNING'):
+                d = JsonDictionary.load(filename)
+            self.assertEqual(dict(d.items()), {('S',): u'a', ('T',): u't'})
+            self.assertFalse(os.path.exists(journal))
+            # A journal without header is discarded too.
+            with open(journal, 'wb') as fp:
+                fp.write(b'["TEFT", "test"]\n')
+            with self.assertLogs('plover', level='WARNING'):
+                d = JsonDictionary.load(filename)
+            self.assertEqual(dict(d.items()), {('S',): u'a', ('T',): u't'})
+            self.assertFalse(os.path.exists(journal))
+            # The next save starts a new one.
+            d[('TEFT',)] = u'test'
+            d.save()
+            self.assertEqual(dict(JsonDictionary.load(filename).items()),
+                             {('S',): u'a', ('T',): u't', ('TEFT',): u'test'})
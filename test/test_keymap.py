@@ -88,3 +88,20 @@ class KeymapTest(TestCase):
         # Assert on invalid action.
         with self.assertRaises(AssertionError):
             k['a9'] = 'k0'
+
+    def test_keymap_masks(self):
+        k = new_keymap()
+        k.set_mappings(MAPPINGS_DICT)
+        self.assertEqual(k.actions_mask(()), 0)
+        # Unbound keys are ignored.
+        self.assertEqual(k.actions_mask(('k2', 'k3')), 0)
+        mask = k.actions_mask(('k7', 'k0', 'k4', 'k6'))
+        self.assertEqual(k.mask_actions(mask), ['a0', 'a1'])
+        self.assertEqual(k.mask_actions(k.actions_mask(('k1',))), ['a3'])
+        self.assertEqual(k.mask_actions(0), [])
+        # 'no-op' is ignored.
+        k['no-op'] = ('k2',)
+        self.assertEqual(k.actions_mask(('k2',)), 0)
+        # Results can be modified.
+        k.mask_actions(mask).append('a2')
+        self.assertEqual(k.mask_actions(mask), ['a0', 'a1'])
@@ -4,15 +4,22 @@
 """Tests for loading_manager.py."""
 
 from collections import defaultdict
+import multiprocessing
 import os
 import tempfile
+import time
 import unittest
 
 from mock import patch
 
+from plover.dictionary import base
+from plover.dictionary.json_dict import JsonDictionary
 from plover.exception import DictionaryLoaderException
+from plover.steno_dictionary import StenoDictionary
 import plover.dictionary.loading_manager as loading_manager
 
+from .utils import make_dict
+
 
 class DictionaryLoadingManagerTestCase(unittest.TestCase):
 
@@ -117,3 +124,125 @@ class DictionaryLoadingManagerTestCase(unittest.TestCase):
             manager.unload_outdated()
             self.assertEqual(len(manager), 0)
             self.assertFalse(df('c') in manager)
+
+    def test_process_pool(self):
+        with make_dict(b'{"S/T": "st", "TEFT": "test"}', 'json') as d1, \
+             make_dict(b'{"-G": "{^ing}", "S/T/-G": "sting"}', 'json') as d2, \
+             make_dict(b'{"S": ', 'json') as invalid:
+            filenames = [d1, d2, invalid]
+            manager = loading_manager.DictionaryLoadingManager(processes=2)
+            results = manager.load(filenames)
+            expected = loading_manager.DictionaryLoadingManager().load(filenames)
+            for result, expected_result in zip(results[:2], expected[:2]):
+                self.assertIsInstance(result, JsonDictionary)
+                self.assertEqual(result.path, expected_result.path)
+                self.assertEqual(result.timestamp, expected_result.timestamp)
+                self.assertEqual(result.longest_key, expected_result.longest_key)
+                self.assertEqual(dict(result.items()), dict(expected_result.items()))
+            self.assertTrue(results[1].is_prefix(('S', 'T')))
+            self.assertIsInstance(results[2], DictionaryLoaderException)
+            self.assertIsInstance(results[2].exception, ValueError)
+            # The pool is only used during a call to `load`.
+            self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_compact(self):
+        with make_dict(b'{"S/T": "st", "TEFT": "test"}', 'json') as filename:
+            manager = loading_manager.DictionaryLoadingManager(compact=True)
+            d, = manager.load([filename])
+            self.assertIsInstance(d, JsonDictionary)
+            self.assertTrue(d.compact)
+            self.assertEqual(dict(d.items()), {('S', 'T'): 'st', ('TEFT',): 'test'})
+            # Reloaded dictionaries too.
+            d.timestamp -= 1
+            d = manager.reload(filename, delta=False)
+            self.assertTrue(d.compact)
+
+    def test_reverse_index(self):
+        with make_dict(b'{"S/T": "st", "TEFT": "test"}', 'json') as filename:
+            manager = loading_manager.DictionaryLoadingManager()
+            d, = manager.load([filename])
+            self.assertIsNone(d._reverse)
+            manager = loading_manager.DictionaryLoadingManager(reverse_index=True)
+            d, = manager.load([filename])
+            # Built in the background.
+            deadline = time.monotonic() + 5
+            while d._reverse is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNotNone(d._reverse)
+            self.assertEqual(d.reverse_lookup('test'), [('TEFT',)])
+
+    def test_plugin_dictionaries(self):
+
+        class PluginDictionary(StenoDictionary):
+            # Note: `load` supports neither compact storage,
+            # nor restoring a snapshot.
+            cacheable = True
+            @classmethod
+            def load(cls, resource):
+                d = cls()
+                d.update({('S',): 's'})
+                d.path = resource
+                d.timestamp = 0
+                return d
+
+        class PluginObject(object):
+            cacheable = False
+            readonly = True
+            @classmethod
+            def load(cls, resource):
+                d = cls()
+                d.path = resource
+                d.timestamp = 0
+                return d
+
+        for dict_class in (PluginDictionary, PluginObject):
+            manager = loading_manager.DictionaryLoadingManager(
+                processes=2, compact=True, reverse_index=True)
+            with make_dict(b'', 'plugin') as filename, \
+                 patch.object(base, '_get_dictionary_class', return_value=dict_class), \
+                 patch.object(loading_manager._ProcessPool, 'parse') as parse:
+                d, = manager.load([filename])
+            # Not parsed by the pool.
+            parse.assert_not_called()
+            self.assertIsInstance(d, dict_class)
+            self.assertEqual(d.path, filename)
+            if dict_class is PluginDictionary:
+                self.assertTrue(d.compact)
+                self.assertEqual(d.reverse_lookup('s'), [('S',)])
+
+    def test_load_async(self):
+        with make_dict(b'{"S": "s"}', 'json') as d1, \
+             make_dict(b'{"T": "t"}', 'json') as d2:
+            manager = loading_manager.DictionaryLoadingManager()
+            loaded = []
+            thread = manager.load_async([d1, d2], loaded.append)
+            thread.join()
+            self.assertEqual(len(loaded), 1)
+            results = loaded[0]
+            self.assertEqual([d.path for d in results], [d1, d2])
+            self.assertEqual([manager[d1], manager[d2]], results)
+
+    def test_reload(self):
+        with make_dict(b'{"S": "s", "T": "t"}', 'json') as filename:
+            manager = loading_manager.DictionaryLoadingManager()
+            d, = manager.load([filename])
+            # Up to date.
+            self.assertIsNone(manager.reload(filename))
+            self.assertIsNone(manager.start_reloading(filename))
+            # Changed: apply the differences.
+            with open(filename, 'w') as fp:
+                fp.write('{"S": "S", "P": "p"}')
+            d.timestamp -= 1
+            self.assertIs(manager.reload(filename), d)
+            self.assertEqual(dict(d.items()), {('S',): 'S', ('P',): 'p'})
+            self.assertIs(manager[filename], d)
+            # Full reload.
+            d.timestamp -= 1
+            new_d = manager.reload(filename, delta=False)
+            self.assertIsNot(new_d, d)
+            self.assertEqual(dict(new_d.items()), dict(d.items()))
+            # Superseded reload.
+            new_d.timestamp -= 1
+            op = manager.start_reloading(filename)
+            manager.load([])
+            self.assertIsNone(manager.finish_reloading(op))
@@ -0,0 +1,81 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for machine/base.py."""
+
+import unittest
+
+from plover.machine.base import SerialReader, SerialStenotypeBase
+
+
+class MockSerial(object):
+
+    def __init__(self, chunks):
+        # Each read returns (part of) the next chunk,
+        # an empty chunk simulates a timeout.
+        self.chunks = list(chunks)
+        self.reads = []
+        self.timeout = None
+
+    def inWaiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        self.reads.append(size)
+        if not self.chunks:
+            return b''
+        chunk = self.chunks.pop(0)
+        if len(chunk) > size:
+            self.chunks.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+
+class SerialReaderTestCase(unittest.TestCase):
+
+    def test_reader(self):
+        port = MockSerial([b'abc', b'defgh', b'', b'ij'])
+        reader = SerialReader(port, size=8)
+        self.assertEqual(reader.fill(), 3)
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(bytes(reader.take(2)), b'ab')
+        self.assertEqual(reader.find(b'c'), 0)
+        # Everything available is read at once.
+        self.assertEqual(reader.fill(), 5)
+        self.assertEqual(port.reads, [3, 5])
+        self.assertEqual(reader.find(b'f'), 3)
+        self.assertEqual(reader.find(b'x'), -1)
+        self.assertEqual(bytes(reader.take(4)), b'cdef')
+        # Timeout.
+        self.assertEqual(reader.fill(), 0)
+        self.assertEqual(bytes(reader.take()), b'gh')
+        self.assertEqual(len(reader), 0)
+        # Pending data is moved to the start of the buffer,
+        # and reads are limited to the remaining space.
+        port.chunks = [b'0123456789']
+        self.assertEqual(reader.fill(), 8)
+        self.assertEqual(bytes(reader.take(6)), b'012345')
+        self.assertEqual(reader.fill(), 2)
+        self.assertEqual(bytes(reader.take()), b'6789')
+        reader.clear()
+        self.assertEqual(len(reader), 0)
+
+    def test_iter_packets(self):
+        port = MockSerial([
+            # Several packets at once.
+            b'abcdefghi',
+            # Partial packets.
+            b'j', b'kl',
+            # Incomplete packet, discarded on timeout.
+            b'mn', b'',
+            b'opq',
+        ])
+        machine = SerialStenotypeBase({'timeout': 1.0})
+        machine.serial_port = port
+        packets = []
+        for packet in machine._iter_packets(3):
+            packets.append(bytes(packet))
+            if not port.chunks:
+                machine.finished.set()
+        self.assertEqual(packets, [b'abc', b'def', b'ghi', b'jkl', b'opq'])
+        self.assertEqual(port.reads, [9, 3, 2, 3, 1, 3])
@@ -0,0 +1,214 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Tests for search.py."""
+
+import threading
+import unittest
+from unittest import mock
+
+from plover.search import SearchIndex, SearchResult
+from plover.steno_dictionary import StenoDictionary
+
+
+def make_dict(path, entries):
+    d = StenoDictionary()
+    d.path = path
+    d.update(entries)
+    return d
+
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.d1 = make_dict('d1', {
+            ('TEFT',): 'test',
+            ('TEFTS',): 'tests',
+            ('TEFT', '-G'): 'testing',
+            ('PRO', 'TEFT'): 'protest',
+            ('KAT',): 'Cat',
+        })
+        self.d2 = make_dict('d2', {
+            ('T-S',): 'test',
+            ('KAT',): 'cat',
+            ('KA*T',): 'cart',
+        })
+        self.index = SearchIndex([self.d1, self.d2])
+        self.index.build()
+
+    def search(self, *args, **kwargs):
+        return [(r.strokes, r.translation, r.dictionary.path)
+                for r in self.index.search(*args, **kwargs)]
+
+    def test_prefix(self):
+        self.assertEqual(self.search('test'), [
+            (('TEFT',), 'test', 'd1'),
+            (('T-S',), 'test', 'd2'),
+            (('TEFT', '-G'), 'testing', 'd1'),
+            (('TEFTS',), 'tests', 'd1'),
+        ])
+        # Translations are case insensitive.
+        self.assertEqual(self.search('CAT'), [
+            (('KAT',), 'Cat', 'd1'),
+            (('KAT',), 'cat', 'd2'),
+        ])
+        # Strokes are not.
+        self.assertEqual(self.search('TEFT/', field='strokes'), [
+            (('TEFT', '-G'), 'testing', 'd1'),
+        ])
+        self.assertEqual(self.search('teft/', field='strokes'), [])
+        self.assertEqual(self.search('nothing'), [])
+
+    def test_substring(self):
+        self.assertEqual(self.search('test', mode='substring'), [
+            (('TEFT',), 'test', 'd1'),
+            (('T-S',), 'test', 'd2'),
+            (('TEFT', '-G'), 'testing', 'd1'),
+            (('TEFTS',), 'tests', 'd1'),
+            (('PRO', 'TEFT'), 'protest', 'd1'),
+        ])
+        self.assertEqual(self.search('EFT', field='strokes', mode='substring'), [
+            (('PRO', 'TEFT'), 'protest', 'd1'),
+            (('TEFT',), 'test', 'd1'),
+            (('TEFT', '-G'), 'testing', 'd1'),
+            (('TEFTS',), 'tests', 'd1'),
+        ])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.search('tset', mode='fuzzy'), [
+            (('TEFT',), 'test', 'd1'),
+            (('T-S',), 'test', 'd2'),
+        ])
+        self.assertEqual(self.search('cat', mode='fuzzy'), [
+            (('KAT',), 'Cat', 'd1'),
+            (('KAT',), 'cat', 'd2'),
+            (('KA*T',), 'cart', 'd2'),
+        ])
+        self.assertEqual(self.search('tst', mode='fuzzy', max_distance=2), [
+            (('TEFT',), 'test', 'd1'),
+            (('T-S',), 'test', 'd2'),
+            (('KAT',), 'Cat', 'd1'),
+            (('KAT',), 'cat', 'd2'),
+            (('TEFTS',), 'tests', 'd1'),
+        ])
+
+    def test_pagination(self):
+        results = self.index.search('', mode='prefix')
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.index.search('', start=2, count=3), results[2:5])
+        self.assertEqual(self.index.search('', start=7, count=3), results[7:])
+        self.assertEqual(self.search('test', dictionaries={'d2'}), [
+            (('T-S',), 'test', 'd2'),
+        ])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.index.search('test', field='outline')
+        with self.assertRaises(ValueError):
+            self.index.search('test', mode='regex')
+
+    def test_updates(self):
+        # Build the index, with enough entries for incremental updates.
+        self.d2.update({('S%u' % n,): 'word%u' % n for n in range(100)})
+        self.index.build()
+        self.assertEqual(len(self.index.search('word')), 100)
+        self.d1[('TEFT', '-G')] = 'tasting'
+        del self.d2[('T-S',)]
+        self.d2[('TEFT', 'ER')] = 'tester'
+        self.assertTrue(self.index._built)
+        self.assertEqual(self.search('test'), [
+            (('TEFT',), 'test', 'd1'),
+            (('TEFT', 'ER'), 'tester', 'd2'),
+            (('TEFTS',), 'tests', 'd1'),
+        ])
+        self.assertEqual(self.search('tast', mode='substring'), [
+            (('TEFT', '-G'), 'tasting', 'd1'),
+        ])
+        self.assertEqual(self.search('TEFT/', field='strokes'), [
+            (('TEFT', '-G'), 'tasting', 'd1'),
+            (('TEFT', 'ER'), 'tester', 'd2'),
+        ])
+        # Big changes trigger a rebuild.
+        self.d2.clear()
+        self.assertFalse(self.index._built)
+        self.assertEqual(self.search('c'), [(('KAT',), 'Cat', 'd1')])
+        self.index.build()
+        self.assertEqual(self.search('c'), [(('KAT',), 'Cat', 'd1')])
+        # Change of dictionaries.
+        d3 = make_dict('d3', {('KAT',): 'cat'})
+        self.index.set_dictionaries([d3, self.d1])
+        self.assertEqual(self.index.search('c'), [
+            SearchResult(('KAT',), 'cat', d3),
+            SearchResult(('KAT',), 'Cat', self.d1),
+        ])
+        self.index.set_dictionaries([])
+        self.assertEqual(self.index.search(''), [])
+        # Removed dictionaries are not tracked anymore.
+        self.d1[('TKOG',)] = 'dog'
+        self.assertEqual(self.index.search(''), [])
+
+
+class SearchScanTestCase(SearchIndexTestCase):
+    """Same searches, before the index is built."""
+
+    def setUp(self):
+        patcher = mock.patch.object(SearchIndex, '_start_build')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super(SearchScanTestCase, self).setUp()
+        self.assertFalse(self.index._built)
+
+    # Only relevant to the index.
+    test_updates = None
+
+
+class SearchIndexBuildTestCase(unittest.TestCase):
+
+    def test_background_build(self):
+        d = make_dict('d', {('KAT',): 'cat', ('TKOG',): 'dog'})
+        index = SearchIndex([d])
+        main_thread = threading.current_thread()
+        copying = threading.Event()
+        resume = threading.Event()
+        copy_items = d.copy_items
+        def slow_copy_items():
+            if threading.current_thread() is not main_thread:
+                copying.set()
+                resume.wait(5)
+            return copy_items()
+        with mock.patch.object(d, 'copy_items', slow_copy_items):
+            builder = index.build(threaded=True)
+            self.assertTrue(copying.wait(5))
+            # The index is not ready: searches scan the dictionaries,
+            # and changes are recorded.
+            d[('KOU',)] = 'cow'
+            self.assertEqual([r.translation for r in index.search('c')],
+                             ['cat', 'cow'])
+            self.assertFalse(index._built)
+            resume.set()
+            builder.join(5)
+        self.assertTrue(index._built)
+        del d[('KAT',)]
+        self.assertEqual([r.translation for r in index.search('')],
+                         ['cow', 'dog'])
+
+    def test_outdated_build(self):
+        d1 = make_dict('d1', {('KAT',): 'cat'})
+        d2 = make_dict('d2', {('TKOG',): 'dog'})
+        index = SearchIndex([d1])
+        resume = threading.Event()
+        copy_items = d1.copy_items
+        def slow_copy_items():
+            resume.wait(5)
+            return copy_items()
+        with mock.patch.object(d1, 'copy_items', slow_copy_items):
+            builder = index.build(threaded=True)
+            index.set_dictionaries([d2])
+            resume.set()
+            builder.join(5)
+        # The build is discarded, and restarted on the next search.
+        self.assertFalse(index._built)
+        self.assertEqual([r.translation for r in index.search('')], ['dog'])
+        index.build()
+        self.assertTrue(index._built)
+        self.assertEqual([r.translation for r in index.search('')], ['dog'])
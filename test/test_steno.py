@@ -3,9 +3,19 @@
 
 """Unit tests for steno.py."""
 
+import pickle
+import threading
 import unittest
 
-from plover.steno import normalize_steno, Stroke
+from plover import system
+from plover.config import DEFAULT_SYSTEM_NAME
+from plover.steno import (
+    keys_mask, mask_keys, normalize_steno, normalize_stroke, Stroke,
+)
+
+
+class MyStroke(Stroke):
+    pass
 
 
 class StenoTestCase(unittest.TestCase):
@@ -52,6 +62,19 @@ class StenoTestCase(unittest.TestCase):
             )
             self.assertEqual(result, expected, msg=msg)
 
+    def test_normalize_stroke_cache(self):
+        # Results are interned.
+        s1 = ''.join(['S', 'A-', 'R'])
+        s2 = ''.join(['S', '-A', 'R'])
+        self.assertIsNot(s1, s2)
+        self.assertIs(normalize_stroke(s1), normalize_stroke(s2))
+        self.assertIs(normalize_steno(s1 + '/' + s1)[1], normalize_stroke(s2))
+        # The cache is cleared when changing system.
+        self.assertGreater(normalize_stroke.cache_info().currsize, 0)
+        system.setup(DEFAULT_SYSTEM_NAME)
+        self.assertEqual(normalize_stroke.cache_info().currsize, 0)
+        self.assertEqual(normalize_stroke(s1), 'SAR')
+
     def test_steno(self):
         self.assertEqual(Stroke(['S-']).rtfcre, 'S')
         self.assertEqual(Stroke(['S-', 'T-']).rtfcre, 'ST')
@@ -59,3 +82,79 @@ class StenoTestCase(unittest.TestCase):
         self.assertEqual(Stroke(['-P', '-P']).rtfcre, '-P')
         self.assertEqual(Stroke(['-P', 'X-']).rtfcre, 'X-P')
         self.assertEqual(Stroke(['#', 'S-', '-T']).rtfcre, '1-9')
+
+    def test_stroke_cache(self):
+        # Strokes are interned.
+        s1 = Stroke(['-T', 'S-'])
+        s2 = Stroke(('S-', '-T', 'S-'))
+        self.assertIs(s1, s2)
+        self.assertIs(Stroke(iter(['S-', '-T'])), s1)
+        self.assertEqual(s1.rtfcre, 'S-T')
+        self.assertEqual(s1.steno_keys, ('S-', '-T'))
+        # Masks.
+        self.assertEqual(s1.mask, keys_mask(['S-', '-T']))
+        self.assertEqual(hash(s1), s1.mask)
+        self.assertIs(Stroke.from_mask(s1.mask), s1)
+        self.assertEqual(sorted(mask_keys(s1.mask)), ['-T', 'S-'])
+        # Number keys.
+        s3 = Stroke(['#', 'S-', '-T'])
+        self.assertEqual(s3.steno_keys, ('1-', '-9'))
+        self.assertEqual(s3, Stroke(['1-', '-9']))
+        self.assertEqual(s3.mask, Stroke(['1-', '-9']).mask)
+        self.assertNotEqual(s3, s1)
+        self.assertNotEqual(s3.mask, s1.mask)
+        # The cache is cleared when changing system.
+        system.setup(DEFAULT_SYSTEM_NAME)
+        s4 = Stroke(['S-', '-T'])
+        self.assertIsNot(s4, s1)
+        self.assertEqual(s4, s1)
+        self.assertEqual({s1: 42}[s4], 42)
+
+    def test_stroke_keys(self):
+        # The keys of interned strokes can't be changed.
+        stroke = Stroke(['S-', '-T'])
+        self.assertIsInstance(stroke.steno_keys, tuple)
+        # And are not copied on each access.
+        self.assertIs(stroke.steno_keys, stroke.steno_keys)
+        self.assertEqual(str(stroke), "Stroke(S-T : ['S-', '-T'])")
+
+    def test_stroke_pickle(self):
+        for stroke in (Stroke(['S-', '-T']), MyStroke(['S-', '-T'])):
+            copy = pickle.loads(pickle.dumps(stroke))
+            self.assertIs(type(copy), type(stroke))
+            self.assertEqual(copy, stroke)
+        self.assertIs(pickle.loads(pickle.dumps(Stroke(['S-', '-T']))),
+                      Stroke(['S-', '-T']))
+
+    def test_key_bits(self):
+        # New keys each get their own bit, even from several threads.
+        keys = ['-X%u' % n for n in range(200)]
+        barrier = threading.Barrier(4)
+        def allocate(keys):
+            barrier.wait()
+            for key in keys:
+                keys_mask([key])
+        threads = [threading.Thread(target=allocate, args=(keys[n::4],))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        masks = {keys_mask([key]) for key in keys}
+        self.assertEqual(len(masks), len(keys))
+        for mask in masks:
+            self.assertEqual(bin(mask).count('1'), 1)
+        system.setup(DEFAULT_SYSTEM_NAME)
+
+    def test_stroke_subclass(self):
+        class TimedStroke(Stroke):
+            def __init__(self, steno_keys, timestamp):
+                super(TimedStroke, self).__init__(steno_keys)
+                self.timestamp = timestamp
+        s1 = TimedStroke(['-T', 'S-'], 42)
+        s2 = TimedStroke(['-T', 'S-'], 43)
+        self.assertIsNot(s1, s2)
+        self.assertEqual((s1.timestamp, s2.timestamp), (42, 43))
+        self.assertEqual(s1.rtfcre, 'S-T')
+        self.assertEqual(s1.steno_keys, ('S-', '-T'))
+        self.assertEqual(s1, Stroke(['S-', '-T']))
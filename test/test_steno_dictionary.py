@@ -3,10 +3,13 @@
 
 """Unit tests for steno_dictionary.py."""
 
+import collections
+import gc
 import os
 import stat
 import tempfile
 import unittest
+import weakref
 
 from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
 
@@ -148,6 +151,45 @@ class StenoDictionaryTestCase(unittest.TestCase):
         dc.set_dicts([])
         self.assertEqual(dc.longest_key, 0)
 
+    def test_longest_key_histogram(self):
+        notifications = []
+        d = StenoDictionary()
+        d.add_longest_key_listener(lambda n: notifications.append(n))
+        d.update({('S',): 'a', ('S', 'T'): 'b', ('S', 'T', 'P'): 'c',
+                  ('T', 'P', 'H'): 'd'})
+        self.assertEqual(d.longest_key, 3)
+        # Still one key of length 3.
+        del d[('S', 'T', 'P')]
+        self.assertEqual(d.longest_key, 3)
+        # Overwriting a key does not count it twice.
+        d[('T', 'P', 'H')] = 'D'
+        del d[('T', 'P', 'H')]
+        self.assertEqual(d.longest_key, 2)
+        del d[('S', 'T')]
+        self.assertEqual(d.longest_key, 1)
+        d[('S', 'T', 'P', 'H')] = 'e'
+        self.assertEqual(d.longest_key, 4)
+        d.clear()
+        self.assertEqual(d.longest_key, 0)
+        self.assertEqual(notifications, [3, 2, 1, 4, 0])
+        # Mirrored in collections.
+        d1 = StenoDictionary()
+        d1.update({('S',): 'a', ('S', 'T'): 'b'})
+        d2 = StenoDictionary()
+        d2.update({('T', 'P'): 'c'})
+        dc = StenoDictionaryCollection([d1, d2])
+        notifications = []
+        dc.add_longest_key_listener(lambda n: notifications.append(n))
+        del d1[('S', 'T')]
+        self.assertEqual(dc.longest_key, 2)
+        d2[('T', 'P', 'H')] = 'd'
+        self.assertEqual(dc.longest_key, 3)
+        del d2[('T', 'P', 'H')]
+        self.assertEqual(dc.longest_key, 2)
+        d2.clear()
+        self.assertEqual(dc.longest_key, 1)
+        self.assertEqual(notifications, [3, 2, 1])
+
     def test_casereverse_del(self):
         d = StenoDictionary()
         d[('S-G',)] = 'something'
@@ -193,6 +235,113 @@ class StenoDictionaryTestCase(unittest.TestCase):
         self.assertCountEqual(dc.reverse_lookup('beautiful'),
                               [('PWAOUFL',), ('PW-FL',)])
 
+    def test_reverse_index_updates(self):
+        d1 = StenoDictionary()
+        d1[('PWAOUFL',)] = 'beautiful'
+        d2 = StenoDictionary()
+        d2.update({('PW-FL',): 'beautiful', ('PWAOUFL',): 'Beautiful'})
+        dc = StenoDictionaryCollection([d1, d2])
+        self.assertCountEqual(dc.reverse_lookup('beautiful'),
+                              [('PWAOUFL',), ('PW-FL',)])
+        self.assertEqual(dc.reverse_lookup('Beautiful'), [])
+        # Only variants with a winning outline.
+        self.assertEqual(dc.casereverse_lookup('beautiful'), ['beautiful'])
+        # Edits.
+        d1[('PWAOUFL',)] = 'pretty'
+        self.assertEqual(dc.reverse_lookup('beautiful'), [('PW-FL',)])
+        self.assertEqual(dc.reverse_lookup('pretty'), [('PWAOUFL',)])
+        self.assertEqual(dc.casereverse_lookup('beautiful'), ['beautiful'])
+        del d1[('PWAOUFL',)]
+        self.assertEqual(dc.reverse_lookup('pretty'), [])
+        self.assertEqual(dc.reverse_lookup('Beautiful'), [('PWAOUFL',)])
+        self.assertCountEqual(dc.casereverse_lookup('beautiful'),
+                              ['beautiful', 'Beautiful'])
+        # Enable/disable.
+        d1[('PWAOUFL',)] = 'beautiful'
+        d2.enabled = False
+        self.assertEqual(dc.reverse_lookup('beautiful'), [('PWAOUFL',)])
+        self.assertEqual(dc.reverse_lookup('Beautiful'), [])
+        self.assertIsNone(dc.casereverse_lookup('pretty'))
+        d2.enabled = True
+        self.assertCountEqual(dc.reverse_lookup('beautiful'),
+                              [('PWAOUFL',), ('PW-FL',)])
+        # Dictionaries that are not merged.
+        d3 = StenoDictionary()
+        d3.update({('PW-FL', 'PW-FL'): 'beautiful', ('PW-FL',): 'ugly'})
+        d3.use_compact_storage()
+        dc.set_dicts([d1, d3, d2])
+        self.assertCountEqual(dc.reverse_lookup('beautiful'),
+                              [('PWAOUFL',), ('PW-FL', 'PW-FL')])
+        self.assertEqual(dc.reverse_lookup('ugly'), [('PW-FL',)])
+
+    def test_lazy_reverse_index(self):
+        for compact in (False, True):
+            d = StenoDictionary()
+            if compact:
+                d.use_compact_storage()
+            d.update({('S',): 'a', ('T',): 'A', ('P',): 'b'})
+            # Not built until needed.
+            self.assertIsNone(d._reverse)
+            self.assertIsNone(d._casereverse)
+            self.assertEqual(d.reverse_lookup('a'), [('S',)])
+            self.assertIsNotNone(d._reverse)
+            # Querying missing translations does not grow the indexes.
+            self.assertEqual(d.reverse_lookup('c'), [])
+            self.assertEqual(d.casereverse_lookup('c'), [])
+            self.assertNotIn('c', d.reverse)
+            self.assertNotIn('c', d.casereverse)
+            # Kept in sync after that.
+            d[('S',)] = 'b'
+            self.assertEqual(d.reverse_lookup('a'), [])
+            self.assertCountEqual(d.reverse_lookup('b'), [('S',), ('P',)])
+            self.assertEqual(d.casereverse_lookup('a'), ['A'])
+            del d[('T',)]
+            self.assertEqual(d.casereverse_lookup('a'), [])
+            d.update({('W',): 'B'})
+            self.assertEqual(d.casereverse_lookup('b'), ['b', 'B'])
+            # Returned lists can be safely modified.
+            d.reverse_lookup('b').clear()
+            self.assertCountEqual(d.reverse_lookup('b'), [('S',), ('P',)])
+
+    def test_reverse_views(self):
+        for compact in (False, True):
+            d = StenoDictionary()
+            if compact:
+                d.use_compact_storage()
+            d.update({('S',): 'a', ('T',): 'A', ('P',): 'a', ('W', 'R'): 'b'})
+            self.assertEqual(d.reverse, {
+                'a': [('S',), ('P',)],
+                'A': [('T',)],
+                'b': [('W', 'R')],
+            })
+            self.assertEqual(d.casereverse, {
+                'a': collections.Counter({'a': 2, 'A': 1}),
+                'b': collections.Counter({'b': 1}),
+            })
+            # Missing entries default to empty values.
+            self.assertEqual(d.reverse['c'], [])
+            self.assertEqual(d.casereverse['c'], collections.Counter())
+            # Kept in sync.
+            del d[('T',)]
+            d[('S',)] = 'b'
+            self.assertEqual(d.reverse, {'a': [('P',)], 'b': [('W', 'R'), ('S',)]})
+            self.assertEqual(d.casereverse, {
+                'a': collections.Counter({'a': 1}),
+                'b': collections.Counter({'b': 2}),
+            })
+            d.clear()
+            self.assertEqual(d.reverse, {})
+            self.assertEqual(d.casereverse, {})
+
+    def test_threaded_reverse_index(self):
+        d = StenoDictionary()
+        d.update((('S%u' % n,), 'a%u' % (n % 10)) for n in range(1000))
+        thread = d.build_reverse_index(threaded=True)
+        d[('T',)] = 'a0'
+        thread.join()
+        self.assertEqual(len(d.reverse_lookup('a0')), 101)
+        self.assertIn(('T',), d.reverse_lookup('a0'))
+
     def test_dictionary_enabled(self):
         dc = StenoDictionaryCollection()
         d1 = StenoDictionary()
@@ -219,6 +368,219 @@ class StenoDictionaryTestCase(unittest.TestCase):
         self.assertEqual(dc.casereverse_lookup('testing'), None)
         self.assertCountEqual(dc.reverse_lookup('Testing'), [])
 
+    def test_dictionary_collection_index(self):
+        d1 = StenoDictionary()
+        d1[('S',)] = 'a'
+        d1[('T',)] = 'b'
+        d1[('P',)] = 'p'
+        d2 = StenoDictionary()
+        d2[('S',)] = 'c'
+        d2[('P',)] = ''
+        dc = StenoDictionaryCollection([d2, d1])
+        self.assertEqual(dc.lookup(('S',)), 'c')
+        # Empty translations do not shadow lower priority dictionaries.
+        self.assertEqual(dc.lookup(('P',)), 'p')
+        # Edits.
+        d1[('W',)] = 'd'
+        self.assertEqual(dc.lookup(('W',)), 'd')
+        d2[('W',)] = 'e'
+        self.assertEqual(dc.lookup(('W',)), 'e')
+        del d2[('W',)]
+        self.assertEqual(dc.lookup(('W',)), 'd')
+        del d1[('W',)]
+        self.assertIsNone(dc.lookup(('W',)))
+        d2.update({('T',): 'f', ('W', 'W'): 'g'})
+        self.assertEqual(dc.lookup(('T',)), 'f')
+        self.assertEqual(dc.lookup(('W', 'W')), 'g')
+        # Enabling/disabling.
+        d2.enabled = False
+        self.assertEqual(dc.lookup(('S',)), 'a')
+        self.assertEqual(dc.lookup(('T',)), 'b')
+        self.assertIsNone(dc.lookup(('W', 'W')))
+        d2.enabled = True
+        self.assertEqual(dc.lookup(('S',)), 'c')
+        self.assertEqual(dc.lookup(('W', 'W')), 'g')
+        d1.clear()
+        self.assertIsNone(dc.lookup(('P',)))
+        self.assertEqual(dc.lookup(('S',)), 'c')
+        # Swapping dictionaries.
+        d1[('S',)] = 'a'
+        dc.set_dicts([d1, d2])
+        self.assertEqual(dc.lookup(('S',)), 'a')
+        # Dictionaries removed from the collection are not tracked anymore.
+        dc.set_dicts([d1])
+        d2[('S', 'T')] = 'h'
+        self.assertIsNone(dc.lookup(('S', 'T')))
+
+    def test_dictionary_collection_custom_lookup(self):
+        # Like a Python dictionary plugin: no entries in `_dict`.
+        class CustomDictionary(StenoDictionary):
+            def __init__(self):
+                super(CustomDictionary, self).__init__()
+                self._longest_key = 1
+            def __getitem__(self, key):
+                if key == ('TEFT',):
+                    return 'testing'
+                raise KeyError(key)
+            def get(self, key, fallback=None):
+                try:
+                    return self[key]
+                except KeyError:
+                    return fallback
+        self.assertFalse(CustomDictionary.mergeable)
+        d1 = StenoDictionary()
+        d1[('S',)] = 'a'
+        d2 = CustomDictionary()
+        dc = StenoDictionaryCollection([d2, d1])
+        self.assertEqual(dc.lookup(('TEFT',)), 'testing')
+        self.assertEqual(dc.lookup(('S',)), 'a')
+        self.assertIsNone(dc.lookup(('T',)))
+
+    def test_dictionary_collection_custom_prefixes(self):
+        # Like a Python dictionary plugin: no prefixes index.
+        class CustomDictionary(StenoDictionary):
+            def __init__(self):
+                super(CustomDictionary, self).__init__()
+                self._longest_key = 2
+            def get(self, key, fallback=None):
+                return 'testing' if key == ('TEFT', '-G') else fallback
+        d1 = StenoDictionary()
+        d1[('S',)] = 'a'
+        d2 = CustomDictionary()
+        self.assertTrue(d2.is_prefix(('TEFT',)))
+        dc = StenoDictionaryCollection([d1, d2])
+        self.assertTrue(dc.is_prefix(('TEFT',)))
+        self.assertEqual(dc.lookup(('TEFT', '-G')), 'testing')
+
+    def test_dictionary_collection_close(self):
+        d1 = StenoDictionary()
+        d1.update({(k,): k.lower() for k in ('S', 'T', 'P')})
+        d2 = StenoDictionary()
+        d2[('S',)] = 'c'
+        dc = StenoDictionaryCollection([d2, d1])
+        self.assertEqual(dc.reverse_lookup('t'), [('T',)])
+        dc.close()
+        # Still usable.
+        self.assertEqual(dc.lookup(('S',)), 'c')
+        self.assertEqual(dc.lookup(('T',)), 't')
+        self.assertEqual(dc.reverse_lookup('t'), [('T',)])
+        self.assertEqual(dc.reverse_lookup('s'), [])
+        # But not referenced by the dictionaries anymore.
+        ref = weakref.ref(dc)
+        del dc
+        gc.collect()
+        self.assertIsNone(ref())
+        # And the dictionaries can still be edited.
+        d1[('W',)] = 'w'
+
+    def test_prefixes(self):
+        d1 = StenoDictionary()
+        d1[('S', 'T', 'P')] = 'a'
+        d1[('S', 'T')] = 'b'
+        self.assertTrue(d1.is_prefix(('S',)))
+        self.assertTrue(d1.is_prefix(('S', 'T')))
+        self.assertFalse(d1.is_prefix(('S', 'T', 'P')))
+        self.assertFalse(d1.is_prefix(('T',)))
+        d2 = StenoDictionary()
+        d2.update({('T', 'P'): 'c'})
+        dc = StenoDictionaryCollection([d2, d1])
+        self.assertTrue(dc.is_prefix(('S', 'T')))
+        self.assertTrue(dc.is_prefix(('T',)))
+        del d1[('S', 'T', 'P')]
+        self.assertTrue(dc.is_prefix(('S',)))
+        self.assertFalse(d1.is_prefix(('S', 'T')))
+        self.assertFalse(dc.is_prefix(('S', 'T')))
+        del d1[('S', 'T')]
+        self.assertFalse(d1.is_prefix(('S',)))
+        self.assertFalse(dc.is_prefix(('S',)))
+        d2.enabled = False
+        self.assertFalse(dc.is_prefix(('T',)))
+        d2.enabled = True
+        self.assertTrue(dc.is_prefix(('T',)))
+        d2.clear()
+        self.assertFalse(dc.is_prefix(('T',)))
+
+    def test_compact_storage(self):
+        d = StenoDictionary()
+        d[('S',)] = 'a'
+        d.use_compact_storage()
+        self.assertTrue(d.compact)
+        d[('S', 'T')] = 'b'
+        d.update({('T', 'P'): 'B', ('P',): 'b'})
+        self.assertEqual(len(d), 4)
+        self.assertEqual(d.longest_key, 2)
+        self.assertEqual(d[('S',)], 'a')
+        self.assertEqual(d.get(('S', 'T')), 'b')
+        self.assertIsNone(d.get(('W',)))
+        self.assertEqual(d.get(('S', 'P'), 'x'), 'x')
+        with self.assertRaises(KeyError):
+            d[('S', 'W')]
+        self.assertIn(('T', 'P'), d)
+        self.assertNotIn(('T',), d)
+        self.assertCountEqual(d.items(), [
+            (('S',), 'a'),
+            (('S', 'T'), 'b'),
+            (('T', 'P'), 'B'),
+            (('P',), 'b'),
+        ])
+        self.assertCountEqual(d, [('S',), ('S', 'T'), ('T', 'P'), ('P',)])
+        self.assertCountEqual(d.reverse_lookup('b'), [('S', 'T'), ('P',)])
+        self.assertEqual(d.reverse_lookup('c'), [])
+        self.assertEqual(d.casereverse_lookup('b'), ['b', 'B'])
+        self.assertTrue(d.is_prefix(('T',)))
+        # Strokes and translations are shared.
+        self.assertIs(d.reverse_lookup('b')[0][0], d.reverse_lookup('a')[0][0])
+        self.assertIs(d[('S', 'T')], d[('P',)])
+        dc = StenoDictionaryCollection([d])
+        self.assertEqual(dc.lookup(('T', 'P')), 'B')
+        del d[('T', 'P')]
+        self.assertIsNone(dc.lookup(('T', 'P')))
+        self.assertFalse(d.is_prefix(('T',)))
+        self.assertEqual(d.casereverse_lookup('b'), ['b'])
+        del d[('S', 'T')]
+        self.assertEqual(d.longest_key, 1)
+        self.assertEqual(d.reverse_lookup('b'), [('P',)])
+        with self.assertRaises(KeyError):
+            del d[('W',)]
+        d.clear()
+        self.assertEqual(len(d), 0)
+        self.assertEqual(d.reverse_lookup('b'), [])
+        self.assertEqual(d.casereverse_lookup('b'), [])
+
+    def test_sync(self):
+        class SyncableDictionary(StenoDictionary):
+            cacheable = True
+        for compact in (False, True):
+            d = SyncableDictionary()
+            d.update({('S',): 'a', ('S', 'T'): 'b', ('T', 'P', 'H'): 'c'})
+            if compact:
+                d.use_compact_storage()
+            d.build_reverse_index()
+            dc = StenoDictionaryCollection([d])
+            changes = []
+            d.add_change_listener(lambda d, keys: changes.append(sorted(keys)))
+            longest_keys = []
+            dc.add_longest_key_listener(lambda n: longest_keys.append(n))
+            new = SyncableDictionary()
+            new.update({('S',): 'a', ('S', 'T'): 'B', ('P',): 'c'})
+            new.timestamp = 42
+            self.assertEqual(d.sync(new), 3)
+            self.assertEqual(changes, [[('P',), ('S', 'T'), ('T', 'P', 'H')]])
+            self.assertEqual(dict(d.items()), dict(new.items()))
+            self.assertEqual(d.timestamp, 42)
+            self.assertEqual(d.longest_key, 2)
+            self.assertEqual(longest_keys, [2])
+            # Indexes are kept up to date.
+            self.assertEqual(d.reverse_lookup('c'), [('P',)])
+            self.assertEqual(d.reverse_lookup('b'), [])
+            self.assertEqual(d.casereverse_lookup('b'), ['B'])
+            self.assertFalse(d.is_prefix(('T',)))
+            self.assertEqual(dc.lookup(('S', 'T')), 'B')
+            self.assertIsNone(dc.lookup(('T', 'P', 'H')))
+            # No change.
+            self.assertEqual(d.sync(new), 0)
+            self.assertEqual(len(changes), 1)
+
     def test_dictionary_readonly(self):
         class FakeDictionary(StenoDictionary):
             def _load(self, filename):
@@ -90,6 +90,23 @@ class TestCase(unittest.TestCase):
     def test_crc(self):
         data = bytearray(b'123456789')
         self.assertEqual(stentura._crc(data), 0xBB3D)
+        # Compare against a bit by bit implementation.
+        def crc(data):
+            checksum = 0
+            for b in data:
+                checksum ^= b
+                for n in range(8):
+                    if checksum & 1:
+                        checksum = (checksum >> 1) ^ 0xA001
+                    else:
+                        checksum >>= 1
+            return checksum
+        data = bytes(range(256)) * 3
+        for offset, size in ((0, 0), (0, 1), (3, 4), (5, 17), (1, 512)):
+            self.assertEqual(stentura._crc(data, offset, size),
+                             crc(data[offset:offset+size]))
+            self.assertEqual(stentura._crc(list(data), offset, size),
+                             crc(data[offset:offset+size]))
 
     def test_write_buffer(self):
         buf = bytearray()
@@ -129,6 +146,13 @@ class TestCase(unittest.TestCase):
                     ['P-', 'R-', 'A-', 'O-', '-E', '-R', '-B', '-G', '-S']]
         for i, stroke in enumerate(strokes):
             self.assertCountEqual(stroke, expected[i])
+        # Same result with a cache hit.
+        self.assertEqual(stentura._parse_strokes(bytes(data)), strokes)
+        with self.assertRaises(stentura._ProtocolViolationException):
+            stentura._parse_strokes(bytes(data[:6]))
+        data[5] = 0b10001110
+        with self.assertRaises(stentura._ProtocolViolationException):
+            stentura._parse_strokes(bytes(data))
 
     def test_make_request(self):
         buf = bytearray(range(256))
@@ -182,6 +206,14 @@ class TestCase(unittest.TestCase):
         expected = bytearray([1] + for_crc + [crc & 0xFF, crc >> 8])
         self.assertEqual(p, expected)
 
+    def test_make_read_request(self):
+        buf = bytearray(32)
+        for seq, block, byte in ((0, 0, 0), (32, 1, 8), (255, 1000, 508),
+                                 (7, 0xFFFF, 0xFFFF)):
+            p = stentura._make_read_request(seq, block, byte)
+            expected = stentura._make_read(buf, seq, block, byte)
+            self.assertEqual(p, expected)
+
     def test_make_reset(self):
         buf = bytearray(range(32))  # Start with junk in the buffer.
         seq = 67
@@ -502,7 +534,10 @@ class TestCase(unittest.TestCase):
             # Ignore data that's there before we started.
             (MockPort([(46, b'', True)]).append(data2), []),
             # Ignore data that was there and also parse some strokes.
-            (MockPort([(25, data1), (36, b'', True)]).append(data2), data1_trans)
+            (MockPort([(25, data1), (36, b'', True)]).append(data2), data1_trans),
+            # Strokes split across reads.
+            (MockPort([(23, data1[:6]), (25, data1[6:]), (43, b'', True)]),
+             data1_trans),
         ]
 
         for test in tests:
@@ -0,0 +1,113 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Tests for suggestions.py."""
+
+import unittest
+
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+from plover.suggestions import Suggestion, SuggestionIndex, Suggestions, split_mods
+
+
+class SuggestionsTestCase(unittest.TestCase):
+
+    def test_split_mods(self):
+        self.assertEqual(list(split_mods('ing')), [('ing', 0)])
+        self.assertCountEqual(list(split_mods('{^}ing{^}')), [
+            ('{^}ing{^}', 0),
+            ('}ing{^', 1),
+            ('ing{^}', 2),
+            ('}ing{', 3),
+            ('ing', 4),
+            ('^}ing{', 5),
+            ('{^}ing', 6),
+        ])
+        self.assertEqual(list(split_mods('{&a}')), [('{&a}', 0), ('a', 7)])
+
+    def test_index(self):
+        index = SuggestionIndex(['{&a}', 'a', '{^a}'])
+        self.assertEqual(index.variants('a'), ['a', '{^a}', '{&a}'])
+        index.remove('{^a}')
+        self.assertEqual(index.variants('a'), ['a', '{&a}'])
+        index.remove('a')
+        index.remove('{&a}')
+        self.assertEqual(index.variants('a'), [])
+        self.assertEqual(index._index, {})
+
+    def test_find(self):
+        d1 = StenoDictionary()
+        d1.update({
+            ('KWRAOEU',): 'I',
+            ('EU',): 'I',
+            ('-G',): '{^ing}',
+            ('SKWR-G',): '{^ing}',
+            ('TPH-G',): 'Ing',
+        })
+        d2 = StenoDictionary()
+        d2.update({
+            ('EU',): 'eye',
+            ('TKPW-G',): 'ing',
+            ('SKWR-G',): '{&ing}',
+        })
+        d3 = StenoDictionary()
+        d3.update({('EUPBG',): '{^ing}', ('AOEU',): 'I'})
+        d3.use_compact_storage()
+        dc = StenoDictionaryCollection([d1, d2, d3])
+        suggestions = Suggestions(dc)
+        self.assertCountEqual(suggestions.find('ing'), [
+            Suggestion('ing', [('TKPW-G',)]),
+            Suggestion('{^ing}', [('-G',), ('EUPBG',), ('SKWR-G',)]),
+            Suggestion('Ing', [('TPH-G',)]),
+        ])
+        self.assertEqual(suggestions.find('I'), [
+            Suggestion('I', [('EU',), ('AOEU',), ('KWRAOEU',)]),
+        ])
+        self.assertEqual(suggestions.find('eye'), [])
+        # The index is kept up to date.
+        del d1[('EU',)]
+        d2[('-G',)] = '{&ing}'
+        self.assertEqual(suggestions.find('eye'), [Suggestion('eye', [('EU',)])])
+        self.assertCountEqual(suggestions.find('ing'), [
+            Suggestion('ing', [('TKPW-G',)]),
+            Suggestion('{^ing}', [('-G',), ('EUPBG',), ('SKWR-G',)]),
+            Suggestion('Ing', [('TPH-G',)]),
+        ])
+        d1.enabled = False
+        self.assertCountEqual(suggestions.find('ing'), [
+            Suggestion('ing', [('TKPW-G',)]),
+            Suggestion('{^ing}', [('EUPBG',)]),
+            Suggestion('{&ing}', [('-G',), ('SKWR-G',)]),
+        ])
+
+    def test_find_dictionary(self):
+        d = StenoDictionary()
+        d.update({
+            ('EU',): 'I',
+            ('-G',): '{^ing}',
+            ('SKWR-G',): '{^ing}',
+            ('TPH-G',): 'Ing',
+        })
+        suggestions = Suggestions(d)
+        self.assertCountEqual(suggestions.find('ing'), [
+            Suggestion('{^ing}', [('-G',), ('SKWR-G',)]),
+            Suggestion('Ing', [('TPH-G',)]),
+        ])
+        self.assertEqual(suggestions.find('I'), [Suggestion('I', [('EU',)])])
+        self.assertEqual(suggestions.find('eye'), [])
+
+    def test_remove_affix_only(self):
+        self.assertEqual(list(split_mods('{^}')), [('{^}', 0), ('', 1)])
+        index = SuggestionIndex(['{^}', '{^ing}'])
+        self.assertEqual(index.variants(''), ['{^}'])
+        index.remove('{^}')
+        self.assertEqual(index.variants(''), [])
+        # Same, through a dictionaries collection (the index
+        # is updated in place when only a few entries change).
+        d = StenoDictionary()
+        d.update({('S%u' % n,): 'word%u' % n for n in range(32)})
+        d[('TK-LS',)] = '{^}'
+        dc = StenoDictionaryCollection([d])
+        suggestions = Suggestions(dc)
+        self.assertEqual(suggestions.find('{^}'), [Suggestion('{^}', [('TK-LS',)])])
+        del d[('TK-LS',)]
+        self.assertEqual(suggestions.find('{^}'), [])
@@ -615,6 +615,36 @@ class TranslateStrokeTestCase(unittest.TestCase):
         self.translate(stroke('K-LG'))
         self.assertTranslations(lt)
 
+    def test_prefix_skips_lookups(self):
+        self.define('S/T/P/H/R', 'long')
+        self.define('A/-B', 'ab')
+        self.s.translations = self.lt('S/T A')
+        self.tlor.set_min_undo_length(10)
+        lookups = []
+        lookup = self.dc.lookup
+        def counting_lookup(key):
+            lookups.append(key)
+            return lookup(key)
+        self.dc.lookup = counting_lookup
+        self.translate(stroke('-B'))
+        self.assertTranslations(self.lt('S/T A/-B'))
+        # `S/T/A` is not a prefix of any entry, so the
+        # `S/T/A/-B` candidate is not even looked up.
+        self.assertNotIn(('S', 'T', 'A', '-B'), lookups)
+
+    def test_custom_dictionary_multistroke(self):
+        # Like a Python dictionary plugin: no prefixes index.
+        class CustomDictionary(StenoDictionary):
+            def __init__(self):
+                super(CustomDictionary, self).__init__()
+                self._longest_key = 2
+            def get(self, key, fallback=None):
+                return 'spiders' if key == ('S', 'P') else fallback
+        self.dc.set_dicts([self.d, CustomDictionary()])
+        self.s.translations = self.lt('S')
+        self.translate(stroke('P'))
+        self.assertEqual([t.english for t in self.s.translations], ['spiders'])
+
     def test_retrospective_insert_space(self):
         self.define('T/E/S/T', 'a longer key')
         self.define('PER', 'perfect')
@@ -0,0 +1,28 @@
+# Copyright (c) 2018 Open Steno Project
+# See LICENSE.txt for details.
+
+"""Unit tests for txbolt.py."""
+
+import unittest
+
+from plover.machine.txbolt import TxBolt
+
+
+class TestCase(unittest.TestCase):
+
+    def test_decode(self):
+        params = {k: v[0] for k, v in TxBolt.get_option_info().items()}
+        m = TxBolt(params)
+        actual = []
+        m.add_stroke_callback(actual.append)
+        # S- + -E, then a new stroke (lower set): T- + -Z + #.
+        m._decode(bytes((0b00000001, 0b01010000, 0b00000010, 0b11011000)))
+        # -F, then a zero byte to start a new stroke with S-.
+        m._decode(bytes((0b10000001, 0b00000000, 0b00000001)))
+        m._finish_stroke()
+        self.assertEqual([sorted(keys) for keys in actual], [
+            ['-E', 'S-'],
+            ['#', '-Z', 'T-'],
+            ['-F'],
+            ['S-'],
+        ])